@@ -0,0 +1,266 @@
+"""
+Показатели надежности по рекламациям (GET /api/claims/analytics/).
+
+Для каждого узла отказа, модели техники и сервисной компании машины считаются:
+- failures — число отказов;
+- mtbf — средняя наработка между отказами, м/час: для каждой машины интервалы
+  между соседними по наработке отказами группы (первый — от нуля);
+- failure_rate — отказов на 1000 м/час наработки машин группы (последняя
+  наработка машины берется из сводки VehicleStats; для узла отказа — наработка
+  всех машин выборки, так как отказать может узел любой машины);
+- downtime — среднее и перцентили (50, 90, 95) времени простоя, дней.
+
+Рекламации читаются колонками values_list() прямо в массивы NumPy (без создания
+объектов моделей), а все группировки считаются векторно: сортировка np.lexsort,
+суммы по группам np.bincount, перцентили — линейной интерполяцией по границам
+групп в отсортированном массиве (как np.percentile). NumPy указан в requirements.txt;
+если он не установлен, остальной API работает, а этот эндпоинт отвечает 503.
+
+Выборка та же, что у списка рекламаций (роль пользователя и фильтры filter_fields);
+фильтры по машине ограничивают и машины, чья наработка учитывается. Результат
+кэшируется в кэше процесса и сбрасывается сменой поколений 'vehicle_stats'
+(любая запись ТО или рекламаций, см. app.vehicle_stats) и 'vehicle-rows' (изменение
+техники: модель, сервисная компания).
+"""
+
+import hashlib
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.functions import Coalesce
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import reference_cache, vehicle_stats
+from .bulk import visible_vehicles
+from .cache import get_generation
+from .conditional import VEHICLE_GENERATION
+from .models import User
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (50, 90, 95)
+
+# Наработка, на которую приводится интенсивность отказов, м/час
+RATE_HOURS = 1000
+
+# Группировка: колонка рекламации и колонка машины для наработки группы
+# (None — наработка всех машин выборки)
+GROUPS = {
+    'node_fail': ('node_fail_id', None),
+    'vehicle_model': ('vehicle__vehicle_model_id', 'vehicle_model_id'),
+    'service': ('vehicle__service_id', 'service_id'),
+}
+
+GENERATIONS = (vehicle_stats.GENERATION, VEHICLE_GENERATION)
+
+
+class AnalyticsUnavailable(APIException):
+    """NumPy не установлен."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Аналитика недоступна: не установлен пакет numpy'
+    default_code = 'analytics_unavailable'
+
+
+def read_columns(queryset, columns):
+    """
+    Читает колонки выборки в двумерный массив int64 (строки × колонки).
+
+    Args:
+        queryset: Выборка
+        columns (list): Колонки values_list() (целочисленные, без NULL)
+
+    Returns:
+        ndarray: Массив формы (число строк, число колонок)
+    """
+    rows = list(queryset.order_by().values_list(*columns))
+    data = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * len(columns))
+    return data.reshape(len(rows), len(columns))
+
+
+def group_sums(keys, weights, groups):
+    """
+    Суммы весов по ключам для заданного набора групп.
+
+    Args:
+        keys (ndarray): Ключ группы каждой строки
+        weights (ndarray): Вес каждой строки
+        groups (ndarray): Отсортированные ключи групп результата
+
+    Returns:
+        ndarray: Сумма весов для каждой группы (0 для групп без строк)
+    """
+    if not len(keys):
+        return np.zeros(len(groups))
+    present, index = np.unique(keys, return_inverse=True)
+    sums = np.bincount(index, weights=weights, minlength=len(present))
+    position = np.clip(np.searchsorted(present, groups), 0, len(present) - 1)
+    return np.where(present[position] == groups, sums[position], 0)
+
+
+def group_stats(keys, vehicle_ids, operating_time, downtime):
+    """
+    Показатели отказов по группам.
+
+    Args:
+        keys (ndarray): Ключ группы каждой рекламации
+        vehicle_ids (ndarray): Машина каждой рекламации
+        operating_time (ndarray): Наработка на момент отказа
+        downtime (ndarray): Время простоя
+
+    Returns:
+        dict: groups (ключи), failures, mtbf, downtime_mean и p<N> для PERCENTILES — массивы по группам
+    """
+    groups, index, failures = np.unique(keys, return_inverse=True, return_counts=True)
+
+    # Интервалы между отказами: внутри группы и машины по возрастанию наработки
+    order = np.lexsort((operating_time, vehicle_ids, index))
+    sorted_index, sorted_vehicles, sorted_time = index[order], vehicle_ids[order], operating_time[order]
+    same = np.zeros(len(order), dtype=bool)
+    same[1:] = (sorted_index[1:] == sorted_index[:-1]) & (sorted_vehicles[1:] == sorted_vehicles[:-1])
+    previous = np.zeros_like(sorted_time)
+    previous[1:] = np.where(same[1:], sorted_time[:-1], 0)
+    intervals = np.bincount(sorted_index, weights=sorted_time - previous, minlength=len(groups))
+
+    result = {
+        'groups': groups,
+        'failures': failures,
+        'mtbf': intervals / failures,
+        'downtime_mean': np.bincount(index, weights=downtime, minlength=len(groups)) / failures,
+    }
+
+    # Перцентили: позиция внутри своей группы отсортированного массива простоя
+    sorted_downtime = downtime[np.lexsort((downtime, index))].astype(np.float64)
+    starts = np.cumsum(failures) - failures
+    for percentile in PERCENTILES:
+        position = starts + (failures - 1) * percentile / 100
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        result[f'p{percentile}'] = (
+            sorted_downtime[lower] + (sorted_downtime[upper] - sorted_downtime[lower]) * (position - lower)
+        )
+    return result
+
+
+def _round(value):
+    """Число для ответа: два знака после запятой."""
+    return round(float(value), 2)
+
+
+def compute(claims, vehicles):
+    """
+    Вычисляет показатели надежности.
+
+    Args:
+        claims: Выборка рекламаций
+        vehicles: Выборка машин, наработка которых учитывается
+
+    Returns:
+        dict: claims, operating_time и списки показателей по группам (ключи GROUPS), по убыванию числа отказов
+    """
+    claim_columns = ['vehicle_id', 'operating_time', 'downtime'] + [column for column, _ in GROUPS.values()]
+    claim_data = read_columns(claims, claim_columns)
+    vehicle_columns = [column for _, column in GROUPS.values() if column]
+    vehicle_data = read_columns(
+        vehicles.annotate(hours=Coalesce('stats__operating_time', 0)), vehicle_columns + ['hours']
+    )
+    hours = vehicle_data[:, -1].astype(np.float64)
+
+    report = {'claims': len(claim_data), 'operating_time': int(hours.sum())}
+    for offset, (name, (_, vehicle_column)) in enumerate(GROUPS.items(), start=3):
+        if not len(claim_data):
+            report[name] = []
+            continue
+        stats = group_stats(claim_data[:, offset], claim_data[:, 0], claim_data[:, 1], claim_data[:, 2])
+        if vehicle_column is None:
+            exposure = np.full(len(stats['groups']), hours.sum())
+        else:
+            exposure = group_sums(vehicle_data[:, vehicle_columns.index(vehicle_column)], hours, stats['groups'])
+
+        items = []
+        for position in np.argsort(-stats['failures'], kind='stable'):
+            failures = int(stats['failures'][position])
+            items.append({
+                'id': int(stats['groups'][position]),
+                'failures': failures,
+                'mtbf': _round(stats['mtbf'][position]),
+                'failure_rate': (
+                    _round(failures / exposure[position] * RATE_HOURS) if exposure[position] > 0 else None
+                ),
+                'downtime': {
+                    'mean': _round(stats['downtime_mean'][position]),
+                    **{f'p{percentile}': _round(stats[f'p{percentile}'][position]) for percentile in PERCENTILES},
+                },
+            })
+        report[name] = items
+    return report
+
+
+def get_vehicle_conditions(view):
+    """
+    Условия на машины из фильтров списка рекламаций, относящихся к машине (vehicle, vehicle_model, client).
+
+    Returns:
+        dict: Аргументы для Vehicle.objects.filter()
+    """
+    conditions = {}
+    for name, field in getattr(view, 'filter_fields', {}).items():
+        if field.lookup == 'vehicle_id' or field.lookup.startswith('vehicle__'):
+            for lookup, value in field.get_conditions(name, view.request.query_params).items():
+                if lookup.startswith('vehicle__'):
+                    conditions[lookup[len('vehicle__'):]] = value
+                else:
+                    conditions['pk' + lookup[len('vehicle_id'):]] = value
+    return conditions
+
+
+def add_names(report):
+    """Добавляет названия групп: справочники — из кэша справочников, сервисные компании — одним запросом."""
+    snapshot = reference_cache.get_snapshot()
+    for name in ('node_fail', 'vehicle_model'):
+        for item in report[name]:
+            row = snapshot.get(item['id'])
+            item['name'] = row.name if row is not None else None
+    services = dict(User.objects.filter(pk__in=[item['id'] for item in report['service']])
+                    .values_list('pk', 'fullname'))
+    for item in report['service']:
+        item['name'] = services.get(item['id'])
+    return report
+
+
+def get_report(view):
+    """
+    Отчет о надежности для представления рекламаций (роль пользователя и фильтры запроса).
+
+    Args:
+        view: WarrantyClaimViewSet
+
+    Returns:
+        dict: Отчет (см. compute) с названиями групп
+
+    Raises:
+        AnalyticsUnavailable: Если NumPy не установлен
+    """
+    if np is None:
+        raise AnalyticsUnavailable()
+
+    request = view.request
+    user = request.user
+    # Менеджеры видят одни и те же данные и делят одну запись кэша
+    scope = user.type if user.type == 'MR' else f'{user.type}:{user.pk}'
+    generations = ':'.join(str(get_generation(name)) for name in GENERATIONS)
+    digest = hashlib.sha1(f'{scope}|{request.get_full_path()}|{generations}'.encode()).hexdigest()
+    key = f'analytics:reliability:{digest}'
+
+    report = caches['default'].get(key)
+    if report is None:
+        claims = view.filter_queryset(view.get_queryset())
+        vehicles = visible_vehicles(user).filter(**get_vehicle_conditions(view))
+        report = compute(claims, vehicles)
+        caches['default'].set(key, report, timeout=settings.ANALYTICS_CACHE_TTL)
+    return add_names(report)
@@ -1,6 +1,8 @@
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample, OpenApiResponse
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
 from drf_spectacular.types import OpenApiTypes
 
+from .models import ComponentSerial
 from .serializers import (
     ReferenceDirectorySerializer,
     ClientsSerializer,
@@ -10,6 +12,37 @@ from .serializers import (
     WarrantyClaimSerializer
 )
 
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Описание аутентификации app.authentication.StatelessJWTAuthentication (Bearer JWT) для схемы."""
+
+    target_class = 'app.authentication.StatelessJWTAuthentication'
+
+
+# Ответ пакетной записи (action bulk ТО и рекламаций, app.bulk)
+BULK_RESULT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'created': {'type': 'array', 'items': {'type': 'object', 'properties': {
+            'index': {'type': 'integer'}, 'id': {'type': 'integer'}}}},
+        'updated': {'type': 'array', 'items': {'type': 'object', 'properties': {
+            'index': {'type': 'integer'}, 'id': {'type': 'integer'}}}},
+        'errors': {'type': 'array', 'items': {'type': 'object', 'properties': {
+            'index': {'type': 'integer'}, 'errors': {'type': 'object'}}}},
+    }
+}
+
+# Формат выгрузки (action export техники, ТО и рекламаций, app.export)
+EXPORT_FILETYPE_PARAMETER = OpenApiParameter(
+    name="filetype",
+    location=OpenApiParameter.QUERY,
+    description="Формат файла",
+    required=False,
+    type=str,
+    enum=["csv", "xlsx"],
+    default="csv"
+)
+
 reference_directory_schema = extend_schema_view(
     list=extend_schema(
         summary="Получить список всех справочников",
@@ -270,7 +303,9 @@ service_organization_schema = extend_schema_view(
 vehicle_schema = extend_schema_view(
     list=extend_schema(
         summary="Получить список машин",
-        description="Возвращает список машин с учетом прав доступа пользователя.",
+        description="Возвращает список машин с учетом прав доступа пользователя. Каждая машина содержит "
+                    "сводку по ТО и рекламациям (stats), по ее показателям можно сортировать: "
+                    "ordering=-open_claims.",
         responses={
             200: VehicleSerializer(many=True),
             401: OpenApiResponse(description="Не авторизован"),
@@ -334,6 +369,14 @@ vehicle_schema = extend_schema_view(
                         "service": {
                             "id": 3,
                             "fullname": "ООО Сервисная компания 1"
+                        },
+                        "stats": {
+                            "maintenance_count": 3,
+                            "last_maintenance_date": "2023-04-12",
+                            "claim_count": 1,
+                            "open_claims": 0,
+                            "total_downtime": 4,
+                            "operating_time": 1250
                         }
                     }
                 ],
@@ -478,6 +521,83 @@ vehicle_schema = extend_schema_view(
             403: OpenApiResponse(description="Нет прав доступа"),
             404: OpenApiResponse(description="Машина не найдена")
         }
+    ),
+    export=extend_schema(
+        summary="Выгрузить технику",
+        description="Выгрузка техники с учетом прав доступа, фильтров, поиска и сортировки списка. "
+                    "CSV (UTF-8, разделитель «;») отправляется потоком; XLSX доступен при установленном openpyxl. "
+                    "Колонки совпадают с форматом импорта.",
+        parameters=[EXPORT_FILETYPE_PARAMETER],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.BINARY,
+            (200, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'): OpenApiTypes.BINARY,
+            400: OpenApiResponse(description="Неизвестный формат или XLSX недоступен"),
+            401: OpenApiResponse(description="Не авторизован")
+        }
+    ),
+    lookup=extend_schema(
+        summary="Найти машину по номеру агрегата",
+        description="Находит машину по точному заводскому номеру машины, двигателя, трансмиссии, ведущего "
+                    "или управляемого моста (индекс ComponentSerial) с учетом прав доступа. Неаутентифицированным "
+                    "пользователям машина выдается в публичном виде.",
+        parameters=[
+            OpenApiParameter(name='serial', type=OpenApiTypes.STR, required=True, description="Заводской номер")
+        ],
+        responses={
+            200: OpenApiResponse(
+                response={
+                    'type': 'object',
+                    'properties': {
+                        'serial': {'type': 'string'},
+                        'results': {'type': 'array', 'items': {'type': 'object', 'properties': {
+                            'kind': {'type': 'string', 'enum': [kind for kind, _ in ComponentSerial.KINDS]},
+                            'vehicle': {'type': 'object'},
+                        }}},
+                    }
+                },
+                description="Машины с этим номером и тип номера"
+            ),
+            400: OpenApiResponse(description="Не указан номер"),
+            404: OpenApiResponse(description="Номер не найден")
+        },
+        examples=[
+            OpenApiExample(
+                "Пример ответа",
+                value={"serial": "236254", "results": [{"kind": "engine", "vehicle": {"factory_number": "0017"}}]},
+                response_only=True,
+                status_codes=["200"]
+            )
+        ]
+    ),
+    autocomplete=extend_schema(
+        summary="Подсказка заводских номеров",
+        description="Заводские номера машин и агрегатов, начинающиеся с prefix (с учетом регистра), "
+                    "в порядке возрастания, с учетом прав доступа.",
+        parameters=[
+            OpenApiParameter(name='prefix', type=OpenApiTypes.STR, required=True, description="Начало номера"),
+            OpenApiParameter(name='limit', type=OpenApiTypes.INT,
+                             description="Число номеров (по умолчанию 10, максимум 50)"),
+        ],
+        responses={
+            200: OpenApiResponse(
+                response={'type': 'array', 'items': {'type': 'object', 'properties': {
+                    'serial': {'type': 'string'},
+                    'kind': {'type': 'string', 'enum': [kind for kind, _ in ComponentSerial.KINDS]},
+                    'factory_number': {'type': 'string'},
+                }}},
+                description="Подходящие номера"
+            ),
+            400: OpenApiResponse(description="Не указано начало номера")
+        },
+        examples=[
+            OpenApiExample(
+                "Пример ответа",
+                value=[{"serial": "2362", "kind": "drive_bridge", "factory_number": "0011"},
+                       {"serial": "236254", "kind": "engine", "factory_number": "0017"}],
+                response_only=True,
+                status_codes=["200"]
+            )
+        ]
     )
 )
 
@@ -648,6 +768,43 @@ maintenance_schema = extend_schema_view(
             403: OpenApiResponse(description="Нет прав доступа"),
             404: OpenApiResponse(description="ТО не найдено")
         }
+    ),
+    bulk=extend_schema(
+        summary="Пакетная запись ТО",
+        description="Принимает список записей в формате создания; строки с полем id изменяют существующие записи. "
+                    "Некорректные строки не записываются, ошибки возвращаются по индексам строк.",
+        request=MaintenanceSerializer(many=True),
+        responses={
+            201: OpenApiResponse(response=BULK_RESULT_SCHEMA, description="Записана хотя бы одна строка"),
+            400: OpenApiResponse(response=BULK_RESULT_SCHEMA, description="Ни одна строка не записана"),
+            401: OpenApiResponse(description="Не авторизован"),
+            403: OpenApiResponse(description="Нет прав доступа")
+        },
+        examples=[
+            OpenApiExample(
+                "Пример ответа",
+                value={
+                    "created": [{"index": 0, "id": 15}],
+                    "updated": [{"index": 1, "id": 3}],
+                    "errors": [{"index": 2, "errors": {"order_date": ["Обязательное поле."]}}]
+                },
+                response_only=True,
+                status_codes=["201"]
+            )
+        ]
+    ),
+    export=extend_schema(
+        summary="Выгрузить ТО",
+        description="Выгрузка записей ТО с учетом прав доступа, фильтров, поиска и сортировки списка. "
+                    "CSV (UTF-8, разделитель «;») отправляется потоком; XLSX доступен при установленном openpyxl. "
+                    "Колонки совпадают с форматом импорта.",
+        parameters=[EXPORT_FILETYPE_PARAMETER],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.BINARY,
+            (200, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'): OpenApiTypes.BINARY,
+            400: OpenApiResponse(description="Неизвестный формат или XLSX недоступен"),
+            401: OpenApiResponse(description="Не авторизован")
+        }
     )
 )
 
@@ -840,5 +997,178 @@ warranty_claim_schema = extend_schema_view(
             403: OpenApiResponse(description="Нет прав доступа"),
             404: OpenApiResponse(description="Рекламация не найдена")
         }
+    ),
+    bulk=extend_schema(
+        summary="Пакетная запись рекламаций",
+        description="Принимает список записей в формате создания; строки с полем id изменяют существующие записи. "
+                    "Некорректные строки не записываются, ошибки возвращаются по индексам строк.",
+        request=WarrantyClaimSerializer(many=True),
+        responses={
+            201: OpenApiResponse(response=BULK_RESULT_SCHEMA, description="Записана хотя бы одна строка"),
+            400: OpenApiResponse(response=BULK_RESULT_SCHEMA, description="Ни одна строка не записана"),
+            401: OpenApiResponse(description="Не авторизован"),
+            403: OpenApiResponse(description="Нет прав доступа")
+        },
+        examples=[
+            OpenApiExample(
+                "Пример ответа",
+                value={
+                    "created": [{"index": 0, "id": 15}],
+                    "updated": [{"index": 1, "id": 3}],
+                    "errors": [{"index": 2, "errors": {"order_date": ["Обязательное поле."]}}]
+                },
+                response_only=True,
+                status_codes=["201"]
+            )
+        ]
+    ),
+    export=extend_schema(
+        summary="Выгрузить рекламации",
+        description="Выгрузка рекламаций с учетом прав доступа, фильтров, поиска и сортировки списка. "
+                    "CSV (UTF-8, разделитель «;») отправляется потоком; XLSX доступен при установленном openpyxl. "
+                    "Колонки совпадают с форматом импорта.",
+        parameters=[EXPORT_FILETYPE_PARAMETER],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.BINARY,
+            (200, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'): OpenApiTypes.BINARY,
+            400: OpenApiResponse(description="Неизвестный формат или XLSX недоступен"),
+            401: OpenApiResponse(description="Не авторизован")
+        }
+    ),
+    analytics=extend_schema(
+        summary="Показатели надежности",
+        description="MTBF (средняя наработка между отказами, м/час), интенсивность отказов (на 1000 м/час "
+                    "наработки машин группы) и время простоя (среднее и перцентили, дни) по узлам отказа, "
+                    "моделям техники и сервисным компаниям. Считается по рекламациям с учетом прав доступа "
+                    "и фильтров списка. Требует установленного numpy.",
+        responses={
+            200: OpenApiTypes.OBJECT,
+            401: OpenApiResponse(description="Не авторизован"),
+            503: OpenApiResponse(description="Аналитика недоступна: не установлен numpy")
+        },
+        examples=[
+            OpenApiExample(
+                "Пример ответа",
+                value={
+                    "claims": 42,
+                    "operating_time": 61250,
+                    "node_fail": [
+                        {
+                            "id": 12,
+                            "name": "Двигатель",
+                            "failures": 9,
+                            "mtbf": 412.5,
+                            "failure_rate": 0.15,
+                            "downtime": {"mean": 6.2, "p50": 5.0, "p90": 11.4, "p95": 14.2}
+                        }
+                    ],
+                    "vehicle_model": [],
+                    "service": []
+                },
+                response_only=True,
+                status_codes=["200"]
+            )
+        ]
     )
-)
\ No newline at end of file
+)
+
+fleet_import_schema = extend_schema(
+    summary="Импорт техники, ТО или рекламаций",
+    description="Импорт из файла CSV или XLSX (только для менеджеров). Колонки называются как поля модели "
+                "или их подписи; справочники указываются названием, клиенты и сервисные компании — логином, "
+                "машина в ТО и рекламациях — заводским номером. Уже импортированные машины и ТО пропускаются; "
+                "прерванный импорт продолжается с skip=processed.",
+    request={
+        'multipart/form-data': {
+            'type': 'object',
+            'properties': {
+                'file': {'type': 'string', 'format': 'binary'},
+                'kind': {'type': 'string', 'enum': ['vehicles', 'maintenances', 'claims']},
+                'skip': {'type': 'integer', 'description': 'Пропустить первые N строк данных'},
+            },
+            'required': ['file', 'kind'],
+        }
+    },
+    responses={
+        200: OpenApiResponse(
+            response={
+                'type': 'object',
+                'properties': {
+                    'processed': {'type': 'integer'},
+                    'created': {'type': 'integer'},
+                    'skipped': {'type': 'integer'},
+                    'errors': {'type': 'array', 'items': {'type': 'object', 'properties': {
+                        'row': {'type': 'integer'}, 'errors': {'type': 'object'}}}},
+                }
+            },
+            description="Отчет об импорте"
+        ),
+        400: OpenApiResponse(description="Файл не удалось прочитать"),
+        401: OpenApiResponse(description="Не авторизован"),
+        403: OpenApiResponse(description="Нет прав доступа")
+    },
+    examples=[
+        OpenApiExample(
+            "Пример ответа",
+            value={
+                "processed": 3,
+                "created": 2,
+                "skipped": 0,
+                "errors": [{"row": 3, "errors": {"vehicle_model": ["Нет в справочнике «Модель техники»"]}}]
+            },
+            response_only=True,
+            status_codes=["200"]
+        )
+    ]
+)
+
+search_schema = extend_schema(
+    summary="Поиск по технике и рекламациям",
+    description="Полнотекстовый поиск (SQLite FTS5) по заводскому номеру, грузополучателю, адресу поставки "
+                "и комплектации техники, описанию отказа и запасным частям рекламаций. Ищется часть слова "
+                "или номера без учета регистра; каждое слово не короче 3 символов, слова объединяются по И. "
+                "Результаты ограничены ролью пользователя (клиент — своя техника, сервисная компания — "
+                "обслуживаемая, менеджер — вся) и упорядочены по релевантности (rank: меньше — лучше).",
+    parameters=[
+        OpenApiParameter(name='q', type=OpenApiTypes.STR, required=True, description="Строка поиска"),
+        OpenApiParameter(name='type', type=OpenApiTypes.STR, many=True, enum=['vehicle', 'claim'],
+                         description="Тип записей (можно указать несколько раз); по умолчанию все"),
+        OpenApiParameter(name='limit', type=OpenApiTypes.INT,
+                         description="Число результатов (по умолчанию 20, максимум 100)"),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response={
+                'type': 'object',
+                'properties': {
+                    'count': {'type': 'integer'},
+                    'results': {'type': 'array', 'items': {'type': 'object', 'properties': {
+                        'type': {'type': 'string', 'enum': ['vehicle', 'claim']},
+                        'id': {'type': 'integer'},
+                        'rank': {'type': 'number'},
+                    }}},
+                }
+            },
+            description="Найденные записи"
+        ),
+        400: OpenApiResponse(description="Пустая или слишком короткая строка поиска"),
+        401: OpenApiResponse(description="Не авторизован")
+    },
+    examples=[
+        OpenApiExample(
+            "Пример ответа",
+            value={
+                "count": 2,
+                "results": [
+                    {"type": "vehicle", "id": 1, "factory_number": "0017", "recipient": "ООО «Лесхоз»",
+                     "delivery_address": "г. Петрозаводск", "rank": -1.52},
+                    {"type": "claim", "id": 5, "vehicle": {"id": 1, "number": "0017"},
+                     "failure_date": "2023-04-12", "fail_description": "Течь масла из-под крышки",
+                     "spare_parts": "Прокладка крышки", "rank": -0.87}
+                ]
+            },
+            response_only=True,
+            status_codes=["200"]
+        )
+    ]
+)
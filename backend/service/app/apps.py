@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        """Подключает обработчики сигналов моделей и счетчик SQL-запросов (app.timing)."""
+        from . import signals  # noqa: F401
+        from .timing import install_query_timer
+
+        connection_created.connect(install_query_timer, dispatch_uid='app.timing')
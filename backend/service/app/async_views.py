@@ -0,0 +1,119 @@
+"""
+Асинхронные варианты нагруженных эндпоинтов чтения (/api/async/...).
+
+Под ASGI (service/asgi.py) синхронное представление занимает поток на все время
+запроса, включая ожидание SQLite. Эти представления выполняются в цикле событий:
+строки читаются async ORM (async for по values_list() проекции), справочники —
+из снимка процесса (reference_cache.aget_snapshot), публичная карточка — из кэша
+карточек (public_cache.aget_public_vehicle). Номера поколений этих кэшей читаются
+из общего кэша через aget() (app.cache.aget_generation) и не блокируют цикл событий.
+
+Аутентификация, права доступа, выборка по роли, фильтры, поиск, сортировка и
+формат ответа — те же, что у синхронных ViewSet: представление создает экземпляр
+соответствующего ViewSet и вызывает его initial() (аутентификация и права доступа,
+в потоке — токены без роли в claims читают пользователя из БД), get_queryset() и
+filter_queryset(). Ограничение частоты запросов — ThrottleMiddleware по атрибуту cls.
+
+Отличия от синхронных маршрутов: нет условных запросов (ETag/304) и потоковой
+выдачи (stream=1); страница keyset-пагинации читается в потоке синхронным ORM.
+Под WSGI представления тоже работают, но без выигрыша (цикл событий на запрос).
+
+Маршруты:
+    GET /api/async/references/
+    GET /api/async/vehicles/
+    GET /api/async/maintenances/
+    GET /api/async/claims/
+    GET /api/async/public/vehicles/<factory_number>/ — публичная карточка (как у анонимного пользователя)
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.views.decorators.http import require_safe
+from rest_framework.response import Response
+
+from . import public_cache, reference_cache
+from .projections import PROJECTIONS
+from .timing import timed
+from .views import ReferenceDirectoryViewSet, VehicleViewSet, MaintenanceViewSet, WarrantyClaimViewSet
+
+
+async def run_view(viewset_class, action, handler, request, **kwargs):
+    """
+    Выполняет асинхронный обработчик в окружении ViewSet: аутентификация, права доступа, обработка ошибок.
+
+    Args:
+        viewset_class: Класс ViewSet синхронного маршрута
+        action (str): Действие ViewSet (list, retrieve)
+        handler: Корутина handler(view) -> Response | HttpResponse
+        request: Запрос Django
+        **kwargs: Параметры маршрута
+
+    Returns:
+        HttpResponse: Готовый ответ
+    """
+    view = viewset_class(action_map={'get': action, 'head': action}, action=action, format_kwarg=None)
+    view.setup(request, **kwargs)
+    drf_request = view.initialize_request(request, **kwargs)
+    view.request = drf_request
+    view.headers = view.default_response_headers
+    try:
+        await sync_to_async(view.initial)(drf_request, **kwargs)
+        response = await handler(view)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    response = view.finalize_response(drf_request, response, **kwargs)
+    if isinstance(response, Response):
+        with timed('render'):
+            response.render()
+    return response
+
+
+async def list_projected(view):
+    """Список через проекцию сериализатора (как ProjectedListMixin.list)."""
+    projection = PROJECTIONS[view.get_serializer_class()]
+    rows = view.get_projected_rows(projection)
+    paginator = view.paginator
+    if paginator is not None and paginator.is_requested(view.request):
+        page = await sync_to_async(view.paginate_queryset)(rows)
+        return view.get_paginated_response(await projection.aserialize(page))
+    return Response(await projection.aserialize(rows))
+
+
+async def list_references(view):
+    """Список справочников из снимка процесса."""
+    snapshot = await reference_cache.aget_snapshot()
+    return Response(snapshot.serialized(view.get_serializer_class()))
+
+
+async def retrieve_public_vehicle(view):
+    """Публичная карточка машины из кэша карточек."""
+    vehicle = await public_cache.aget_public_vehicle(view.kwargs['factory_number'])
+    if vehicle.content is None:
+        raise Http404
+    return public_cache.build_response(view.request._request, vehicle)
+
+
+def async_view(viewset_class, action, handler):
+    """
+    Создает асинхронное представление Django (только GET и HEAD).
+
+    Атрибут cls — класс ViewSet: по нему ThrottleMiddleware применяет ограничение частоты запросов;
+    cls и actions дают имя для замеров app.timing (VehicleViewSet.list) и бюджет SQL-запросов (app.query_budget).
+    initkwargs schema=None исключает маршрут из OpenAPI-схемы: он повторяет синхронный маршрут.
+    """
+    @require_safe
+    async def view(request, **kwargs):
+        return await run_view(viewset_class, action, handler, request, **kwargs)
+
+    view.cls = viewset_class
+    view.actions = {'get': action, 'head': action}
+    view.initkwargs = {'schema': None}
+    view.__name__ = f'async_{viewset_class.__name__}_{action}'
+    return view
+
+
+reference_list = async_view(ReferenceDirectoryViewSet, 'list', list_references)
+vehicle_list = async_view(VehicleViewSet, 'list', list_projected)
+maintenance_list = async_view(MaintenanceViewSet, 'list', list_projected)
+claim_list = async_view(WarrantyClaimViewSet, 'list', list_projected)
+public_vehicle = async_view(VehicleViewSet, 'retrieve', retrieve_public_vehicle)
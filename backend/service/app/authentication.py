@@ -0,0 +1,145 @@
+"""
+Аутентификация по JWT без запроса пользователя из БД.
+
+Стандартный JWTAuthentication на каждый запрос выбирает пользователя из app_user,
+хотя представлениям и правам доступа нужны только id и роль. Токены, выданные
+CustomTokenObtainPairSerializer, содержат эти данные в claims (user_id, type),
+и пользователь запроса собирается прямо из проверенного токена (ClaimsUser).
+
+Токены без claim type (выданные до его появления) обрабатываются по-старому,
+с запросом пользователя из БД.
+
+Подпись токена проверяется один раз за запрос: ThrottleMiddleware и аутентификация
+DRF получают проверенный токен через get_request_token(), результат хранится в запросе.
+
+Отзыв токенов: при изменении или удалении пользователя (смена роли, пароля,
+блокировка) момент изменения записывается в общий кэш на время жизни
+refresh-токена, и access- и refresh-токены, выданные не позже этой секунды, отклоняются —
+пользователь входит заново и получает токены с актуальной ролью. Время выдачи токена
+(iat) хранится в целых секундах, поэтому токены, выданные в ту же секунду, что и
+изменение, тоже отзываются: иначе токен со старой ролью пережил бы изменение.
+Отключается настройкой JWT_REVOCATION = False.
+"""
+
+from time import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .timing import timed
+
+
+def _revocation_key(user_id):
+    """Ключ момента отзыва токенов пользователя в общем кэше."""
+    return f'jwt-revoked:{user_id}'
+
+
+def revoke_tokens(user_id):
+    """
+    Отзывает все токены пользователя, выданные до текущего момента, включая текущую секунду.
+
+    Момент отзыва хранится в целых секундах, как iat токена. Запись живет столько же,
+    сколько refresh-токен: более старые токены и так истекли.
+
+    Args:
+        user_id (int): id пользователя
+    """
+    timeout = jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+    caches['shared'].set(_revocation_key(user_id), int(time()), timeout=timeout)
+
+
+def is_revoked(token):
+    """
+    Проверяет, отозван ли токен.
+
+    Args:
+        token: Проверенный access- или refresh-токен
+
+    Returns:
+        bool: True, если токен выдан не позже секунды последнего изменения пользователя
+    """
+    if not settings.JWT_REVOCATION:
+        return False
+    revoked_at = caches['shared'].get(_revocation_key(token.get(jwt_settings.USER_ID_CLAIM)))
+    return revoked_at is not None and token.get('iat', 0) <= revoked_at
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь запроса, собранный из claims access-токена.
+
+    Поддерживает то, что используют представления и права доступа: pk/id,
+    роль (type) и is_authenticated. Для фильтрации выборок используется pk
+    (client_id=user.pk), а не сам объект пользователя.
+    """
+
+    @cached_property
+    def id(self):
+        """id пользователя: simplejwt хранит claim строкой, а права доступа сравнивают его с client_id."""
+        return int(self.token[jwt_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def type(self):
+        """Роль пользователя (CL, SO, MR)."""
+        return self.token['type']
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """JWT-аутентификация без запроса к БД для токенов с ролью в claims."""
+
+    def authenticate(self, request):
+        """Проверяет токен из заголовка Authorization (время входит в этап auth app.timing)."""
+        with timed('auth'):
+            validated_token = self.get_request_token(request)
+            if validated_token is None:
+                return None
+            return self.get_user(validated_token), validated_token
+
+    def get_request_token(self, request):
+        """
+        Возвращает access-токен запроса, проверяя его подпись один раз за запрос.
+
+        Результат проверки (токен или ошибка) сохраняется в запросе Django: запрос DRF
+        читает атрибуты исходного запроса, поэтому токен, проверенный в ThrottleMiddleware,
+        аутентификация DRF не проверяет повторно.
+
+        Args:
+            request: Запрос Django или DRF
+
+        Returns:
+            Token | None: Проверенный токен (None, если токена в запросе нет)
+
+        Raises:
+            InvalidToken: Если токен недействителен
+        """
+        checked = getattr(request, '_jwt_checked', None)
+        if checked is None:
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header is not None else None
+            try:
+                checked = (self.get_validated_token(raw_token) if raw_token is not None else None), None
+            except InvalidToken as exc:
+                checked = None, exc
+            getattr(request, '_request', request)._jwt_checked = checked
+        validated_token, error = checked
+        if error is not None:
+            raise error
+        return validated_token
+
+    def get_user(self, validated_token):
+        """
+        Возвращает пользователя по токену.
+
+        Raises:
+            InvalidToken: Если токен отозван или не содержит id пользователя
+        """
+        if 'type' not in validated_token:
+            return super(JWTStatelessUserAuthentication, self).get_user(validated_token)
+        if is_revoked(validated_token):
+            raise InvalidToken('Токен отозван')
+        return super().get_user(validated_token)
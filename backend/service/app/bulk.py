@@ -0,0 +1,282 @@
+"""
+Пакетная запись ТО и рекламаций.
+
+Сервисные организации вносят ТО и рекламации пачками по сотни строк. Вместо
+отдельного запроса на каждую ссылку и проверку каждой строки пачка обрабатывается так:
+- справочники проверяются по кэшу справочников, машины и сервисные компании
+  загружаются одним запросом на тип ссылки;
+- уникальность номера заказ-наряда и вида ТО проверяется для всей пачки
+  одним запросом на ограничение;
+- новые записи вставляются через bulk_create, изменяемые — через bulk_update.
+
+Ошибки возвращаются построчно (по индексу строки) и не отменяют остальные строки.
+
+Формат запроса — список объектов в формате обычного POST/PUT; строки с полем id
+обновляют существующие записи. Формат ответа:
+    {"created": [{"index": 0, "id": 15}], "updated": [...], "errors": [{"index": 2, "errors": {...}}]}
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import vehicle_stats
+from .models import Vehicle, Maintenance, WarrantyClaim
+from .serializers import MaintenanceBulkSerializer, WarrantyClaimBulkSerializer, integrity_error_detail
+
+User = get_user_model()
+
+
+def visible_vehicles(user):
+    """
+    Машины, доступные пользователю (те же правила, что у VehicleViewSet.get_queryset).
+
+    Args:
+        user: Аутентифицированный пользователь
+
+    Returns:
+        QuerySet: Выборка машин
+    """
+    queryset = Vehicle.objects.all()
+    if user.type == 'MR':
+        return queryset
+    elif user.type == 'CL':
+        return queryset.filter(client_id=user.pk)
+    elif user.type == 'SO':
+        return queryset.filter(service_id=user.pk)
+    return queryset.none()
+
+
+def _ids(rows, key):
+    """Собирает целочисленные id по ключу из строк запроса, пропуская некорректные значения."""
+    ids = set()
+    for row in rows:
+        if not isinstance(row, dict) or isinstance(row.get(key), bool):
+            continue
+        try:
+            ids.add(int(row[key]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ids
+
+
+class BulkWriter:
+    """
+    Базовый класс пакетной записи для ViewSet.
+
+    Атрибуты:
+        model: Модель записываемых объектов
+        serializer_class: Сериализатор строки (со ссылками из предзагруженного контекста)
+    """
+
+    model = None
+    serializer_class = None
+
+    def __init__(self, view):
+        self.view = view
+        self.request = view.request
+
+    def get_context(self, rows):
+        """Предзагруженные связанные объекты для строк пачки (ключ контекста -> {id: объект})."""
+        return {'vehicles': visible_vehicles(self.request.user).in_bulk(_ids(rows, 'vehicle_id'))}
+
+    def get_existing(self, rows):
+        """
+        Загружает изменяемые записи одним запросом и проверяет права на каждую.
+
+        Returns:
+            dict: Доступные для изменения записи по id
+        """
+        ids = _ids(rows, 'id')
+        if not ids:
+            return {}
+        instances = self.view.get_queryset().select_related(None).select_related('vehicle').in_bulk(ids)
+        return {pk: instance for pk, instance in instances.items() if self.has_permission(instance)}
+
+    def has_permission(self, instance):
+        """Проверяет права ViewSet на запись объекта (в том числе еще не сохраненного)."""
+        return all(
+            permission.has_object_permission(self.request, self.view, instance)
+            for permission in self.view.get_permissions()
+        )
+
+    def check_batch(self, entries):
+        """
+        Проверки, которые выполняются для всей пачки сразу (например, уникальность).
+
+        Args:
+            entries (list): Кортежи (индекс, объект или None, validated_data) прошедших валидацию строк
+
+        Returns:
+            dict: Ошибки по индексу строки
+        """
+        return {}
+
+    def prepare(self, instance):
+        """Подготовка объекта к записи в обход save() (вычисляемые поля)."""
+        return instance
+
+    def save(self, rows):
+        """
+        Валидирует и записывает пачку строк.
+
+        Args:
+            rows (list): Данные строк
+
+        Returns:
+            dict: Созданные и обновленные записи и ошибки по индексам строк
+
+        Raises:
+            ValidationError: Если запрос не является списком или превышает API_BULK_MAX_ROWS
+        """
+        if not isinstance(rows, list):
+            raise ValidationError({'non_field_errors': ['Ожидался список записей']})
+        if len(rows) > settings.API_BULK_MAX_ROWS:
+            raise ValidationError({'non_field_errors': [f'Не более {settings.API_BULK_MAX_ROWS} записей за запрос']})
+
+        errors = {}
+        existing = self.get_existing(rows)
+        context = {**self.view.get_serializer_context(), **self.get_context(rows)}
+
+        entries = []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[index] = {'non_field_errors': ['Ожидался объект']}
+                continue
+
+            instance = None
+            if row.get('id') is not None:
+                instance = existing.get(next(iter(_ids([row], 'id')), None))
+                if instance is None:
+                    errors[index] = {'id': ['Запись не найдена']}
+                    continue
+
+            serializer = self.serializer_class(instance, data=row, context=context)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            entries.append((index, instance, serializer.validated_data))
+
+        errors.update(self.check_batch(entries))
+        entries = [entry for entry in entries if entry[0] not in errors]
+
+        created, updated = self.write(entries, errors)
+        return {
+            'created': created,
+            'updated': updated,
+            'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+        }
+
+    def write(self, entries, errors):
+        """
+        Записывает строки: bulk_create для новых и bulk_update для изменяемых.
+
+        Если пачку не удалось записать целиком (параллельный запрос занял уникальное
+        значение между проверкой и записью), строки записываются по одной, и ошибка
+        попадает только в свою строку — с тем же сообщением, что дает сериализатор.
+
+        Returns:
+            tuple: (созданные, обновленные) — списки {'index', 'id'}
+        """
+        now = timezone.now()
+        to_create, to_update, fields = [], [], {'updated_at'}
+        for index, instance, data in entries:
+            if instance is None:
+                instance = self.model(**data)
+                if not self.has_permission(instance):
+                    errors[index] = {'non_field_errors': ['Нет прав на создание записи']}
+                    continue
+                to_create.append((index, self.prepare(instance)))
+                continue
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+            instance.updated_at = now
+            fields.update(data)
+            to_update.append((index, self.prepare(instance)))
+
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create([obj for _, obj in to_create], batch_size=settings.API_BULK_BATCH_SIZE)
+                if to_update:
+                    self.model.objects.bulk_update([obj for _, obj in to_update], self.get_update_fields(fields),
+                                                   batch_size=settings.API_BULK_BATCH_SIZE)
+                # bulk_create и bulk_update не отправляют сигналы: сводка машин пересчитывается здесь
+                vehicle_stats.refresh(
+                    vehicle_id for _, obj in to_create + to_update for vehicle_id in obj.get_stats_vehicle_ids()
+                )
+        except IntegrityError:
+            for index, obj in to_create + to_update:
+                try:
+                    with transaction.atomic():
+                        obj.save()
+                except IntegrityError as exc:
+                    errors[index] = integrity_error_detail(exc, self.model)
+            to_create = [(index, obj) for index, obj in to_create if index not in errors]
+            to_update = [(index, obj) for index, obj in to_update if index not in errors]
+
+        return (
+            [{'index': index, 'id': obj.pk} for index, obj in to_create],
+            [{'index': index, 'id': obj.pk} for index, obj in to_update],
+        )
+
+    def get_update_fields(self, fields):
+        """Поля для bulk_update."""
+        return sorted(fields)
+
+
+class MaintenanceBulkWriter(BulkWriter):
+    """Пакетная запись ТО с проверкой уникальности номера заказ-наряда и вида ТО для машины."""
+
+    model = Maintenance
+    serializer_class = MaintenanceBulkSerializer
+
+    def check_batch(self, entries):
+        """Проверяет уникальность order_number и (vehicle, maintenance_type) внутри пачки и в БД."""
+        errors = {}
+        own_ids = {instance.pk for _, instance, _ in entries if instance is not None}
+
+        numbers = {data['order_number'] for _, _, data in entries}
+        taken_numbers = set(
+            Maintenance.objects.filter(order_number__in=numbers).exclude(id__in=own_ids)
+            .values_list('order_number', flat=True)
+        )
+        vehicle_ids = {data['vehicle'].pk for _, _, data in entries}
+        taken_pairs = set(
+            Maintenance.objects.filter(vehicle_id__in=vehicle_ids).exclude(id__in=own_ids)
+            .values_list('vehicle_id', 'maintenance_type_id')
+        )
+
+        for index, _, data in entries:
+            pair = (data['vehicle'].pk, data['maintenance_type'].pk)
+            if data['order_number'] in taken_numbers:
+                errors[index] = {'order_number': ['Номер используется']}
+            elif pair in taken_pairs:
+                errors[index] = {'type': ['ТО уже существует']}
+            else:
+                taken_numbers.add(data['order_number'])
+                taken_pairs.add(pair)
+        return errors
+
+
+class WarrantyClaimBulkWriter(BulkWriter):
+    """Пакетная запись рекламаций с вычислением времени простоя для всей пачки."""
+
+    model = WarrantyClaim
+    serializer_class = WarrantyClaimBulkSerializer
+
+    def get_context(self, rows):
+        """Машины и сервисные компании пачки — по одному запросу."""
+        context = super().get_context(rows)
+        context['services'] = User.objects.filter(type='SO').in_bulk(_ids(rows, 'service_id'))
+        return context
+
+    def prepare(self, instance):
+        """Время простоя вычисляется здесь: bulk_create и bulk_update не вызывают save()."""
+        instance.compute_downtime()
+        return instance
+
+    def get_update_fields(self, fields):
+        """Время простоя обновляется вместе с датами."""
+        return sorted(fields | {'downtime'})
@@ -0,0 +1,119 @@
+"""
+Счетчики поколений для инвалидации кэшей, живущих в памяти процесса.
+
+Каждый воркер держит свои копии редко меняющихся данных (справочники и т.п.).
+Чтобы изменение, сделанное в одном процессе, сбрасывало копии во всех остальных,
+номер поколения хранится в общем кэше 'shared' (см. CACHES в settings).
+Процесс сравнивает номер поколения своей копии с общим и перечитывает данные,
+если они разошлись.
+
+Номер поколения — случайный токен, а не счетчик: если запись в общем кэше будет
+вытеснена, новое значение все равно не совпадет ни с одной из старых копий.
+
+Прочитанный номер процесс помнит GENERATION_CHECK_INTERVAL секунд: проверки справочников
+при валидации каждого поля и каждом запросе к списку не читают общий кэш (файл на диске).
+Изменения из других воркеров видны с этой задержкой, свои — сразу (bump_generation
+обновляет и локальную копию номера). Поколений может быть много (по одному на публичную
+карточку, см. app.public_cache), поэтому сверх LOCAL_GENERATIONS_LIMIT имен процесс
+забывает номера, прочитанные раньше GENERATION_CHECK_INTERVAL.
+"""
+
+import threading
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Номера поколений, прочитанные процессом: имя -> (номер, время чтения по monotonic())
+_local = {}
+_local_lock = threading.Lock()
+
+LOCAL_GENERATIONS_LIMIT = 10000
+
+
+def _key(name):
+    """Ключ счетчика поколения в общем кэше."""
+    return f'generation:{name}'
+
+
+def get_generation(name):
+    """
+    Возвращает текущий номер поколения данных.
+
+    Args:
+        name (str): Имя кэшируемого набора данных
+
+    Returns:
+        str | None: Номер поколения (None, если данные еще не менялись)
+    """
+    cached = _recent(name)
+    if cached is not None:
+        return cached[0]
+    generation = caches['shared'].get(_key(name))
+    _remember(name, generation)
+    return generation
+
+
+async def aget_generation(name):
+    """
+    Асинхронный get_generation() для асинхронных представлений (app.async_views).
+
+    Общий кэш читается через aget(), не блокируя цикл событий.
+
+    Args:
+        name (str): Имя кэшируемого набора данных
+
+    Returns:
+        str | None: Номер поколения (None, если данные еще не менялись)
+    """
+    cached = _recent(name)
+    if cached is not None:
+        return cached[0]
+    generation = await caches['shared'].aget(_key(name))
+    _remember(name, generation)
+    return generation
+
+
+def bump_generation(name):
+    """
+    Выдает новый номер поколения после фиксации текущей транзакции.
+
+    Смена номера откладывается до commit, иначе другой процесс мог бы успеть
+    перечитать еще не зафиксированные данные под новым номером поколения.
+
+    Args:
+        name (str): Имя кэшируемого набора данных
+    """
+    def publish():
+        generation = uuid4().hex
+        caches['shared'].set(_key(name), generation, timeout=None)
+        _remember(name, generation)
+
+    transaction.on_commit(publish)
+
+
+def _recent(name):
+    """Номер поколения, прочитанный процессом не раньше GENERATION_CHECK_INTERVAL секунд назад."""
+    cached = _local.get(name)
+    if cached is not None and monotonic() - cached[1] < settings.GENERATION_CHECK_INTERVAL:
+        return cached
+    return None
+
+
+def _remember(name, generation):
+    """Запоминает номер поколения, забывая устаревшие номера сверх LOCAL_GENERATIONS_LIMIT."""
+    now = monotonic()
+    with _local_lock:
+        _local[name] = (generation, now)
+        if len(_local) > LOCAL_GENERATIONS_LIMIT:
+            for stale in [key for key, (_, checked) in _local.items()
+                          if now - checked >= settings.GENERATION_CHECK_INTERVAL]:
+                del _local[stale]
+
+
+def forget_generations():
+    """Забывает прочитанные номера поколений: следующая проверка читает общий кэш (тесты, очистка кэша)."""
+    with _local_lock:
+        _local.clear()
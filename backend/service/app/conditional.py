@@ -0,0 +1,127 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для ViewSet'ов.
+
+Перед сериализацией ответа вычисляются дешевые валидаторы выборки: max(updated_at)
+и количество записей одним агрегирующим запросом, плюс хэш области видимости
+(пользователь, его роль, параметры запроса, формат ответа). Если клиент прислал
+совпадающий If-None-Match или If-Modified-Since, возвращается 304 без загрузки
+и сериализации моделей.
+
+Ответы встраивают строки других таблиц (номер машины в ТО, имена клиентов и
+сервисных организаций), поэтому ETag включает поколения этих таблиц
+(etag_generations). Их сменяют обработчики сигналов при любом изменении и удалении
+(app.signals). Last-Modified отдается только для одной записи: max(updated_at)
+списка не меняется при удалении записи, и If-Modified-Since вернул бы устаревший 304.
+"""
+
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_generation
+
+# Поколения строк, которые встраиваются в ответы других ViewSet (сменяются в app.signals)
+VEHICLE_GENERATION = 'vehicle-rows'
+USER_GENERATION = 'user-rows'
+
+
+class ConditionalGetMixin:
+    """
+    Примесь к ViewSet, добавляющая ETag и Last-Modified к list и retrieve.
+
+    Атрибуты:
+        updated_field (str): Поле с датой изменения записи
+        etag_generations (tuple): Поколения кэшей (app.cache), от которых зависит ответ,
+            например 'references' для вложенных справочников или USER_GENERATION для имен пользователей
+    """
+
+    updated_field = 'updated_at'
+    etag_generations = ()
+
+    def get_conditional_queryset(self):
+        """Выборка, которую вернет текущее действие: с учетом роли, фильтров и lookup."""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset.order_by()
+
+    def get_conditional_state(self):
+        """
+        Вычисляет состояние выборки для валидаторов.
+
+        Returns:
+            tuple: (строка состояния или None, если выборка пуста для retrieve;
+                    время последнего изменения или None)
+        """
+        stats = self.get_conditional_queryset().aggregate(
+            last_modified=Max(self.updated_field), count=Count('pk')
+        )
+        if self.action == 'retrieve' and not stats['count']:
+            return None, None
+        return f"{stats['count']}:{stats['last_modified']}", stats['last_modified']
+
+    def get_scope(self):
+        """Область видимости ответа: пользователь, роль, полный путь запроса и формат."""
+        user = self.request.user
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return ':'.join([
+            str(getattr(user, 'pk', None)),
+            str(getattr(user, 'type', '')),
+            self.request.get_full_path(),
+            getattr(renderer, 'format', ''),
+        ])
+
+    def get_conditional_validators(self):
+        """
+        Возвращает валидаторы ответа.
+
+        Returns:
+            tuple: (ETag или None, Last-Modified как timestamp или None)
+        """
+        state, last_modified = self.get_conditional_state()
+        if state is None:
+            return None, None
+
+        generations = ':'.join(str(get_generation(name)) for name in self.etag_generations)
+        digest = hashlib.sha1(f'{state}|{generations}|{self.get_scope()}'.encode()).hexdigest()
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified and self.action == 'retrieve' else None
+        return quote_etag(digest), timestamp
+
+    def conditional(self, handler, request, *args, **kwargs):
+        """
+        Выполняет handler, только если у клиента нет актуальной копии ответа.
+
+        Args:
+            handler: Метод действия родительского класса (list/retrieve)
+            request: Запрос
+
+        Returns:
+            Response | HttpResponseNotModified: Ответ с валидаторами или 304
+        """
+        etag, last_modified = self.get_conditional_validators()
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        response = not_modified or handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Ответ зависит от пользователя: кэшировать только в браузере и всегда перепроверять
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Список с поддержкой If-None-Match / If-Modified-Since."""
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Запись с поддержкой If-None-Match / If-Modified-Since."""
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,171 @@
+"""
+Выгрузка техники, ТО и рекламаций в CSV/XLSX.
+
+Выгрузка строится по той же выборке, что и список (get_queryset с ограничением
+по роли, фильтры и сортировка из параметров запроса), но читает ее через
+values_list(...).iterator(): названия справочников, пользователи и заводской
+номер машины берутся JOIN'ами в том же запросе.
+
+CSV отправляется потоком (StreamingHttpResponse) по мере чтения из БД — первые
+байты уходят клиенту сразу, память ограничена размером порции. XLSX пишется
+через openpyxl в режиме write_only (постоянный объем памяти) во временный файл
+и отправляется после записи; без openpyxl (requirements.txt) XLSX недоступен.
+
+Колонки совпадают с колонками импорта (app.fleet_import), поэтому выгруженный
+менеджером файл можно загрузить обратно командой import_fleet. Клиенты и
+сервисные организации указываются логинами только в выгрузке менеджера (импорт
+доступен только ему); остальные роли, как и в API, видят полные имена.
+"""
+
+import csv
+import tempfile
+from datetime import date
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from .fleet_import import IMPORTERS
+
+FILETYPE_QUERY_PARAM = 'filetype'
+CSV_DELIMITER = ';'
+
+# Колонки, которые выгружаются, но не читаются импортом (вычисляемые поля)
+EXTRA_COLUMNS = {'claims': ('downtime',)}
+
+
+class Echo:
+    """Псевдофайл для csv.writer: write() возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def get_columns(kind, usernames=False):
+    """
+    Колонки выгрузки по описанию импорта.
+
+    Args:
+        kind (str): Ключ IMPORTERS (vehicles, maintenances, claims)
+        usernames (bool): Пользователи — логинами, как в импорте (только для менеджера), иначе полными именами
+
+    Returns:
+        list: Кортежи (заголовок, путь ORM для values_list)
+    """
+    importer = IMPORTERS[kind]
+    model = importer.model
+    columns = []
+    for name in importer.fields + EXTRA_COLUMNS.get(kind, ()):
+        if name in importer.reference_fields:
+            path = f'{name}__name'
+        elif name in importer.user_fields:
+            path = f'{name}__username' if usernames else f'{name}__fullname'
+        elif name == 'vehicle':
+            path = 'vehicle__factory_number'
+        else:
+            path = name
+        columns.append((str(model._meta.get_field(name).verbose_name), path))
+    return columns
+
+
+def _cell(value):
+    """Значение ячейки CSV: даты в ISO, None — пустая строка."""
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(header, rows, batch_size):
+    """
+    Кодирует строки в CSV (UTF-8 с BOM, разделитель «;» — для Excel) по частям.
+
+    Args:
+        header (list): Заголовки колонок
+        rows (iterable): Кортежи значений
+        batch_size (int): Число строк в одной части ответа
+
+    Yields:
+        bytes: Очередная часть файла
+    """
+    writer = csv.writer(Echo(), delimiter=CSV_DELIMITER)
+    yield ('\ufeff' + writer.writerow(header)).encode()
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow([_cell(value) for value in row]))
+        if len(batch) >= batch_size:
+            yield ''.join(batch).encode()
+            batch = []
+    if batch:
+        yield ''.join(batch).encode()
+
+
+def write_xlsx(header, rows):
+    """
+    Записывает строки в XLSX в режиме write_only.
+
+    Returns:
+        file: Временный файл, позиционированный на начало
+
+    Raises:
+        ValidationError: Если openpyxl не установлен
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValidationError({FILETYPE_QUERY_PARAM: ['Выгрузка в XLSX недоступна: не установлен пакет openpyxl']})
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(list(row))
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+class ExportMixin:
+    """
+    Примесь к ViewSet: действие export (GET <список>/export/?filetype=csv|xlsx).
+
+    Доступно аутентифицированным пользователям, выгружает записи в пределах
+    get_queryset() с фильтрами, поиском и сортировкой списка.
+
+    Атрибуты:
+        export_kind (str): Ключ описания колонок (IMPORTERS в app.fleet_import)
+    """
+
+    export_kind = None
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request, *args, **kwargs):
+        """Выгрузка списка в CSV (потоком) или XLSX."""
+        if not request.user.is_authenticated:
+            self.permission_denied(request)
+
+        filetype = request.query_params.get(FILETYPE_QUERY_PARAM, 'csv')
+        if filetype not in ('csv', 'xlsx'):
+            raise ValidationError({FILETYPE_QUERY_PARAM: ['Ожидается csv или xlsx']})
+
+        columns = get_columns(self.export_kind, usernames=request.user.type == 'MR')
+        header = [title for title, _ in columns]
+        chunk_size = settings.API_STREAM_CHUNK_SIZE
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values_list(*(path for _, path in columns))
+            .iterator(chunk_size=chunk_size)
+        )
+        filename = f'{self.export_kind}-{date.today().isoformat()}.{filetype}'
+
+        if filetype == 'xlsx':
+            return FileResponse(
+                write_xlsx(header, rows), as_attachment=True, filename=filename,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        response = StreamingHttpResponse(iter_csv(header, rows, chunk_size), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
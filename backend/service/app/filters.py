@@ -0,0 +1,181 @@
+"""
+Серверная фильтрация списков техники, ТО и рекламаций.
+
+Фильтры объявляются декларативно в атрибуте filter_fields представления:
+ключ — имя query-параметра, значение — описание фильтра (Filter или RangeFilter).
+Набор допустимых фильтров для каждого эндпоинта ограничен белым списком: параметр
+с именем поля модели или lookup ORM (client__username), не описанный в filter_fields,
+отклоняется с ответом 400. Остальные параметры (пагинация, поиск, сортировка) к
+фильтрам не относятся и пропускаются.
+
+Пример:
+    filter_fields = {
+        'client': Filter('client_id', many=True),
+        'shipping_date': RangeFilter('shipping_date', parse=parse_date),
+    }
+
+    GET /api/vehicles/?client=3,4&shipping_date_from=2024-01-01
+"""
+
+from datetime import date
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_date(value):
+    """
+    Разбирает дату в формате ISO (YYYY-MM-DD).
+
+    Args:
+        value (str): Значение параметра
+
+    Returns:
+        date: Дата
+
+    Raises:
+        ValueError: Если формат даты неверный
+    """
+    return date.fromisoformat(value)
+
+
+class Filter:
+    """
+    Фильтр по точному совпадению.
+
+    Args:
+        lookup (str): Поле ORM, по которому выполняется фильтрация
+        parse (callable): Преобразование строкового значения параметра
+        many (bool): Разрешить несколько значений через запятую (lookup__in)
+        description (str): Описание параметра для OpenAPI-схемы
+    """
+
+    schema_type = {int: 'integer', parse_date: 'string', str: 'string'}
+
+    def __init__(self, lookup, parse=int, many=False, description=''):
+        self.lookup = lookup
+        self.parse = parse
+        self.many = many
+        self.description = description
+
+    def get_conditions(self, name, params):
+        """
+        Формирует условия фильтрации по значениям query-параметров.
+
+        Args:
+            name (str): Имя параметра
+            params (QueryDict): Параметры запроса
+
+        Returns:
+            dict: Аргументы для queryset.filter()
+
+        Raises:
+            ValidationError: Если значение параметра не удалось разобрать
+        """
+        raw = params.get(name)
+        if raw in (None, ''):
+            return {}
+
+        try:
+            if self.many:
+                return {f'{self.lookup}__in': [self.parse(value) for value in raw.split(',') if value]}
+            return {self.lookup: self.parse(raw)}
+        except ValueError:
+            raise ValidationError({name: 'Некорректное значение фильтра'})
+
+    def get_parameters(self, name):
+        """Возвращает описание query-параметров фильтра для OpenAPI-схемы."""
+        return [{
+            'name': name,
+            'required': False,
+            'in': 'query',
+            'description': self.description + (' (несколько значений через запятую)' if self.many else ''),
+            'schema': {'type': 'string' if self.many else self.schema_type.get(self.parse, 'string')},
+        }]
+
+
+class RangeFilter(Filter):
+    """
+    Фильтр по диапазону значений.
+
+    Порождает два параметра: <name>_from (>=) и <name>_to (<=).
+    """
+
+    def get_conditions(self, name, params):
+        """Формирует условия lookup__gte / lookup__lte по границам диапазона."""
+        conditions = {}
+        for suffix, operator in (('_from', 'gte'), ('_to', 'lte')):
+            raw = params.get(name + suffix)
+            if raw in (None, ''):
+                continue
+            try:
+                conditions[f'{self.lookup}__{operator}'] = self.parse(raw)
+            except ValueError:
+                raise ValidationError({name + suffix: 'Некорректное значение фильтра'})
+        return conditions
+
+    def get_parameters(self, name):
+        """Возвращает описание границ диапазона для OpenAPI-схемы."""
+        schema = {'type': self.schema_type.get(self.parse, 'string')}
+        return [
+            {'name': name + '_from', 'required': False, 'in': 'query',
+             'description': f'{self.description}: от (включительно)', 'schema': schema},
+            {'name': name + '_to', 'required': False, 'in': 'query',
+             'description': f'{self.description}: до (включительно)', 'schema': schema},
+        ]
+
+
+class DeclarativeFilterBackend(BaseFilterBackend):
+    """
+    Бэкенд фильтрации, применяющий фильтры из атрибута filter_fields представления.
+
+    Все условия объединяются в один вызов filter(), то есть в одно условие WHERE,
+    которое СУБД может обслужить индексом.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """
+        Применяет к выборке условия, заданные параметрами запроса.
+
+        Args:
+            request: Запрос
+            queryset: Исходная выборка (уже ограниченная по роли пользователя)
+            view: Представление
+
+        Returns:
+            QuerySet: Отфильтрованная выборка
+        """
+        filter_fields = getattr(view, 'filter_fields', {})
+        self.check_unknown_filters(request, queryset, filter_fields)
+        conditions = {}
+        for name, field in filter_fields.items():
+            conditions.update(field.get_conditions(name, request.query_params))
+
+        if conditions:
+            queryset = queryset.filter(**conditions)
+        return queryset
+
+    @staticmethod
+    def check_unknown_filters(request, queryset, filter_fields):
+        """
+        Отклоняет фильтры по полям, которых нет в белом списке filter_fields.
+
+        Raises:
+            ValidationError: Если параметр — поле модели или lookup ORM вне filter_fields
+        """
+        allowed = {
+            parameter['name'] for name, field in filter_fields.items() for parameter in field.get_parameters(name)
+        }
+        model_fields = set()
+        for field in queryset.model._meta.get_fields():
+            model_fields.update({field.name, getattr(field, 'attname', field.name)})
+        for param in request.query_params:
+            if param not in allowed and ('__' in param or param in model_fields):
+                raise ValidationError({param: 'Фильтр по этому полю не поддерживается'})
+
+    def get_schema_operation_parameters(self, view):
+        """Описание параметров фильтрации для drf-spectacular."""
+        parameters = []
+        for name, field in getattr(view, 'filter_fields', {}).items():
+            parameters.extend(field.get_parameters(name))
+        return parameters
@@ -0,0 +1,223 @@
+"""
+Генерация синтетического парка техники для нагрузочных замеров (команда generate_fleet).
+
+Генератор создает справочники (модели техники и узлов, виды ТО, узлы отказа,
+способы восстановления), клиентов и сервисные организации и заданное число машин
+с историей ТО и рекламаций. Распределения приближены к реальным данным:
+- машины распределены по клиентам неравномерно (вес клиента ~ 1 / ранг):
+  у нескольких клиентов большие парки, у большинства — единицы машин;
+- у машины от 0 до всех видов ТО (вид ТО — не больше одного раза, как требует
+  unique_vehicle_maintenance_type), чем старше машина, тем больше ТО;
+- рекламаций на машину в среднем claims_per_vehicle (геометрическое распределение),
+  половина рекламаций последних 30 дней еще не закрыта (дата восстановления в будущем).
+
+Все строки вставляются через bulk_create пачками по batch_size машин, каждая
+пачка — в одной транзакции вместе со сводкой машин (vehicle_stats.refresh).
+Индексы поиска и заводских номеров заполняются триггерами БД. Результат
+воспроизводим при одинаковом seed; номера машин начинаются с prefix и
+продолжают уже сгенерированные, поэтому генерацию можно повторять для роста БД.
+"""
+
+import random
+import re
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Substr
+
+from . import vehicle_stats
+from .cache import bump_generation
+from .conditional import VEHICLE_GENERATION
+from .models import ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim
+
+User = get_user_model()
+
+# Справочники: тип -> названия (виды ТО — в порядке проведения)
+REFERENCES = {
+    'model_tech': ['ПД1,5', 'ПД2,0', 'ПД2,5', 'ПД3,0', 'ПД5,0', 'ПГ1,5'],
+    'model_engine': ['Kubota D1803', 'Kubota V3300', 'ММЗ Д-243', 'Nissan K21', 'MMZ-4D'],
+    'model_transmission': ['10VA-00105', '10VB-00106', 'HF50-VP020', 'HF30-VP010'],
+    'model_drive_bridge': ['20VA-00101', '20VB-00102', 'HA50-VP010', 'HA30-02020'],
+    'model_control_bridge': ['VS20-00001', 'VS30-00001', 'B350655A'],
+    'type_maintenance': ['ТО-0 (50 м/час)', 'ТО-1 (200 м/час)', 'ТО-2 (400 м/час)', 'ТО-4 (1000м/час)',
+                         'ТО-5 (2000м/час)'],
+    'node_fail': ['Двигатель', 'Трансмиссия', 'Ведущий мост', 'Управляемый мост', 'Подъёмное устройство',
+                  'Гидросистема'],
+    'method_recovery': ['Ремонт узла', 'Замена узла'],
+}
+
+# Наработка к каждому виду ТО, м/час (по порядку REFERENCES['type_maintenance'])
+MAINTENANCE_HOURS = (50, 200, 400, 1000, 2000)
+
+FAILURES = [
+    ('повышенный шум', 'прокладки, прочие материалы'), ('проскальзывание', 'шестерня ведущая'),
+    ('блокировка колес', None), ('разрушение подшипника', 'подшипник'), ('течь масла', 'прокладки'),
+    ('разрушение верхнего ролика', 'ролик'), ('перегрев двигателя', 'термостат'), ('не запускается', None),
+]
+RECIPIENTS = ['ООО "ДЭТ №13"', 'ООО "Мосгоррест"', 'ИП Трудников С.В.', 'АО "Складские системы"', 'ООО "Логистик"']
+ADDRESSES = ['г. Санкт-Петербург', 'с. Акуловка, Московская обл.', 'п. Знаменский, Респ. Марий Эл', 'г. Казань',
+             'г. Екатеринбург', 'г. Новосибирск']
+EQUIPMENT = ['Стандарт', '1. Кабина с отопителем.', '1. Гидролинии с БРС;\n2. Дополнительная установка кабины']
+
+# Доля рекламаций последних 30 дней, которые еще не закрыты
+OPEN_CLAIM_SHARE = 0.5
+
+
+class FleetGenerator:
+    """
+    Генератор синтетического парка.
+
+    Атрибуты:
+        rng (random.Random): Источник случайных чисел (seed — для воспроизводимости)
+        prefix (str): Префикс заводских номеров и логинов
+        batch_size (int): Машин в одной транзакции
+        claims_per_vehicle (float): Среднее число рекламаций на машину
+        today (date): Дата, относительно которой строится история
+    """
+
+    def __init__(self, seed=None, prefix='S', batch_size=2000, claims_per_vehicle=0.8, today=None):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.claims_per_vehicle = claims_per_vehicle
+        self.today = today or date.today()
+        self.references = {}
+        self.clients = []
+        self.services = []
+        self._client_weights = []
+
+    def prepare(self, clients, services, password):
+        """
+        Создает недостающие справочники и пользователей.
+
+        Args:
+            clients (int): Число клиентов
+            services (int): Число сервисных организаций
+            password (str): Пароль пользователей (хэшируется один раз для всех)
+        """
+        for ref_type, names in REFERENCES.items():
+            existing = dict(ReferenceDirectory.objects.filter(ref_type=ref_type, name__in=names)
+                            .values_list('name', 'id'))
+            # create(), а не bulk_create: сигналы сбрасывают кэш справочников
+            self.references[ref_type] = [
+                existing.get(name) or ReferenceDirectory.objects.create(ref_type=ref_type, name=name).id
+                for name in names
+            ]
+        password = make_password(password)
+        self.clients = self.ensure_users(User.CLIENT, 'client', clients, password)
+        self.services = self.ensure_users(User.SERV_ORG, 'service', services, password)
+        self._client_weights = list(accumulate(1 / rank for rank in range(1, len(self.clients) + 1)))
+
+    def ensure_users(self, user_type, name, count, password):
+        """
+        Возвращает id count пользователей роли, создавая недостающих.
+
+        Returns:
+            list: id пользователей
+        """
+        usernames = [f'{self.prefix.lower()}-{name}-{index:05}' for index in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=username, password=password, type=user_type, fullname=f'{name.title()} {username[-5:]}')
+            for username in usernames if username not in existing
+        ], batch_size=1000)
+        ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        return [ids[username] for username in usernames]
+
+    def next_number(self):
+        """
+        Номер, с которого продолжается генерация: следующий за наибольшим номером машин с prefix.
+
+        Учитываются только номера вида prefix + цифры: машины с тем же началом номера
+        из импорта или удаленные машины не приводят к повтору уже занятого номера.
+        """
+        last = Vehicle.objects.filter(
+            factory_number__startswith=self.prefix, factory_number__regex=rf'^{re.escape(self.prefix)}[0-9]+$',
+        ).aggregate(last=Max(Cast(Substr('factory_number', len(self.prefix) + 1), BigIntegerField())))['last']
+        return (last or 0) + 1
+
+    def generate(self, count):
+        """
+        Создает count машин с историей пачками по batch_size.
+
+        Args:
+            count (int): Число машин
+
+        Yields:
+            tuple: (машин, ТО, рекламаций) в очередной зафиксированной пачке
+        """
+        start = self.next_number()
+        for offset in range(0, count, self.batch_size):
+            numbers = range(start + offset, start + min(offset + self.batch_size, count))
+            with transaction.atomic():
+                vehicles = Vehicle.objects.bulk_create([self.build_vehicle(number) for number in numbers])
+                maintenances = Maintenance.objects.bulk_create(
+                    [item for vehicle in vehicles for item in self.build_maintenances(vehicle)], batch_size=5000,
+                )
+                claims = WarrantyClaim.objects.bulk_create(
+                    [item for vehicle in vehicles for item in self.build_claims(vehicle)], batch_size=5000,
+                )
+                vehicle_stats.refresh(vehicle.pk for vehicle in vehicles)
+                # bulk_create не отправляет post_save
+                bump_generation(VEHICLE_GENERATION)
+            yield len(vehicles), len(maintenances), len(claims)
+
+    def build_vehicle(self, number):
+        """Машина с уникальными номерами узлов."""
+        rng, refs = self.rng, self.references
+        number = f'{self.prefix}{number:07}'
+        shipping_date = self.today - timedelta(days=rng.randint(30, 5 * 365))
+        return Vehicle(
+            factory_number=number, engine_number=f'{number}E', transmission_number=f'{number}T',
+            drive_bridge_number=f'{number}D', control_bridge_number=f'{number}C',
+            vehicle_model_id=rng.choice(refs['model_tech']), engine_model_id=rng.choice(refs['model_engine']),
+            transmission_model_id=rng.choice(refs['model_transmission']),
+            drive_bridge_model_id=rng.choice(refs['model_drive_bridge']),
+            control_bridge_model_id=rng.choice(refs['model_control_bridge']),
+            supply_contract=f'Д{shipping_date:%Y%m%d}', shipping_date=shipping_date,
+            recipient=rng.choice(RECIPIENTS), delivery_address=rng.choice(ADDRESSES), equipment=rng.choice(EQUIPMENT),
+            client_id=rng.choices(self.clients, cum_weights=self._client_weights)[0],
+            service_id=rng.choice(self.services),
+        )
+
+    def build_maintenances(self, vehicle):
+        """ТО машины: первые k видов по порядку, k растет с возрастом машины."""
+        rng = self.rng
+        age = (self.today - vehicle.shipping_date).days
+        types = self.references['type_maintenance']
+        count = rng.randint(0, min(len(types), 1 + age // 180))
+        maintenance_date = vehicle.shipping_date
+        for index in range(count):
+            maintenance_date = min(maintenance_date + timedelta(days=rng.randint(20, 200)), self.today)
+            yield Maintenance(
+                vehicle_id=vehicle.pk, maintenance_type_id=types[index], maintenance_date=maintenance_date,
+                operating_time=MAINTENANCE_HOURS[index] + rng.randint(0, 30),
+                order_number=f'{vehicle.factory_number}-{index}',
+                order_date=maintenance_date - timedelta(days=rng.randint(0, 3)),
+                service_id=vehicle.service_id if rng.random() < 0.8 else None,
+            )
+
+    def build_claims(self, vehicle):
+        """Рекламации машины (время простоя вычисляется здесь: bulk_create не вызывает save())."""
+        rng, refs = self.rng, self.references
+        repeat = self.claims_per_vehicle / (1 + self.claims_per_vehicle)
+        age = (self.today - vehicle.shipping_date).days
+        while rng.random() < repeat:
+            failure_date = vehicle.shipping_date + timedelta(days=rng.randint(0, age))
+            if (self.today - failure_date).days < 30 and rng.random() < OPEN_CLAIM_SHARE:
+                recovery_date = self.today + timedelta(days=rng.randint(1, 30))
+            else:
+                recovery_date = failure_date + timedelta(days=rng.randint(1, 30))
+            description, spare_parts = rng.choice(FAILURES)
+            claim = WarrantyClaim(
+                vehicle_id=vehicle.pk, failure_date=failure_date, operating_time=rng.randint(10, 3000),
+                node_fail_id=rng.choice(refs['node_fail']), fail_description=description,
+                method_recovery_id=rng.choice(refs['method_recovery']), spare_parts=spare_parts,
+                recovery_date=recovery_date, service_id=vehicle.service_id,
+            )
+            claim.compute_downtime()
+            yield claim
@@ -0,0 +1,535 @@
+"""
+Импорт парка техники, истории ТО и рекламаций из CSV/XLSX.
+
+Используется командой import_fleet и эндпоинтом /api/import/. Файл читается
+построчно и обрабатывается пачками по IMPORT_BATCH_SIZE строк:
+- справочники разрешаются по названию через кэш справочников (без запросов к БД);
+- клиенты и сервисные компании разрешаются по username одним запросом на пачку
+  (найденные пользователи запоминаются на весь импорт), машины для ТО
+  и рекламаций — по заводскому номеру, тоже одним запросом на пачку;
+- уникальные номера проверяются одним запросом на пачку;
+- строки пачки вставляются через bulk_create в одной транзакции.
+
+Колонки файла называются как поля модели (factory_number, vehicle_model, ...)
+или как их verbose_name («Зав. № машины», «Модель техники», ...). Справочники
+указываются названием, клиенты и сервисные компании — username, машина в ТО
+и рекламациях — заводским номером. Даты — YYYY-MM-DD или DD.MM.YYYY.
+
+Повторный импорт того же файла безопасен для техники и ТО: машины с уже
+существующим заводским номером и ТО с существующим номером заказ-наряда
+пропускаются. У рекламаций естественного ключа нет, поэтому прерванный импорт
+продолжается с первой незафиксированной строки (параметр skip, см. ImportReport.processed).
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
+
+from . import reference_cache, vehicle_stats
+from .cache import bump_generation
+from .conditional import VEHICLE_GENERATION
+from .models import Vehicle, Maintenance, WarrantyClaim, VehicleStats
+from .serializers import integrity_error_detail
+
+User = get_user_model()
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+
+
+class ImportFileError(Exception):
+    """Файл нельзя импортировать: неизвестный формат, нет обязательных колонок, не установлен openpyxl."""
+
+
+class RowError(Exception):
+    """Значение ячейки не прошло проверку."""
+
+
+def read_csv(file):
+    """
+    Построчно читает CSV (UTF-8, разделитель «,», «;» или табуляция определяется автоматически).
+
+    Args:
+        file: Бинарный файл с поддержкой seek()
+
+    Yields:
+        dict: Значения строки по заголовкам колонок
+    """
+    sample = file.read(8192).decode('utf-8-sig', errors='ignore')
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''), dialect=dialect)
+
+
+def read_xlsx(file):
+    """
+    Построчно читает первый лист XLSX в режиме read_only (требуется openpyxl).
+
+    Args:
+        file: Бинарный файл
+
+    Yields:
+        dict: Значения строки по заголовкам колонок
+
+    Raises:
+        ImportFileError: Если openpyxl не установлен
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Для импорта XLSX установите пакет openpyxl')
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value) if value is not None else '' for value in next(rows, ())]
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+READERS = {'csv': read_csv, 'xlsx': read_xlsx}
+
+
+def read_rows(file, file_format):
+    """
+    Возвращает итератор строк файла.
+
+    Args:
+        file: Бинарный файл
+        file_format (str): csv или xlsx
+
+    Raises:
+        ImportFileError: Если формат не поддерживается
+    """
+    if file_format not in READERS:
+        raise ImportFileError(f'Неподдерживаемый формат файла: {file_format} (ожидается csv или xlsx)')
+    return READERS[file_format](file)
+
+
+def parse_date_value(value):
+    """Разбирает дату из ячейки (date/datetime из XLSX или строка YYYY-MM-DD / DD.MM.YYYY)."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise RowError('Некорректная дата')
+
+
+def parse_int_value(value):
+    """Разбирает целое число из ячейки (в XLSX числа могут быть float)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise RowError('Ожидалось целое число')
+    if not number.is_integer():
+        raise RowError('Ожидалось целое число')
+    return int(number)
+
+
+class ImportReport:
+    """
+    Результат импорта.
+
+    Атрибуты:
+        processed (int): Число обработанных строк данных, результат которых зафиксирован
+            (продолжить прерванный импорт — skip=processed)
+        created (int): Создано записей
+        skipped (int): Пропущено строк, уже импортированных ранее
+        errors (list): Ошибки по строкам: {'row': номер строки данных (с 1), 'errors': {колонка: [сообщения]}}
+    """
+
+    def __init__(self, processed=0):
+        self.processed = processed
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def as_dict(self):
+        """Данные отчета для ответа API."""
+        return {'processed': self.processed, 'created': self.created, 'skipped': self.skipped,
+                'errors': self.errors}
+
+
+class Importer:
+    """
+    Базовый импорт одной модели.
+
+    Атрибуты:
+        model: Импортируемая модель
+        fields (tuple): Колонки файла (имена полей модели)
+        reference_fields (dict): Поля-ссылки на справочник: поле -> тип справочника
+        user_fields (dict): Поля-ссылки на пользователя (по username): поле -> тип пользователя
+        natural_key (str): Поле, по которому строка считается уже импортированной (или None)
+    """
+
+    model = None
+    fields = ()
+    reference_fields = {}
+    user_fields = {}
+    natural_key = None
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.users = {}
+        self.snapshot = None
+
+    def get_aliases(self):
+        """Допустимые заголовки колонок: имя поля и verbose_name (без учета регистра) -> имя поля."""
+        aliases = {}
+        for name in self.fields:
+            field = self.model._meta.get_field(name)
+            aliases[name.casefold()] = name
+            aliases[str(field.verbose_name).strip().casefold()] = name
+        return aliases
+
+    def normalize(self, rows):
+        """
+        Приводит заголовки колонок к именам полей, отбрасывая незнакомые колонки.
+
+        Raises:
+            ImportFileError: Если в файле нет обязательных колонок
+        """
+        aliases = self.get_aliases()
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        mapping = {header: aliases[str(header).strip().casefold()] for header in first
+                   if header is not None and str(header).strip().casefold() in aliases}
+        required = {name for name in self.fields if not self.model._meta.get_field(name).blank}
+        missing = required - set(mapping.values())
+        if missing:
+            raise ImportFileError(f'В файле нет обязательных колонок: {", ".join(sorted(missing))}')
+
+        yield {name: first.get(header) for header, name in mapping.items()}
+        for row in rows:
+            yield {name: row.get(header) for header, name in mapping.items()}
+
+    def run(self, rows, skip=0, on_batch=None):
+        """
+        Импортирует строки файла пачками, каждая пачка — в своей транзакции.
+
+        Args:
+            rows (iterable): Строки из read_rows()
+            skip (int): Число строк данных, уже импортированных ранее (продолжение импорта)
+            on_batch (callable): Вызывается с отчетом после фиксации каждой пачки
+
+        Returns:
+            ImportReport: Отчет об импорте
+
+        Raises:
+            ImportFileError: Если в файле нет обязательных колонок
+        """
+        report = ImportReport(processed=skip)
+        rows = enumerate(self.normalize(rows), start=1)
+        for _ in islice(rows, skip):
+            pass
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch, report)
+            report.processed = batch[-1][0]
+            if on_batch is not None:
+                on_batch(report)
+        return report
+
+    def import_batch(self, batch, report):
+        """Проверяет и записывает пачку строк (номер строки, данные)."""
+        self.snapshot = reference_cache.get_snapshot()
+        self.preload(batch)
+
+        entries = []
+        for number, row in batch:
+            try:
+                values = {name: self.clean_value(name, row.get(name)) for name in self.fields}
+            except RowError:
+                values = None
+            if values is None:
+                report.errors.append({'row': number, 'errors': self.collect_errors(row)})
+            else:
+                entries.append((number, values))
+
+        existing = self.get_existing(entries)
+        conflicts = self.get_conflicts(entries)
+        objects = []
+        for number, values in entries:
+            if self.natural_key and values[self.natural_key] in existing:
+                report.skipped += 1
+            elif number in conflicts:
+                report.errors.append({'row': number, 'errors': conflicts[number]})
+            else:
+                objects.append((number, self.build(values)))
+
+        self.write(objects, report)
+
+    def collect_errors(self, row):
+        """Ошибки всех колонок строки (вызывается только для строк с ошибками)."""
+        errors = {}
+        for name in self.fields:
+            try:
+                self.clean_value(name, row.get(name))
+            except RowError as exc:
+                errors[name] = [str(exc)]
+        return errors
+
+    def preload(self, batch):
+        """Загружает пользователей, на которых ссылается пачка, одним запросом."""
+        usernames = {
+            str(row[name]).strip() for _, row in batch for name in self.user_fields
+            if row.get(name) not in (None, '')
+        } - self.users.keys()
+        if usernames:
+            found = {username: (pk, user_type) for username, pk, user_type in
+                     User.objects.filter(username__in=usernames).values_list('username', 'id', 'type')}
+            for username in usernames:
+                self.users[username] = found.get(username)
+
+    def clean_value(self, name, value):
+        """
+        Проверяет и преобразует значение ячейки.
+
+        Raises:
+            RowError: Если значение некорректно
+        """
+        if isinstance(value, str):
+            value = value.strip()
+        field = self.model._meta.get_field(name)
+        if value in (None, ''):
+            if not field.blank:
+                raise RowError('Обязательное поле')
+            return None
+
+        if name in self.reference_fields:
+            reference = self.snapshot.get_by_name(self.reference_fields[name], str(value))
+            if reference is None:
+                raise RowError(f'Нет в справочнике «{field.verbose_name}»')
+            return reference.pk
+        if name in self.user_fields:
+            user = self.users.get(str(value))
+            if user is None or user[1] != self.user_fields[name]:
+                raise RowError('Пользователь не найден')
+            return user[0]
+        if isinstance(field, models.DateField):
+            return parse_date_value(value)
+        if isinstance(field, models.IntegerField):
+            return parse_int_value(value)
+
+        value = str(value)
+        if field.max_length and len(value) > field.max_length:
+            raise RowError(f'Не более {field.max_length} символов')
+        return value
+
+    def get_existing(self, entries):
+        """Значения natural_key пачки, которые уже есть в БД (строки пропускаются)."""
+        if not self.natural_key:
+            return set()
+        values = {values[self.natural_key] for _, values in entries}
+        return set(self.model.objects.filter(**{f'{self.natural_key}__in': values})
+                   .values_list(self.natural_key, flat=True))
+
+    def get_conflicts(self, entries):
+        """Нарушения уникальности: номер строки -> ошибки."""
+        return {}
+
+    def build(self, values):
+        """Создает несохраненный объект модели по проверенным значениям."""
+        return self.model(**{
+            (f'{name}_id' if name in self.reference_fields or name in self.user_fields else name): value
+            for name, value in values.items()
+        })
+
+    def write(self, objects, report):
+        """
+        Вставляет объекты пачки одной транзакцией.
+
+        Если вставка пачки нарушила ограничение БД (например, параллельный импорт),
+        строки вставляются по одной, и ошибка относится только к своей строке
+        (с теми же сообщениями, что и при проверке пачки).
+        """
+        try:
+            with transaction.atomic():
+                created = self.model.objects.bulk_create([obj for _, obj in objects])
+                self.on_created(created)
+            report.created += len(objects)
+        except IntegrityError:
+            for number, obj in objects:
+                try:
+                    with transaction.atomic():
+                        obj.save(force_insert=True)
+                    report.created += 1
+                except IntegrityError as exc:
+                    obj.pk = None
+                    report.errors.append({
+                        'row': number, 'errors': integrity_error_detail(exc, self.model, type_field='maintenance_type'),
+                    })
+
+    def on_created(self, objects):
+        """
+        Действия после bulk_create пачки в той же транзакции (bulk_create не отправляет post_save).
+
+        При построчной записи вместо них срабатывают обработчики сигналов (app.signals).
+
+        Args:
+            objects (list): Созданные объекты
+        """
+
+
+class VehicleImporter(Importer):
+    """Импорт техники."""
+
+    model = Vehicle
+    fields = (
+        'factory_number', 'vehicle_model', 'engine_model', 'engine_number', 'transmission_model',
+        'transmission_number', 'drive_bridge_model', 'drive_bridge_number', 'control_bridge_model',
+        'control_bridge_number', 'supply_contract', 'shipping_date', 'recipient', 'delivery_address', 'equipment',
+        'client', 'service',
+    )
+    reference_fields = {
+        'vehicle_model': 'model_tech',
+        'engine_model': 'model_engine',
+        'transmission_model': 'model_transmission',
+        'drive_bridge_model': 'model_drive_bridge',
+        'control_bridge_model': 'model_control_bridge',
+    }
+    user_fields = {'client': User.CLIENT, 'service': User.SERV_ORG}
+    natural_key = 'factory_number'
+    unique_numbers = ('engine_number', 'transmission_number', 'drive_bridge_number', 'control_bridge_number')
+
+    def get_conflicts(self, entries):
+        """Номера, занятые в БД или повторяющиеся в пачке (один запрос на пачку)."""
+        taken = {name: set() for name in ('factory_number',) + self.unique_numbers}
+        if entries:
+            condition = Q()
+            for name in self.unique_numbers:
+                condition |= Q(**{f'{name}__in': {values[name] for _, values in entries}})
+            for row in Vehicle.objects.filter(condition).values_list(*self.unique_numbers):
+                for name, value in zip(self.unique_numbers, row):
+                    taken[name].add(value)
+
+        conflicts = {}
+        for number, values in entries:
+            errors = {name: ['Номер используется'] for name in taken if values[name] in taken[name]}
+            if errors:
+                conflicts[number] = errors
+            for name in taken:
+                taken[name].add(values[name])
+        return conflicts
+
+    def on_created(self, objects):
+        """Создает пустые сводки новых машин (VehicleStats)."""
+        VehicleStats.objects.bulk_create([VehicleStats(vehicle=obj) for obj in objects], ignore_conflicts=True)
+
+    def write(self, objects, report):
+        """bulk_create не отправляет post_save, поэтому поколение строк техники меняется здесь."""
+        created = report.created
+        super().write(objects, report)
+        if report.created > created:
+            # Публичные карточки не затрагиваются: отсутствующие номера не кэшируются
+            bump_generation(VEHICLE_GENERATION)
+
+
+class VehicleHistoryImporter(Importer):
+    """Импорт записей, привязанных к машине по заводскому номеру (ТО, рекламации)."""
+
+    def __init__(self, batch_size=None):
+        super().__init__(batch_size)
+        self.vehicles = {}
+
+    def preload(self, batch):
+        """Дополнительно загружает машины пачки по заводскому номеру одним запросом."""
+        super().preload(batch)
+        numbers = {str(row['vehicle']).strip() for _, row in batch if row.get('vehicle') not in (None, '')}
+        self.vehicles = dict(Vehicle.objects.filter(factory_number__in=numbers).values_list('factory_number', 'id'))
+
+    def clean_value(self, name, value):
+        """Машина указывается заводским номером."""
+        if name != 'vehicle':
+            return super().clean_value(name, value)
+        value = str(value).strip() if value is not None else ''
+        if not value:
+            raise RowError('Обязательное поле')
+        if value not in self.vehicles:
+            raise RowError('Машина не найдена')
+        return self.vehicles[value]
+
+    def build(self, values):
+        """Создает объект со ссылкой на машину по id."""
+        values = dict(values)
+        vehicle_id = values.pop('vehicle')
+        obj = super().build(values)
+        obj.vehicle_id = vehicle_id
+        return obj
+
+    def on_created(self, objects):
+        """Пересчитывает сводку машин пачки."""
+        vehicle_stats.refresh(obj.vehicle_id for obj in objects)
+
+
+class MaintenanceImporter(VehicleHistoryImporter):
+    """Импорт ТО. Строка с существующим номером заказ-наряда считается уже импортированной."""
+
+    model = Maintenance
+    fields = ('vehicle', 'maintenance_type', 'maintenance_date', 'operating_time', 'order_number', 'order_date',
+              'service')
+    reference_fields = {'maintenance_type': 'type_maintenance'}
+    user_fields = {'service': User.SERV_ORG}
+    natural_key = 'order_number'
+
+    def get_conflicts(self, entries):
+        """ТО того же вида для машины — в БД или в пачке (один запрос на пачку)."""
+        vehicle_ids = {values['vehicle'] for _, values in entries}
+        taken_pairs = set(Maintenance.objects.filter(vehicle_id__in=vehicle_ids)
+                          .values_list('vehicle_id', 'maintenance_type_id')) if entries else set()
+        taken_numbers = set()
+
+        conflicts = {}
+        for number, values in entries:
+            pair = (values['vehicle'], values['maintenance_type'])
+            if values['order_number'] in taken_numbers:
+                conflicts[number] = {'order_number': ['Номер используется']}
+            elif pair in taken_pairs:
+                conflicts[number] = {'maintenance_type': ['ТО уже существует']}
+            taken_pairs.add(pair)
+            taken_numbers.add(values['order_number'])
+        return conflicts
+
+
+class WarrantyClaimImporter(VehicleHistoryImporter):
+    """Импорт рекламаций (время простоя вычисляется по датам)."""
+
+    model = WarrantyClaim
+    fields = ('vehicle', 'failure_date', 'operating_time', 'node_fail', 'fail_description', 'method_recovery',
+              'spare_parts', 'recovery_date', 'service')
+    reference_fields = {'node_fail': 'node_fail', 'method_recovery': 'method_recovery'}
+    user_fields = {'service': User.SERV_ORG}
+
+    def build(self, values):
+        """bulk_create не вызывает save(), поэтому время простоя вычисляется здесь."""
+        obj = super().build(values)
+        obj.compute_downtime()
+        return obj
+
+
+IMPORTERS = {
+    'vehicles': VehicleImporter,
+    'maintenances': MaintenanceImporter,
+    'claims': WarrantyClaimImporter,
+}
@@ -0,0 +1,279 @@
+"""
+Замер всех GET-эндпоинтов роутера API (app/urls.py) для каждой роли.
+
+Для каждого маршрута роутера с GET (list, retrieve и действия ViewSet) и для
+поиска команда выполняет --requests запросов от имени MR, CL, SO и анонимного
+пользователя через весь стек middleware (в процессе, без HTTP-сервера) и
+записывает p50, p95 и среднее время ответа, число SQL-запросов и размер ответа.
+Ограничение частоты запросов, Server-Timing и метрики на время замера выключены.
+
+Параметры запросов:
+- списки — ?page_size=--page-size (0 — без пагинации; на больших БД это весь парк);
+- карточки — первая запись, видимая роли (для анонимного пользователя — первая в БД);
+- lookup и autocomplete — номер и префикс номера машины, видимой роли; поиск — ?q=--search.
+Пользователи CL и SO — с наибольшим числом машин (худший случай для выборок по роли).
+
+Результат — JSON (--json FILE или --json - для вывода в stdout): метаданные (коммит,
+объем БД, параметры) и строка на пару эндпоинт/роль. --compare BASELINE.json
+сравнивает с прошлым замером: p95 выросло больше чем на --threshold или запросов стало
+больше — регрессия (с --fail-on-regression команда завершается ошибкой).
+
+Пример:
+    DB_PATH=/tmp/fleet.sqlite3 python manage.py benchmark_api --json before.json
+    DB_PATH=/tmp/fleet.sqlite3 python manage.py benchmark_api --json after.json --compare before.json
+"""
+
+import json
+import logging
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from app.models import User, Vehicle, Maintenance, WarrantyClaim
+from app.serializers import CustomTokenObtainPairSerializer
+from app.timing import collect
+from app.urls import router
+
+ROLES = ('MR', 'CL', 'SO', 'anon')
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка (ближайшее значение)."""
+    return values[min(int(len(values) * percent / 100), len(values) - 1)] if values else 0
+
+
+def get_commit():
+    """Текущий коммит git (None, если git недоступен)."""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def get_users():
+    """Пользователи ролей: MR — первый, CL и SO — с наибольшим числом машин, anon — None."""
+    users = {'MR': User.objects.filter(type=User.MANAGER).order_by('id').first(), 'anon': None}
+    for role, related in ((User.CLIENT, 'clients'), (User.SERV_ORG, 'services')):
+        users[role] = (User.objects.filter(type=role).annotate(vehicle_count=Count(related))
+                       .order_by('-vehicle_count', 'id').first())
+    missing = [role for role in ROLES if role != 'anon' and users[role] is None]
+    if missing:
+        raise CommandError(f'В БД нет пользователей ролей: {", ".join(missing)} (см. generate_fleet)')
+    return users
+
+
+def get_sample(viewset_class, user):
+    """
+    Первая запись выборки ViewSet, видимая пользователю (get_queryset() действия retrieve).
+
+    Returns:
+        Model | None: Запись или None, если выборка пуста или недоступна роли
+    """
+    view = viewset_class(action_map={'get': 'retrieve'}, action='retrieve', format_kwarg=None)
+    request = RequestFactory().get('/')
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.request.user = user or AnonymousUser()
+    try:
+        return view.get_queryset().order_by('pk').first()
+    except AttributeError:
+        # Выборка роли не определена для анонимного пользователя (доступ запрещают права)
+        return None
+
+
+def get_endpoints(users, options):
+    """
+    Эндпоинты замера для каждой роли.
+
+    Returns:
+        list: (имя маршрута, действие, роль, путь, параметры запроса)
+    """
+    endpoints = []
+    list_params = {'page_size': options['page_size']} if options['page_size'] else {}
+    for prefix, viewset_class, basename in router.registry:
+        for route in router.get_routes(viewset_class):
+            # mapping действий ViewSet — MethodMapper, у которого get() — декоратор
+            if 'get' not in route.mapping:
+                continue
+            action = route.mapping['get']
+            name = route.name.format(basename=basename)
+            for role in ROLES:
+                sample = get_sample(viewset_class, users[role]) or get_sample(viewset_class, users['MR'])
+                if route.detail:
+                    if sample is None:
+                        continue
+                    lookup = getattr(sample, viewset_class.lookup_field)
+                    path, params = reverse(name, kwargs={viewset_class.lookup_field: lookup}), {}
+                else:
+                    path, params = reverse(name), get_action_params(action, sample, list_params)
+                endpoints.append((name, action, role, path, params))
+    for role in ROLES:
+        endpoints.append(('search', 'search', role, reverse('search'), {'q': options['search']}))
+    return endpoints
+
+
+def get_action_params(action, sample, list_params):
+    """Параметры запроса действия, которому нужны данные (lookup, autocomplete, export)."""
+    if action == 'list':
+        return list_params
+    if action == 'export':
+        return {'filetype': 'csv'}
+    if action in ('lookup', 'autocomplete') and isinstance(sample, Vehicle):
+        if action == 'lookup':
+            return {'serial': sample.factory_number}
+        return {'prefix': sample.factory_number[:3]}
+    return {}
+
+
+def measure(client, path, params, headers, count):
+    """
+    Выполняет count запросов.
+
+    Returns:
+        dict: Код ответа, p50/p95/среднее (мс), число SQL-запросов (максимум), размер ответа (байты)
+    """
+    timings, queries, size, status = [], 0, 0, None
+    for _ in range(count):
+        started = perf_counter()
+        with collect() as request_timings:
+            response = client.get(path, params, **headers)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        timings.append(perf_counter() - started)
+        queries = max(queries, request_timings.queries)
+        size, status = len(content), response.status_code
+    timings.sort()
+    return {
+        'status': status,
+        'requests': count,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'queries': queries,
+        'bytes': size,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время, число SQL-запросов и размер ответов всех GET-эндпоинтов API для каждой роли'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Запросов на пару эндпоинт/роль')
+        parser.add_argument('--warmup', type=int, default=1, help='Прогревочных запросов (не учитываются)')
+        parser.add_argument('--page-size', type=int, default=100, help='page_size списков (0 — без пагинации)')
+        parser.add_argument('--search', default='подшипник', help='Запрос для /api/search/')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Только эти маршруты (vehicles-list, search, ...; можно несколько)')
+        parser.add_argument('--role', action='append', choices=ROLES, dest='roles', help='Только эти роли')
+        parser.add_argument('--json', dest='json_path', help='Файл результата JSON (- — вывод в stdout)')
+        parser.add_argument('--compare', help='JSON прошлого замера для сравнения')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый рост p95 при сравнении (доля, по умолчанию 0.2)')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Ошибка, если найдены регрессии')
+
+    def handle(self, *args, **options):
+        quiet = options['json_path'] == '-'
+        users = get_users()
+        tokens = {role: str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+                  for role, user in users.items() if user is not None}
+        endpoints = [
+            endpoint for endpoint in get_endpoints(users, options)
+            if (not options['endpoints'] or endpoint[0] in options['endpoints'])
+            and (not options['roles'] or endpoint[2] in options['roles'])
+        ]
+
+        results = []
+        # Ответы 4xx и 503 (например, недоступный роли маршрут) — часть замера, а не ошибки в логе
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        with override_settings(THROTTLE_ENABLED=False, SERVER_TIMING=False, METRICS_ENABLED=False,
+                               ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            if not quiet:
+                self.stdout.write(f'{"Эндпоинт":<24}{"Роль":<6}{"Код":>5}{"p50, мс":>10}{"p95, мс":>10}'
+                                  f'{"Запросов":>10}{"Байт":>12}')
+            for name, action, role, path, params in endpoints:
+                headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens[role]}'} if role in tokens else {}
+                measure(client, path, params, headers, options['warmup'])
+                result = {'endpoint': name, 'action': action, 'role': role, 'path': path, 'params': params,
+                          **measure(client, path, params, headers, max(options['requests'], 1))}
+                results.append(result)
+                if not quiet:
+                    self.stdout.write(f'{name:<24}{role:<6}{result["status"]:>5}{result["p50_ms"]:>10.1f}'
+                                      f'{result["p95_ms"]:>10.1f}{result["queries"]:>10}{result["bytes"]:>12}')
+        request_logger.setLevel(level)
+
+        report = {'meta': self.get_meta(options), 'results': results}
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        elif options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        if options['compare']:
+            regressions = self.compare(options['compare'], results, options['threshold'], quiet)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'Регрессий: {regressions}')
+
+    @staticmethod
+    def get_meta(options):
+        """Метаданные замера: коммит, окружение, объем БД и параметры."""
+        return {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': {
+                'vehicles': Vehicle.objects.count(),
+                'maintenances': Maintenance.objects.count(),
+                'claims': WarrantyClaim.objects.count(),
+                'users': User.objects.count(),
+            },
+            'requests': options['requests'],
+            'page_size': options['page_size'],
+        }
+
+    def compare(self, path, results, threshold, quiet):
+        """
+        Сравнивает с прошлым замером и выводит регрессии.
+
+        Returns:
+            int: Число регрессий
+        """
+        try:
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Не удалось прочитать {path}: {exc}')
+        previous = {(item['endpoint'], item['role']): item for item in baseline['results']}
+        output = sys.stderr if quiet else self.stdout
+        output.write(f'\nСравнение с {path} (коммит {baseline["meta"].get("commit")}):\n')
+        regressions = 0
+        for result in results:
+            before = previous.get((result['endpoint'], result['role']))
+            if before is None:
+                continue
+            ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1
+            problems = []
+            if ratio > 1 + threshold:
+                problems.append(f'p95 {before["p95_ms"]:.1f} -> {result["p95_ms"]:.1f} мс (x{ratio:.2f})')
+            if result['queries'] > before['queries']:
+                problems.append(f'запросов {before["queries"]} -> {result["queries"]}')
+            if problems:
+                regressions += 1
+                output.write(f'  {result["endpoint"]} {result["role"]}: {"; ".join(problems)}\n')
+        output.write(f'Регрессий: {regressions}\n')
+        return regressions
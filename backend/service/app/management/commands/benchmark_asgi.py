@@ -0,0 +1,183 @@
+"""
+Масштабирование по числу одновременных запросов в одном процессе: WSGI против ASGI.
+
+Команда вызывает приложения Django напрямую (без HTTP-сервера), через весь стек
+middleware, для одного эндпоинта в трех режимах:
+- wsgi — синхронный маршрут (/api/<name>/) через WSGIHandler в пуле из --threads
+  потоков, как у воркера gunicorn с потоками: лишние запросы ждут свободный поток;
+- asgi-sync — тот же синхронный маршрут через ASGIHandler (service/asgi.py);
+- asgi — асинхронный маршрут (/api/async/<name>/, app.async_views) через ASGIHandler.
+
+Для каждого уровня --concurrency (число одновременно ожидающих ответа клиентов)
+выводятся запросы в секунду, p50 и p95 времени ответа с учетом ожидания в очереди
+и число ответов с ошибкой. Запросы выполняются от имени первого пользователя
+роли --role из БД (access-токен выпускается без записи в БД); эндпоинт public —
+публичная карточка первой машины без аутентификации.
+
+Пример:
+    python manage.py benchmark_asgi --endpoint vehicles --concurrency 1 8 32 --requests 300
+"""
+
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from app.models import User, Vehicle
+from app.serializers import CustomTokenObtainPairSerializer
+
+ENDPOINTS = ('references', 'vehicles', 'maintenances', 'claims', 'public')
+MODES = ('wsgi', 'asgi-sync', 'asgi')
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка (ближайшее значение)."""
+    return values[min(int(len(values) * percent / 100), len(values) - 1)] if values else 0
+
+
+def call_wsgi(application, path, headers):
+    """Выполняет GET через WSGI-приложение и возвращает код ответа."""
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        **{f'HTTP_{name.upper()}': value for name, value in headers.items()},
+    }
+    status = []
+    body = application(environ, lambda code, response_headers, exc_info=None: status.append(int(code[:3])))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return status[0]
+
+
+async def call_asgi(application, path, headers):
+    """Выполняет GET через ASGI-приложение и возвращает код ответа."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver')] + [(name.encode(), value.encode()) for name, value in headers.items()],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Клиент не отключается: Django отменит ожидание после ответа
+        await asyncio.Future()
+
+    status = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def measure_wsgi(application, path, headers, count, concurrency, threads):
+    """Замер WSGI: пул из threads потоков, не больше concurrency запросов в ожидании."""
+    slots = threading.BoundedSemaphore(concurrency)
+    timings, errors, lock = [], [0], threading.Lock()
+
+    def run(submitted):
+        try:
+            code = call_wsgi(application, path, headers)
+        finally:
+            slots.release()
+        with lock:
+            timings.append(perf_counter() - submitted)
+            errors[0] += code != 200
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in range(count):
+            slots.acquire()
+            executor.submit(run, perf_counter())
+    return perf_counter() - started, sorted(timings), errors[0]
+
+
+def measure_asgi(application, path, headers, count, concurrency):
+    """Замер ASGI: один цикл событий, не больше concurrency запросов одновременно."""
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        timings, errors = [], 0
+
+        async def run():
+            nonlocal errors
+            async with slots:
+                submitted = perf_counter()
+                code = await call_asgi(application, path, headers)
+                timings.append(perf_counter() - submitted)
+                errors += code != 200
+
+        started = perf_counter()
+        await asyncio.gather(*(run() for _ in range(count)))
+        return perf_counter() - started, sorted(timings), errors
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает масштабирование эндпоинтов чтения по числу одновременных запросов: WSGI и ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='vehicles', help='Эндпоинт')
+        parser.add_argument('--role', choices=[User.MANAGER, User.CLIENT, User.SERV_ORG], default=User.MANAGER,
+                            help='Роль пользователя запросов')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help='Уровни числа одновременных запросов')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждый уровень')
+        parser.add_argument('--threads', type=int, default=4, help='Потоков WSGI-воркера')
+
+    def handle(self, *args, **options):
+        endpoint = options['endpoint']
+        headers = {}
+        if endpoint == 'public':
+            number = Vehicle.objects.order_by('id').values_list('factory_number', flat=True).first()
+            if number is None:
+                raise CommandError('В БД нет машин')
+            paths = {'sync': f'/api/vehicles/{number}/', 'async': f'/api/async/public/vehicles/{number}/'}
+        else:
+            user = User.objects.filter(type=options['role']).order_by('id').first()
+            if user is None:
+                raise CommandError(f'В БД нет пользователя с ролью {options["role"]}')
+            headers['authorization'] = f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+            paths = {'sync': f'/api/{endpoint}/', 'async': f'/api/async/{endpoint}/'}
+
+        count = options['requests']
+        self.stdout.write(f'{paths["sync"]} / {paths["async"]}: {count} запросов на уровень, '
+                          f'WSGI-потоков: {options["threads"]}')
+        self.stdout.write(f'{"Режим":<11}{"Одновр.":>8}{"Запр./с":>10}{"p50, мс":>10}{"p95, мс":>10}{"Ошибки":>8}')
+        with override_settings(THROTTLE_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+            wsgi, asgi = get_wsgi_application(), get_asgi_application()
+            # Прогрев: кэши процесса (справочники, карточки) и соединения
+            call_wsgi(wsgi, paths['sync'], headers)
+            asyncio.run(call_asgi(asgi, paths['async'], headers))
+
+            for concurrency in options['concurrency']:
+                concurrency = max(concurrency, 1)
+                for mode in MODES:
+                    if mode == 'wsgi':
+                        result = measure_wsgi(wsgi, paths['sync'], headers, count, concurrency, options['threads'])
+                    else:
+                        path = paths['async' if mode == 'asgi' else 'sync']
+                        result = measure_asgi(asgi, path, headers, count, concurrency)
+                    elapsed, timings, errors = result
+                    self.stdout.write(
+                        f'{mode:<11}{concurrency:>8}{count / elapsed:>10.0f}{percentile(timings, 50) * 1000:>10.1f}'
+                        f'{percentile(timings, 95) * 1000:>10.1f}{errors:>8}'
+                    )
@@ -0,0 +1,81 @@
+"""
+Пропускная способность входа (/api/token/) и обновления токена (/api/token/refresh/).
+
+Запросы выполняются тестовым клиентом Django через весь стек middleware и DRF
+от имени временного пользователя (создается в транзакции, которая откатывается
+после замера). Кроме времени выводится число проверок пароля, выпусков
+refresh-токенов и SQL-запросов на один запрос: вход должен проверять пароль
+и выпускать пару токенов ровно один раз, обновление — не обращаться к БД.
+
+Вход упирается в процессор (PBKDF2), поэтому результат — запросов в секунду
+на одно ядро.
+
+Пример:
+    python manage.py benchmark_login --count 50
+"""
+
+from time import perf_counter
+from unittest import mock
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app.models import User
+
+USERNAME = 'benchmark-login'
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = 'Измеряет пропускную способность входа и обновления JWT-токенов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20, help='Число входов')
+        parser.add_argument('--refresh-count', type=int, default=200, help='Число обновлений access-токена')
+
+    def handle(self, *args, **options):
+        client = Client()
+        with transaction.atomic(), override_settings(THROTTLE_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+            User.objects.create_user(USERNAME, password=PASSWORD, type=User.CLIENT)
+            login = self.measure(client, options['count'], '/api/token/', {'username': USERNAME, 'password': PASSWORD})
+            refresh = client.post('/api/token/', {'username': USERNAME, 'password': PASSWORD}).json()['refresh']
+            refreshed = self.measure(client, options['refresh_count'], '/api/token/refresh/', {'refresh': refresh})
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'{"Запрос":<22}{"Запросов":>10}{"в секунду":>12}{"мс":>9}{"Паролей":>10}{"Токенов":>10}{"SQL":>6}'
+        )
+        for name, result in (('/api/token/', login), ('/api/token/refresh/', refreshed)):
+            count, elapsed, verified, minted, queries = result
+            self.stdout.write(
+                f'{name:<22}{count:>10}{count / elapsed:>12.1f}{elapsed / count * 1000:>9.1f}'
+                f'{verified / count:>10.1f}{minted / count:>10.1f}{queries / count:>6.1f}'
+            )
+
+        if login[2] != login[0] or login[3] != login[0]:
+            raise CommandError('Вход должен проверять пароль и выпускать токены один раз на запрос')
+        self.stdout.write(self.style.SUCCESS('Один вход — одна проверка пароля и один выпуск токенов'))
+
+    def measure(self, client, count, path, data):
+        """
+        Выполняет count POST-запросов.
+
+        Returns:
+            tuple: (число запросов, время в секундах, проверок пароля, выпусков refresh-токенов, SQL-запросов)
+        """
+        count = max(count, 1)
+        hasher = get_hasher()
+        with mock.patch.object(hasher, 'verify', wraps=hasher.verify) as verify, \
+                mock.patch.object(RefreshToken, 'for_user', wraps=RefreshToken.for_user) as for_user, \
+                CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            for _ in range(count):
+                response = client.post(path, data)
+                if response.status_code != 200:
+                    raise CommandError(f'{path}: ответ {response.status_code} {response.content[:200]!r}')
+            elapsed = perf_counter() - started
+        return count, elapsed, verify.call_count, for_user.call_count, len(queries)
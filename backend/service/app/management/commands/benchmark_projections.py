@@ -0,0 +1,64 @@
+"""
+Сравнение быстрых проекций списков (app.projections) с сериализаторами.
+
+Для каждой пары сериализатор/проекция строит список по всем записям текущей БД
+обоими способами, проверяет побайтное совпадение JSON и выводит время.
+
+Пример:
+    python manage.py benchmark_projections --repeat 5
+"""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app.projections import PROJECTIONS
+from app.query_plan import get_query_plan
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время и вывод проекций списков с сериализаторами DRF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Число повторов (берется лучшее время)')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        failed = []
+
+        self.stdout.write(f'{"Сериализатор":<26}{"Строк":>8}{"DRF, мс":>12}{"Проекция, мс":>15}{"Ускорение":>11}')
+        for serializer_class, projection in PROJECTIONS.items():
+            model = serializer_class.Meta.model
+            queryset = model.objects.order_by('id')
+            serializer_queryset = get_query_plan(serializer_class).apply(queryset)
+
+            expected, serializer_time = self.measure(
+                options['repeat'], lambda: renderer.render(serializer_class(serializer_queryset, many=True).data)
+            )
+            actual, projection_time = self.measure(
+                options['repeat'], lambda: renderer.render(projection.serialize(projection.get_rows(queryset)))
+            )
+
+            if actual != expected:
+                failed.append(serializer_class.__name__)
+            speedup = serializer_time / projection_time if projection_time else 0
+            self.stdout.write(
+                f'{serializer_class.__name__:<26}{queryset.count():>8}'
+                f'{serializer_time * 1000:>12.1f}{projection_time * 1000:>15.1f}{speedup:>10.1f}x'
+            )
+
+        if failed:
+            raise CommandError(f'Вывод проекций отличается от сериализаторов: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('Вывод проекций совпадает с сериализаторами'))
+
+    @staticmethod
+    def measure(repeat, render):
+        """Выполняет render repeat раз и возвращает результат и лучшее время в секундах."""
+        best, result = None, None
+        for _ in range(max(repeat, 1)):
+            started = perf_counter()
+            result = render()
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
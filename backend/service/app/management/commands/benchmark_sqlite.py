@@ -0,0 +1,177 @@
+"""
+Нагрузочное сравнение настроек SQLite: параллельные чтения и записи из нескольких процессов.
+
+Команда копирует текущую БД во временный каталог (исходный файл не изменяется) и
+для каждого профиля запускает процессы-читатели и процессы-писатели на заданное
+время. Каждая операция выполняется как отдельный запрос Django: соединение
+закрывается или переиспользуется по CONN_MAX_AGE (close_old_connections до и после).
+- читатель: карточка машины и ее ТО;
+- писатель: изменение ТО в транзакции (с пересчетом сводки машины сигналами).
+
+Профили:
+- default — настройки Django по умолчанию: журнал DELETE, synchronous=FULL,
+  отложенные транзакции, таймаут 5 с, соединение на каждый запрос;
+- settings — DATABASES['default'] из настроек (переменные окружения DB_*).
+
+Выводятся операции в секунду, 95-й перцентиль времени операции и число ошибок
+«database is locked». Кэши на время замера — в памяти процессов, чтобы мерить только БД.
+
+Пример:
+    python manage.py benchmark_sqlite --readers 8 --writers 4 --duration 10
+"""
+
+import multiprocessing
+import random
+import sqlite3
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test import override_settings
+
+from app.models import Vehicle, Maintenance
+
+PROFILES = {
+    'default': {
+        'OPTIONS': {'timeout': 5, 'init_command': 'PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL'},
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+    },
+    'settings': {
+        key: settings.DATABASES['default'].get(key) for key in ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+    },
+}
+
+
+def read(vehicle_ids, maintenance_ids):
+    """Операция читателя: карточка машины и список ее ТО."""
+    vehicle_id = random.choice(vehicle_ids)
+    list(Vehicle.objects.filter(pk=vehicle_id).values())
+    list(Maintenance.objects.filter(vehicle_id=vehicle_id).values('id', 'maintenance_date', 'operating_time'))
+
+
+def write(vehicle_ids, maintenance_ids):
+    """Операция писателя: чтение и сохранение ТО в одной транзакции."""
+    with transaction.atomic():
+        maintenance = Maintenance.objects.get(pk=random.choice(maintenance_ids))
+        maintenance.operating_time += 1
+        maintenance.save()
+
+
+OPERATIONS = {'read': read, 'write': write}
+
+
+def run_worker(kind, path, profile, duration, ids, results):
+    """
+    Процесс нагрузки: выполняет операции kind до истечения duration секунд.
+
+    Args:
+        kind (str): Ключ OPERATIONS
+        path (str): Файл БД
+        profile (dict): Параметры соединения (OPTIONS, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+        duration (float): Время работы, секунды
+        ids (tuple): id машин и ТО
+        results: Очередь для (kind, время операций в секундах, число ошибок блокировки)
+    """
+    connection.settings_dict.update(NAME=path, **profile)
+    operation = OPERATIONS[kind]
+    timings, locked = [], 0
+    deadline = perf_counter() + duration
+    try:
+        while perf_counter() < deadline:
+            close_old_connections()
+            started = perf_counter()
+            try:
+                operation(*ids)
+                timings.append(perf_counter() - started)
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                locked += 1
+            close_old_connections()
+    finally:
+        connection.close()
+        results.put((kind, timings, locked))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность SQLite при параллельных чтениях и записях для профилей настроек'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Процессов-читателей')
+        parser.add_argument('--writers', type=int, default=4, help='Процессов-писателей')
+        parser.add_argument('--duration', type=float, default=5, help='Время замера для профиля, секунды')
+        parser.add_argument('--profile', action='append', choices=list(PROFILES), dest='profiles',
+                            help='Профиль настроек (можно несколько); по умолчанию все')
+
+    def handle(self, *args, **options):
+        source = Path(settings.DATABASES['default']['NAME'])
+        if not source.exists():
+            raise CommandError(f'Нет файла БД: {source}')
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            name: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'} for name in settings.CACHES
+        }):
+            ids = self.read_ids(source)
+            self.stdout.write(f'БД: {source} (машин: {len(ids[0])}, ТО: {len(ids[1])}); '
+                              f'читателей: {options["readers"]}, писателей: {options["writers"]}')
+            self.stdout.write(f'{"Профиль":<10}{"Операция":>10}{"Опер./с":>10}{"p95, мс":>10}{"Блокировки":>12}')
+            for name in options['profiles'] or PROFILES:
+                path = str(Path(directory) / f'{name}.sqlite3')
+                self.copy(source, path)
+                self.report(name, self.run(path, PROFILES[name], ids, options), options['duration'])
+                for suffix in ('', '-wal', '-shm'):
+                    Path(path + suffix).unlink(missing_ok=True)
+
+    @staticmethod
+    def copy(source, path):
+        """Копирует БД (резервной копией SQLite, исходный файл открывается только на чтение)."""
+        src, dst = sqlite3.connect(f'file:{source}?mode=ro', uri=True), sqlite3.connect(path)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+
+    @staticmethod
+    def read_ids(source):
+        """id машин и ТО исходной БД."""
+        db = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+        try:
+            vehicle_ids = [row[0] for row in db.execute('SELECT id FROM app_vehicle')]
+            maintenance_ids = [row[0] for row in db.execute('SELECT id FROM app_maintenance')]
+        finally:
+            db.close()
+        if not vehicle_ids or not maintenance_ids:
+            raise CommandError('В БД нет машин или ТО: заполните ее перед замером')
+        return vehicle_ids, maintenance_ids
+
+    @staticmethod
+    def run(path, profile, ids, options):
+        """Запускает процессы нагрузки и собирает их результаты."""
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        kinds = ['read'] * options['readers'] + ['write'] * options['writers']
+        processes = [
+            context.Process(target=run_worker, args=(kind, path, profile, options['duration'], ids, results))
+            for kind in kinds
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return collected
+
+    def report(self, name, collected, duration):
+        """Выводит строку результата для каждой операции профиля."""
+        for kind in OPERATIONS:
+            timings = sorted(timing for item_kind, item_timings, _ in collected if item_kind == kind
+                             for timing in item_timings)
+            locked = sum(item_locked for item_kind, _, item_locked in collected if item_kind == kind)
+            p95 = timings[int(len(timings) * 0.95)] * 1000 if timings else 0
+            self.stdout.write(f'{name:<10}{kind:>10}{len(timings) / duration:>10.0f}{p95:>10.1f}{locked:>12}')
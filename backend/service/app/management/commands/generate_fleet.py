@@ -0,0 +1,57 @@
+"""
+Заполнение БД синтетическим парком техники для нагрузочных замеров (см. app.fleet_generator).
+
+Число клиентов и сервисных организаций по умолчанию растет вместе с парком.
+Повторный запуск с тем же --prefix добавляет машины к уже созданным.
+Пользователи получают логины <prefix>-client-00001, <prefix>-service-00001 и пароль --password.
+
+Пример:
+    python manage.py generate_fleet --vehicles 100000 --seed 1
+    DB_PATH=/tmp/fleet-1m.sqlite3 python manage.py generate_fleet --vehicles 1000000
+"""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.fleet_generator import FleetGenerator
+
+
+class Command(BaseCommand):
+    help = 'Создает синтетические справочники, пользователей и технику с историей ТО и рекламаций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=1000, help='Число машин (1 000 — 1 000 000)')
+        parser.add_argument('--clients', type=int, help='Число клиентов (по умолчанию машин / 50, от 5)')
+        parser.add_argument('--services', type=int,
+                            help='Число сервисных организаций (по умолчанию машин / 1000, от 3)')
+        parser.add_argument('--claims-per-vehicle', type=float, default=0.8, help='Среднее число рекламаций на машину')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Машин в одной транзакции')
+        parser.add_argument('--prefix', default='S', help='Префикс заводских номеров и логинов')
+        parser.add_argument('--password', default='password', help='Пароль создаваемых пользователей')
+        parser.add_argument('--seed', type=int, help='Начальное значение генератора (для воспроизводимости)')
+
+    def handle(self, *args, **options):
+        count = options['vehicles']
+        if count < 1:
+            raise CommandError('--vehicles должно быть больше 0')
+        clients = options['clients'] or max(count // 50, 5)
+        services = options['services'] or max(count // 1000, 3)
+
+        generator = FleetGenerator(seed=options['seed'], prefix=options['prefix'],
+                                   batch_size=max(options['batch_size'], 1),
+                                   claims_per_vehicle=options['claims_per_vehicle'])
+        started = perf_counter()
+        generator.prepare(clients, services, options['password'])
+        self.stdout.write(f'Справочники и пользователи готовы: клиентов {clients}, сервисных организаций {services}')
+
+        totals = [0, 0, 0]
+        for batch in generator.generate(count):
+            totals = [total + value for total, value in zip(totals, batch)]
+            if options['verbosity'] > 1 or totals[0] == count or totals[0] % (generator.batch_size * 10) == 0:
+                elapsed = perf_counter() - started
+                self.stdout.write(f'  машин: {totals[0]}, ТО: {totals[1]}, рекламаций: {totals[2]} '
+                                  f'({totals[0] / elapsed:.0f} машин/с)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано машин {totals[0]}, ТО {totals[1]}, рекламаций {totals[2]} за {perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,90 @@
+"""
+Импорт парка техники, истории ТО и рекламаций из CSV/XLSX (см. app.fleet_import).
+
+Технику нужно импортировать раньше ее ТО и рекламаций: они ссылаются на машину
+по заводскому номеру.
+
+После каждой зафиксированной пачки число обработанных строк записывается в файл
+состояния <файл>.import-state; с --resume импорт продолжается с места остановки.
+
+Пример:
+    python manage.py import_fleet fleet.csv --kind vehicles --errors fleet-errors.csv
+    python manage.py import_fleet maintenances.xlsx --kind maintenances --resume
+"""
+
+import csv
+import json
+from pathlib import Path
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.fleet_import import IMPORTERS, ImportFileError, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует технику, ТО или рекламации из CSV/XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл CSV или XLSX')
+        parser.add_argument('--kind', choices=IMPORTERS, required=True, help='Что импортируется')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help='Формат файла (по умолчанию — по расширению)')
+        parser.add_argument('--batch-size', type=int, help='Строк в одной транзакции (по умолчанию IMPORT_BATCH_SIZE)')
+        parser.add_argument('--skip', type=int, default=0, help='Пропустить первые N строк данных')
+        parser.add_argument('--resume', action='store_true', help='Продолжить с места остановки (по файлу состояния)')
+        parser.add_argument('--errors', help='Записать ошибки по строкам в CSV-файл')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл не найден: {path}')
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        state_path = path.with_name(path.name + '.import-state')
+
+        skip = options['skip']
+        if options['resume'] and state_path.exists():
+            state = json.loads(state_path.read_text())
+            if state.get('kind') != options['kind']:
+                raise CommandError(f'Файл состояния {state_path} относится к импорту {state.get("kind")}')
+            skip = state['processed']
+            self.stdout.write(f'Продолжение импорта со строки {skip + 1}')
+
+        def checkpoint(report):
+            state_path.write_text(json.dumps({'kind': options['kind'], 'processed': report.processed}))
+            self.stdout.write(f'  строк: {report.processed}, создано: {report.created}, '
+                              f'пропущено: {report.skipped}, ошибок: {len(report.errors)}')
+
+        importer = IMPORTERS[options['kind']](batch_size=options['batch_size'])
+        started = perf_counter()
+        try:
+            with path.open('rb') as file:
+                report = importer.run(read_rows(file, file_format), skip=skip, on_batch=checkpoint)
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+        elapsed = perf_counter() - started
+        state_path.unlink(missing_ok=True)
+
+        if options['errors']:
+            self.write_errors(options['errors'], report.errors)
+
+        rate = (report.processed - skip) / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {elapsed:.1f} с ({rate:.0f} строк/мин): создано {report.created}, '
+            f'пропущено {report.skipped}, ошибок {len(report.errors)}'
+        ))
+        if report.errors and not options['errors']:
+            for error in report.errors[:20]:
+                self.stdout.write(self.style.WARNING(f'  строка {error["row"]}: {error["errors"]}'))
+            if len(report.errors) > 20:
+                self.stdout.write(self.style.WARNING('  ... полный список — параметр --errors'))
+
+    @staticmethod
+    def write_errors(path, errors):
+        """Записывает ошибки в CSV: строка, колонка, сообщение."""
+        with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+            writer = csv.writer(file)
+            writer.writerow(['row', 'column', 'message'])
+            for error in errors:
+                for column, messages in error['errors'].items():
+                    for message in messages:
+                        writer.writerow([error['row'], column, message])
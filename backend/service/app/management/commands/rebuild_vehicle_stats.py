@@ -0,0 +1,34 @@
+"""
+Перестроение сводки машин (VehicleStats) по ТО и рекламациям.
+
+Сводка поддерживается при каждой записи ТО и рекламаций и не зависит от текущей
+даты; команда нужна для заполнения после прямой загрузки данных в БД и
+восстановления после сбоя.
+
+Пример:
+    python manage.py rebuild_vehicle_stats
+"""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from app import vehicle_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводные показатели машин по ТО и рекламациям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Машин в одной транзакции')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        total = 0
+        for count in vehicle_stats.rebuild(max(options['batch_size'], 1)):
+            total += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Пересчитано машин: {total}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводка пересчитана для {total} машин за {perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,405 @@
+"""
+Метрики API в формате Prometheus и проба готовности.
+
+MetricsMiddleware для каждого запроса записывает в реестр процесса:
+- silant_http_request_duration_seconds — гистограмма времени ответа;
+- silant_http_request_queries — гистограмма числа SQL-запросов (счетчик app.timing);
+- silant_http_response_size_bytes — гистограмма размера ответа (кроме потоковых);
+- silant_http_responses_total — счетчик ответов по классу кода (2xx, 3xx, 4xx, 5xx).
+Метки — маршрут (имя из app/urls.py: vehicles-list, vehicles-detail, search, ...;
+для маршрутов без имени — шаблон пути) и HTTP-метод. ThrottleMiddleware считает
+отклоненные запросы в silant_throttled_requests_total (маршрут и бюджет).
+
+Воркеры копят приращения в памяти, а фоновый поток процесса раз в METRICS_FLUSH_INTERVAL
+секунд прибавляет их к общим значениям в файле SQLite (METRICS_STORE) одной транзакцией
+UPSERT: запись в файл не задерживает ни запросы, ни цикл событий под ASGI.
+Эндпоинт метрик сначала сбрасывает приращения своего процесса, затем читает файл,
+поэтому видит сумму по всем воркерам (приращения других процессов — с задержкой до
+METRICS_FLUSH_INTERVAL). Значения в файле копятся с момента его создания: счетчики
+Prometheus только растут.
+
+Маршруты:
+    GET /api/internal/metrics/ — метрики в текстовом формате Prometheus
+        (только с адресов METRICS_ALLOWED_IPS); включают silant_db_roundtrip_seconds —
+        время SELECT 1 к основной БД в момент опроса
+    GET /api/internal/ready/ — проба готовности (тоже только с адресов METRICS_ALLOWED_IPS):
+        время обращения к БД и общему кэшу; 503, если проверка не прошла или БД отвечает
+        дольше READINESS_DB_MAX_LATENCY. Причина отказа пишется в лог, а не в ответ
+"""
+
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+from time import perf_counter, sleep, time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_safe
+
+from .timing import collect
+
+logger = logging.getLogger('app.metrics')
+
+# Границы корзин гистограмм
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Семейства метрик: имя -> (тип, описание)
+FAMILIES = {
+    'silant_http_request_duration_seconds': ('histogram', 'Время ответа API, секунды'),
+    'silant_http_request_queries': ('histogram', 'Число SQL-запросов на запрос API'),
+    'silant_http_response_size_bytes': ('histogram', 'Размер ответа API, байты'),
+    'silant_http_responses_total': ('counter', 'Ответы API по классу кода'),
+    'silant_throttled_requests_total': ('counter', 'Запросы, отклоненные ограничением частоты'),
+    'silant_db_roundtrip_seconds': ('gauge', 'Время SELECT 1 к основной БД при опросе метрик, секунды'),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Запись пробы готовности в общем кэше: проба пишет ее, только если запись истекла
+PROBE_KEY = 'readiness-probe'
+PROBE_TIMEOUT = 300
+
+# Скрипт создания таблицы значений. Строка — один отсчет Prometheus:
+# семейство, суффикс (_bucket, _sum, _count или пусто), метки, граница корзины le
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metric_value (
+    family TEXT NOT NULL,
+    suffix TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    le TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (family, suffix, labels, le)
+) WITHOUT ROWID
+'''
+
+ADD = '''
+INSERT INTO metric_value (family, suffix, labels, le, value) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (family, suffix, labels, le) DO UPDATE SET value = value + excluded.value
+'''
+
+
+def format_labels(**labels):
+    """Метки в формате Prometheus: route="vehicles-list",method="GET"."""
+    escape = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n'})
+    return ','.join(f'{name}="{str(value).translate(escape)}"' for name, value in labels.items())
+
+
+def format_number(value):
+    """Число отсчета: целые — без дробной части."""
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricStore:
+    """
+    Общие значения метрик в файле SQLite (METRICS_STORE).
+
+    Соединение открывается одно на поток; запись идет без fsync (synchronous=OFF)
+    в режиме WAL, как у счетчиков ограничения частоты (app.throttling).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get_connection(self):
+        """Соединение текущего потока с файлом METRICS_STORE (создает таблицу при первом обращении)."""
+        path = str(settings.METRICS_STORE)
+        db = getattr(self._local, 'connection', None)
+        if db is None or self._local.path != path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute(SCHEMA)
+            self._local.connection, self._local.path = db, path
+        return db
+
+    def add(self, deltas):
+        """
+        Прибавляет приращения к общим значениям одной транзакцией.
+
+        Args:
+            deltas (dict): (семейство, суффикс, метки, le) -> приращение
+        """
+        db = self.get_connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(ADD, [(*key, value) for key, value in deltas.items()])
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def read(self):
+        """Все значения: список (семейство, суффикс, метки, le, значение)."""
+        return self.get_connection().execute('SELECT family, suffix, labels, le, value FROM metric_value').fetchall()
+
+    def clear(self):
+        """Удаляет все значения (для тестов)."""
+        self.get_connection().execute('DELETE FROM metric_value')
+
+
+class Registry:
+    """
+    Реестр метрик процесса: приращения с последнего сброса в общее хранилище.
+
+    Атрибуты:
+        store (MetricStore): Общее хранилище
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._deltas = defaultdict(float)
+        self._lock = threading.Lock()
+        # Процесс, в котором запущен поток сброса (после fork потока в дочернем процессе нет)
+        self._flusher_pid = None
+
+    def inc(self, family, labels, value=1):
+        """
+        Увеличивает счетчик.
+
+        Args:
+            family (str): Семейство (FAMILIES)
+            labels (str): Метки (format_labels)
+            value (float): Приращение
+        """
+        with self._lock:
+            self._deltas[family, '', labels, ''] += value
+
+    def observe(self, family, labels, value, buckets):
+        """
+        Добавляет наблюдение в гистограмму (корзины накопительные, как в Prometheus).
+
+        Args:
+            family (str): Семейство (FAMILIES)
+            labels (str): Метки (format_labels)
+            value (float): Наблюдаемое значение
+            buckets (tuple): Границы корзин по возрастанию
+        """
+        with self._lock:
+            deltas = self._deltas
+            for bound in buckets:
+                if value <= bound:
+                    deltas[family, '_bucket', labels, format_number(bound)] += 1
+            deltas[family, '_bucket', labels, '+Inf'] += 1
+            deltas[family, '_sum', labels, ''] += value
+            deltas[family, '_count', labels, ''] += 1
+
+    def flush(self):
+        """Прибавляет накопленные приращения к общему хранилищу."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(float)
+        if deltas:
+            self.store.add(deltas)
+
+    def start(self):
+        """Запускает в текущем процессе фоновый поток сброса приращений, если он еще не запущен."""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+
+    def _run(self):
+        """Раз в METRICS_FLUSH_INTERVAL секунд сбрасывает приращения; ошибка записи не останавливает поток."""
+        while True:
+            sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать метрики в METRICS_STORE')
+
+    def clear(self):
+        """Сбрасывает приращения процесса и общие значения (для тестов)."""
+        with self._lock:
+            self._deltas.clear()
+        self.store.clear()
+
+
+registry = Registry(MetricStore())
+
+
+@atexit.register
+def _flush_on_exit():
+    """Сбрасывает приращения при завершении воркера."""
+    if settings.configured and settings.METRICS_ENABLED:
+        registry.flush()
+
+
+def get_route(request):
+    """Метка маршрута: имя из URLconf, шаблон пути или unmatched (404 без маршрута)."""
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route
+
+
+def count_throttled(request, scope):
+    """Считает запрос, отклоненный ограничением частоты (вызывается из app.throttling)."""
+    if settings.METRICS_ENABLED:
+        registry.inc('silant_throttled_requests_total', format_labels(route=get_route(request), scope=scope))
+
+
+class MetricsMiddleware:
+    """
+    Middleware метрик запросов (METRICS_ENABLED = True).
+
+    Подключается сразу после ServerTimingMiddleware: число SQL-запросов берется из
+    ее замеров, а если она выключена — из собственных (app.timing.collect).
+    Запрос только обновляет реестр в памяти, в общее хранилище его пишет поток Registry.start().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = perf_counter()
+        with collect() as timings:
+            response = self.get_response(request)
+        self.record(request, response, timings, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        with collect() as timings:
+            response = await self.get_response(request)
+        self.record(request, response, timings, perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, timings, duration):
+        """Записывает метрики запроса в реестр процесса."""
+        labels = format_labels(route=get_route(request), method=request.method)
+        registry.observe('silant_http_request_duration_seconds', labels, duration, LATENCY_BUCKETS)
+        registry.observe('silant_http_request_queries', labels, timings.queries, QUERY_BUCKETS)
+        if not response.streaming:
+            registry.observe('silant_http_response_size_bytes', labels, len(response.content), SIZE_BUCKETS)
+        status = f'{response.status_code // 100}xx'
+        registry.inc('silant_http_responses_total', format_labels(
+            route=get_route(request), method=request.method, status=status,
+        ))
+        # Воркер мог быть создан fork'ом процесса, в котором загружены middleware
+        registry.start()
+
+
+def measure_database():
+    """
+    Время обращения к основной БД (SELECT 1).
+
+    Returns:
+        float: Секунды
+    """
+    started = perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return perf_counter() - started
+
+
+def measure_cache():
+    """
+    Время чтения общего кэша.
+
+    Запись пробы обновляется, только когда она истекла (раз в PROBE_TIMEOUT секунд),
+    а не при каждом опросе.
+
+    Returns:
+        float: Секунды
+
+    Raises:
+        RuntimeError: Если прочитано не то, что записано
+    """
+    started = perf_counter()
+    shared = caches['shared']
+    if shared.get(PROBE_KEY) is None:
+        value = time()
+        shared.set(PROBE_KEY, value, timeout=PROBE_TIMEOUT)
+        if shared.get(PROBE_KEY) != value:
+            raise RuntimeError('Общий кэш не вернул записанное значение')
+    return perf_counter() - started
+
+
+def render(rows, gauges):
+    """
+    Текстовый формат Prometheus.
+
+    Args:
+        rows (list): Значения хранилища (MetricStore.read)
+        gauges (dict): Семейство -> значение (без меток)
+
+    Returns:
+        str: Отсчеты с HELP и TYPE для каждого семейства
+    """
+    suffixes = {'_bucket': 0, '_sum': 1, '_count': 2, '': 0}
+    rows = sorted(rows, key=lambda row: (
+        row[0], row[2], suffixes[row[1]], float(row[3].replace('+Inf', 'inf')) if row[3] else 0,
+    ))
+    lines, family = [], None
+    for name, suffix, labels, le, value in rows + [(name, '', '', '', value) for name, value in gauges.items()]:
+        if name != family:
+            family = name
+            kind, description = FAMILIES[name]
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        if le:
+            labels = f'{labels},le="{le}"'
+        lines.append(f'{name}{suffix}{{{labels}}} {format_number(value)}' if labels else
+                     f'{name}{suffix} {format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+@require_safe
+def metrics_view(request):
+    """Метрики всех воркеров в формате Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    if settings.METRICS_ENABLED:
+        registry.flush()
+    rows = registry.store.read() if settings.METRICS_ENABLED else []
+    gauges = {'silant_db_roundtrip_seconds': measure_database()}
+    return HttpResponse(render(rows, gauges), content_type=CONTENT_TYPE)
+
+
+@require_safe
+def readiness_view(request):
+    """Проба готовности: БД и общий кэш отвечают (время — в миллисекундах)."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    checks = {}
+    for name, measure in (('database', measure_database), ('cache', measure_cache)):
+        try:
+            latency = measure()
+        except Exception:
+            logger.exception('Проба готовности: проверка %s не прошла', name)
+            checks[name] = {'ok': False, 'error': 'Проверка не прошла'}
+        else:
+            checks[name] = {'ok': True, 'latency_ms': round(latency * 1000, 2)}
+    database = checks['database']
+    if database['ok'] and database['latency_ms'] > settings.READINESS_DB_MAX_LATENCY * 1000:
+        database.update(ok=False, error='БД отвечает слишком долго')
+    ready = all(check['ok'] for check in checks.values())
+    return JsonResponse({'ready': ready, 'checks': checks}, status=200 if ready else 503,
+                        json_dumps_params={'ensure_ascii': False})
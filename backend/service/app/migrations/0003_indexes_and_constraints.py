@@ -0,0 +1,86 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_maintenance_types(apps, schema_editor):
+    """
+    Проверяет, что у машин нет нескольких ТО одного вида, до добавления unique_vehicle_maintenance_type.
+
+    Повторяющиеся записи не удаляются автоматически: это история обслуживания,
+    и какую из записей оставить, решает менеджер (в админке).
+
+    Raises:
+        RuntimeError: Если повторяющиеся ТО есть; в сообщении перечислены машины, виды ТО и id записей
+    """
+    Maintenance = apps.get_model('app', 'Maintenance')
+    duplicates = (Maintenance.objects.values('vehicle_id', 'maintenance_type_id')
+                  .annotate(count=Count('id')).filter(count__gt=1)
+                  .order_by('vehicle_id', 'maintenance_type_id'))
+    lines = []
+    for duplicate in duplicates:
+        records = (Maintenance.objects.filter(vehicle_id=duplicate['vehicle_id'],
+                                              maintenance_type_id=duplicate['maintenance_type_id'])
+                   .select_related('vehicle', 'maintenance_type').order_by('id'))
+        first = records[0]
+        lines.append(f'- машина {first.vehicle.factory_number}, {first.maintenance_type.name}: '
+                     f'записи {", ".join(str(record.pk) for record in records)}')
+    if lines:
+        raise RuntimeError(
+            'Нельзя добавить ограничение unique_vehicle_maintenance_type: у машин есть несколько ТО одного вида. '
+            'Удалите или исправьте лишние записи и повторите миграцию.\n' + '\n'.join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_referencedirectory_alter_user_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='warrantyclaim',
+            options={'verbose_name': 'Рекламация', 'verbose_name_plural': 'Рекламации'},
+        ),
+        migrations.AlterField(
+            model_name='warrantyclaim',
+            name='node_fail',
+            field=models.ForeignKey(limit_choices_to={'ref_type': 'node_fail'}, on_delete=django.db.models.deletion.CASCADE, related_name='node_fail', to='app.referencedirectory', verbose_name='Узел отказа'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['vehicle', 'maintenance_date'], name='maintenance_vehicle_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['maintenance_date', 'id'], name='maintenance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referencedirectory',
+            index=models.Index(fields=['ref_type', 'name'], name='ref_type_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['client', 'id'], name='vehicle_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['service', 'id'], name='vehicle_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='warrantyclaim',
+            index=models.Index(fields=['vehicle', 'failure_date'], name='claim_vehicle_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='warrantyclaim',
+            index=models.Index(fields=['failure_date', 'id'], name='claim_failure_date_idx'),
+        ),
+        migrations.RunPython(check_duplicate_maintenance_types, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='maintenance',
+            constraint=models.UniqueConstraint(fields=('vehicle', 'maintenance_type'), name='unique_vehicle_maintenance_type'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def fill_vehicle_stats(apps, schema_editor):
+    """Строит сводку для существующих машин (то же, что команда rebuild_vehicle_stats)."""
+    Vehicle = apps.get_model('app', 'Vehicle')
+    Maintenance = apps.get_model('app', 'Maintenance')
+    WarrantyClaim = apps.get_model('app', 'WarrantyClaim')
+    VehicleStats = apps.get_model('app', 'VehicleStats')
+
+    stats = {pk: VehicleStats(vehicle_id=pk) for pk in Vehicle.objects.values_list('pk', flat=True)}
+    for row in (Maintenance.objects.order_by().values('vehicle_id')
+                .annotate(count=Count('id'), last_date=Max('maintenance_date'), operating_time=Max('operating_time'))):
+        item = stats[row['vehicle_id']]
+        item.maintenance_count = row['count']
+        item.last_maintenance_date = row['last_date']
+        item.operating_time = max(item.operating_time, row['operating_time'])
+    for row in (WarrantyClaim.objects.order_by().values('vehicle_id')
+                .annotate(count=Count('id'), last_recovery_date=Max('recovery_date'),
+                          downtime=Sum('downtime'), operating_time=Max('operating_time'))):
+        item = stats[row['vehicle_id']]
+        item.claim_count = row['count']
+        item.last_recovery_date = row['last_recovery_date']
+        item.total_downtime = row['downtime']
+        item.operating_time = max(item.operating_time, row['operating_time'])
+    VehicleStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleStats',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.vehicle', verbose_name='Машина')),
+                ('maintenance_count', models.PositiveIntegerField(default=0, verbose_name='Количество ТО')),
+                ('last_maintenance_date', models.DateField(blank=True, null=True, verbose_name='Дата последнего ТО')),
+                ('claim_count', models.PositiveIntegerField(default=0, verbose_name='Количество рекламаций')),
+                ('last_recovery_date', models.DateField(blank=True, null=True, verbose_name='Дата восстановления последней рекламации')),
+                ('total_downtime', models.IntegerField(default=0, verbose_name='Суммарное время простоя')),
+                ('operating_time', models.IntegerField(default=0, verbose_name='Последняя наработка, м/час')),
+            ],
+            options={
+                'verbose_name': 'Сводка по машине',
+                'verbose_name_plural': 'Сводки по машинам',
+                'indexes': [models.Index(fields=['maintenance_count', 'vehicle'], name='stats_maintenance_count_idx'), models.Index(fields=['claim_count', 'vehicle'], name='stats_claim_count_idx'), models.Index(fields=['total_downtime', 'vehicle'], name='stats_total_downtime_idx'), models.Index(fields=['operating_time', 'vehicle'], name='stats_operating_time_idx')],
+            },
+        ),
+        migrations.RunPython(fill_vehicle_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+"""
+Полнотекстовые индексы SQLite FTS5 для поиска по технике и рекламациям (app.search).
+
+Индексы хранят только токены (external content): текст читается из таблиц
+app_vehicle и app_warrantyclaim. Синхронизацию выполняют триггеры, поэтому
+индекс актуален и после bulk_create/bulk_update, которые не отправляют сигналы.
+Токенизатор trigram позволяет искать по части слова или номера без учета регистра.
+"""
+
+from django.db import migrations
+
+INDEXES = {
+    'vehicle_search': ('app_vehicle', ('factory_number', 'recipient', 'delivery_address', 'equipment')),
+    'claim_search': ('app_warrantyclaim', ('fail_description', 'spare_parts')),
+}
+
+
+def create_sql(index, table, columns):
+    """SQL создания индекса, триггеров синхронизации и заполнения по текущим данным."""
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {index} USING fts5({names}, content='{table}', content_rowid='id', "
+        f"tokenize='trigram')",
+        f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {index} (rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {index}_update AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {index} (rowid, {names}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {index} ({index}) VALUES ('rebuild')",
+    ]
+
+
+def drop_sql(index):
+    """SQL удаления индекса и его триггеров."""
+    return [f'DROP TRIGGER {index}_{event}' for event in ('insert', 'delete', 'update')] + [f'DROP TABLE {index}']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_vehicle_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(create_sql(index, table, columns), drop_sql(index))
+        for index, (table, columns) in INDEXES.items()
+    ]
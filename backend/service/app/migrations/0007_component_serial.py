@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+KIND_FIELDS = {
+    'factory': 'factory_number',
+    'engine': 'engine_number',
+    'transmission': 'transmission_number',
+    'drive_bridge': 'drive_bridge_number',
+    'control_bridge': 'control_bridge_number',
+}
+
+
+def insert_sql(source):
+    """INSERT номеров машины (source — new в триггере) во все типы агрегатов."""
+    return ' '.join(
+        f"INSERT INTO app_componentserial (serial, kind, vehicle_id) VALUES ({source}.{field}, '{kind}', {source}.id);"
+        for kind, field in KIND_FIELDS.items()
+    )
+
+
+# Триггеры поддерживают индекс при любой записи техники, в том числе bulk_create/update()
+# и прямых запросах; удаление машины через ORM удаляет номера каскадом, триггер — при SQL DELETE
+CREATE_SQL = [
+    f"CREATE TRIGGER component_serial_insert AFTER INSERT ON app_vehicle BEGIN {insert_sql('new')} END",
+    "CREATE TRIGGER component_serial_update AFTER UPDATE OF {fields} ON app_vehicle WHEN {changed} BEGIN "
+    "DELETE FROM app_componentserial WHERE vehicle_id = old.id; {insert} END".format(
+        fields=', '.join(KIND_FIELDS.values()),
+        changed=' OR '.join(f'old.{field} IS NOT new.{field}' for field in KIND_FIELDS.values()),
+        insert=insert_sql('new'),
+    ),
+    "CREATE TRIGGER component_serial_delete AFTER DELETE ON app_vehicle BEGIN "
+    "DELETE FROM app_componentserial WHERE vehicle_id = old.id; END",
+    'INSERT INTO app_componentserial (serial, kind, vehicle_id) ' + ' UNION ALL '.join(
+        f"SELECT {field}, '{kind}', id FROM app_vehicle" for kind, field in KIND_FIELDS.items()
+    ),
+]
+
+DROP_SQL = [f'DROP TRIGGER component_serial_{event}' for event in ('insert', 'update', 'delete')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComponentSerial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial', models.CharField(max_length=128, verbose_name='Заводской номер')),
+                ('kind', models.CharField(choices=[('factory', 'Машина'), ('engine', 'Двигатель'), ('transmission', 'Трансмиссия'), ('drive_bridge', 'Ведущий мост'), ('control_bridge', 'Управляемый мост')], max_length=16, verbose_name='Агрегат')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='serials', to='app.vehicle', verbose_name='Машина')),
+            ],
+            options={
+                'verbose_name': 'Заводской номер агрегата',
+                'verbose_name_plural': 'Заводские номера агрегатов',
+                'constraints': [models.UniqueConstraint(fields=('serial', 'kind'), name='component_serial_unique')],
+            },
+        ),
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
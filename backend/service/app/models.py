@@ -7,10 +7,12 @@
 - Vehicle - модель техники
 - Maintenance - записи о техническом обслуживании
 - WarrantyClaim - рекламации по гарантии
+- VehicleStats - сводные показатели машины по ТО и рекламациям
 """
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -73,6 +75,7 @@ class ReferenceDirectory(models.Model):
     ref_type = models.CharField(max_length=32, choices=DIR_TYPES, verbose_name='Тип справочника')
     name = models.CharField(max_length=128, verbose_name='Название')
     description = models.TextField(blank=True, null=True, verbose_name='Описание')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     def __str__(self):
         """Строковое представление справочника (название)."""
@@ -81,6 +84,10 @@ class ReferenceDirectory(models.Model):
     class Meta:
         verbose_name = 'Справочник'
         verbose_name_plural = 'Справочники'
+        indexes = [
+            # Выборка справочника по типу (валидация ссылок, выпадающие списки)
+            models.Index(fields=['ref_type', 'name'], name='ref_type_name_idx'),
+        ]
 
 
 class Vehicle(models.Model):
@@ -128,17 +135,71 @@ class Vehicle(models.Model):
                                related_name='clients', verbose_name='Клиент')
     service = models.ForeignKey(User, limit_choices_to={'type': 'SO'}, on_delete=models.CASCADE,
                                 related_name='services', verbose_name='Сервисная компания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     def __str__(self):
         """Строковое представление техники (заводской номер)."""
         return self.factory_number
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает заводской номер, под которым машина была загружена."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_factory_number = instance.__dict__.get('factory_number')
+        return instance
+
+    def get_public_numbers(self):
+        """Заводские номера, публичные карточки которых затрагивает изменение: текущий и исходный."""
+        return {self.factory_number, getattr(self, '_loaded_factory_number', None)} - {None}
+
+    def save(self, *args, **kwargs):
+        """Сохранение машины с запоминанием нового заводского номера."""
+        super().save(*args, **kwargs)
+        self._loaded_factory_number = self.factory_number
+
     class Meta:
         verbose_name = 'Машина'
         verbose_name_plural = 'Машины'
+        indexes = [
+            # Списки техники клиента и сервисной организации в порядке keyset-пагинации
+            models.Index(fields=['client', 'id'], name='vehicle_client_idx'),
+            models.Index(fields=['service', 'id'], name='vehicle_service_idx'),
+        ]
 
 
-class Maintenance(models.Model):
+class VehicleHistoryModel(models.Model):
+    """
+    Базовая модель записей истории машины (ТО, рекламации).
+
+    От этих записей зависит сводка VehicleStats: она пересчитывается обработчиками
+    сигналов (app.signals) в той же транзакции, что и запись, поэтому save()
+    выполняется в transaction.atomic(). Машина, к которой запись относилась
+    при загрузке из БД, запоминается, чтобы при переносе записи на другую машину
+    пересчитать обе.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает машину, к которой запись относилась при загрузке."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_vehicle_id = instance.__dict__.get('vehicle_id')
+        return instance
+
+    def get_stats_vehicle_ids(self):
+        """Машины, сводку которых затрагивает запись: текущая и исходная."""
+        return {self.vehicle_id, getattr(self, '_loaded_vehicle_id', None)} - {None}
+
+    def save(self, *args, **kwargs):
+        """Сохранение записи вместе с пересчетом сводки в одной транзакции."""
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+        self._loaded_vehicle_id = self.vehicle_id
+
+
+class Maintenance(VehicleHistoryModel):
     """
     Модель записи о техническом обслуживании (ТО).
 
@@ -161,6 +222,7 @@ class Maintenance(models.Model):
     service = models.ForeignKey(User, limit_choices_to={'type': 'SO'}, on_delete=models.SET_NULL,
                                 null=True, blank=True, related_name='company_maintenance',
                                 verbose_name='Организация, проводившая ТО')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     def get_value(self):
         """Возвращает строковое представление сервисной организации или 'Самостоятельно'."""
@@ -171,10 +233,18 @@ class Maintenance(models.Model):
     class Meta:
         verbose_name = 'TO'
         verbose_name_plural = 'TO'
+        constraints = [
+            # Для машины может быть только одно ТО каждого вида
+            models.UniqueConstraint(fields=['vehicle', 'maintenance_type'], name='unique_vehicle_maintenance_type'),
+        ]
+        indexes = [
+            models.Index(fields=['vehicle', 'maintenance_date'], name='maintenance_vehicle_date_idx'),
+            models.Index(fields=['maintenance_date', 'id'], name='maintenance_date_idx'),
+        ]
 
 
 
-class WarrantyClaim(models.Model):
+class WarrantyClaim(VehicleHistoryModel):
     """
     Модель рекламации по гарантии.
 
@@ -201,13 +271,118 @@ class WarrantyClaim(models.Model):
     downtime = models.IntegerField(editable=False, verbose_name='Время простоя техники')
     service = models.ForeignKey(User, limit_choices_to={'type': 'SO'}, on_delete=models.CASCADE,
                                 related_name='company_warranty_claim', verbose_name='Cервисная компания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+
+    def compute_downtime(self):
+        """Расчет времени простоя (в днях) по датам отказа и восстановления."""
+        self.downtime = (self.recovery_date - self.failure_date).days
 
     def save(self, *args, **kwargs):
         """Автоматический расчет времени простоя при сохранении."""
-        self.downtime = (self.recovery_date - self.failure_date).days
+        self.compute_downtime()
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = 'Рекламация'
         verbose_name_plural = 'Рекламации'
+        indexes = [
+            models.Index(fields=['vehicle', 'failure_date'], name='claim_vehicle_date_idx'),
+            models.Index(fields=['failure_date', 'id'], name='claim_failure_date_idx'),
+        ]
 
+
+class VehicleStats(models.Model):
+    """
+    Сводные показатели машины по ТО и рекламациям (денормализация для списков и дашбордов).
+
+    Строка пересчитывается при каждом изменении ТО и рекламаций машины
+    (app.vehicle_stats.refresh) и перестраивается командой rebuild_vehicle_stats.
+    Хранятся только значения, не зависящие от текущей даты: число незакрытых рекламаций
+    (с датой восстановления позже текущей) считается при чтении (get_open_claims,
+    app.vehicle_stats.open_claims).
+    """
+
+    vehicle = models.OneToOneField(Vehicle, primary_key=True, on_delete=models.CASCADE, related_name='stats',
+                                   verbose_name='Машина')
+    maintenance_count = models.PositiveIntegerField(default=0, verbose_name='Количество ТО')
+    last_maintenance_date = models.DateField(null=True, blank=True, verbose_name='Дата последнего ТО')
+    claim_count = models.PositiveIntegerField(default=0, verbose_name='Количество рекламаций')
+    last_recovery_date = models.DateField(null=True, blank=True,
+                                          verbose_name='Дата восстановления последней рекламации')
+    total_downtime = models.IntegerField(default=0, verbose_name='Суммарное время простоя')
+    operating_time = models.IntegerField(default=0, verbose_name='Последняя наработка, м/час')
+
+    def __str__(self):
+        """Строковое представление сводки (заводской номер машины)."""
+        return str(self.vehicle_id)
+
+    def get_open_claims(self, today=None):
+        """
+        Число незакрытых рекламаций машины на дату.
+
+        Запрос выполняется, только если дата восстановления последней рекламации еще не наступила.
+
+        Args:
+            today (date | None): Дата (по умолчанию — текущая)
+
+        Returns:
+            int: Число рекламаций с датой восстановления позже today
+        """
+        today = today or timezone.localdate()
+        if self.last_recovery_date is None or self.last_recovery_date <= today:
+            return 0
+        return WarrantyClaim.objects.filter(vehicle_id=self.vehicle_id, recovery_date__gt=today).count()
+
+    class Meta:
+        verbose_name = 'Сводка по машине'
+        verbose_name_plural = 'Сводки по машинам'
+        indexes = [
+            # Сортировка списка техники по показателям (ordering=stats__...) в порядке keyset-пагинации
+            models.Index(fields=['maintenance_count', 'vehicle'], name='stats_maintenance_count_idx'),
+            models.Index(fields=['claim_count', 'vehicle'], name='stats_claim_count_idx'),
+            models.Index(fields=['total_downtime', 'vehicle'], name='stats_total_downtime_idx'),
+            models.Index(fields=['operating_time', 'vehicle'], name='stats_operating_time_idx'),
+        ]
+
+
+class ComponentSerial(models.Model):
+    """
+    Единый индекс заводских номеров машины и ее агрегатов: номер -> машина.
+
+    Позволяет найти машину по номеру любого агрегата (двигателя, моста и т. д.) одним
+    запросом по индексу вместо OR по пяти столбцам и подсказывать номера по началу.
+    Строки создаются, обновляются и удаляются триггерами на app_vehicle (миграция
+    0007_component_serial), поэтому индекс актуален и при пакетной записи техники.
+    """
+
+    # Тип номера -> столбец Vehicle
+    KIND_FIELDS = {
+        'factory': 'factory_number',
+        'engine': 'engine_number',
+        'transmission': 'transmission_number',
+        'drive_bridge': 'drive_bridge_number',
+        'control_bridge': 'control_bridge_number',
+    }
+    KINDS = [
+        ('factory', 'Машина'),
+        ('engine', 'Двигатель'),
+        ('transmission', 'Трансмиссия'),
+        ('drive_bridge', 'Ведущий мост'),
+        ('control_bridge', 'Управляемый мост'),
+    ]
+
+    serial = models.CharField(max_length=128, verbose_name='Заводской номер')
+    kind = models.CharField(max_length=16, choices=KINDS, verbose_name='Агрегат')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='serials', verbose_name='Машина')
+
+    def __str__(self):
+        """Строковое представление (заводской номер)."""
+        return self.serial
+
+    class Meta:
+        verbose_name = 'Заводской номер агрегата'
+        verbose_name_plural = 'Заводские номера агрегатов'
+        constraints = [
+            # Номер ищется по равенству и по началу (диапазон по индексу), порядок — по номеру
+            models.UniqueConstraint(fields=['serial', 'kind'], name='component_serial_unique'),
+        ]
@@ -0,0 +1,207 @@
+"""
+Курсорная (keyset) пагинация для списочных эндпоинтов API.
+
+В отличие от стандартной CursorPagination из DRF, позиция курсора хранит значения
+всех полей сортировки, а не только первого. Благодаря этому страница выбирается
+условием вида (date, id) > (d, i) по индексу, без OFFSET и без смещения внутри
+групп одинаковых значений (например, нескольких ТО за одну дату).
+
+Пагинация включается, если клиент передал параметр cursor или page_size.
+Запросы без этих параметров получают прежний ответ — полный список, на который
+рассчитан текущий фронтенд.
+"""
+
+import contextlib
+import json
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor, _positive_int, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset-пагинация по составному ключу сортировки.
+
+    Сортировка берется из OrderingFilter или атрибута ordering представления.
+    Если в ней нет первичного ключа, он добавляется последним полем, чтобы
+    позиция курсора была уникальной. Поля сортировки не должны допускать NULL.
+    """
+
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+
+    def is_requested(self, request):
+        """
+        Проверяет, запросил ли клиент постраничную выдачу.
+
+        Args:
+            request: Запрос
+
+        Returns:
+            bool: True если передан cursor или page_size, либо пагинация включена по умолчанию
+        """
+        if settings.API_PAGINATE_BY_DEFAULT:
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        """
+        Возвращает размер страницы.
+
+        Настройки API_PAGE_SIZE и API_MAX_PAGE_SIZE читаются при каждом запросе,
+        а не при объявлении класса.
+
+        Args:
+            request: Запрос
+
+        Returns:
+            int: page_size из запроса (не больше API_MAX_PAGE_SIZE) или API_PAGE_SIZE
+        """
+        with contextlib.suppress(KeyError, ValueError):
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=settings.API_MAX_PAGE_SIZE)
+        return settings.API_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Возвращает сортировку, дополненную первичным ключом.
+
+        Сортировка берется из бэкенда фильтрации с методом get_ordering
+        (OrderingFilter), затем из атрибута ordering представления.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = ordering or getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Возвращает страницу объектов, следующую за позицией курсора.
+
+        Args:
+            queryset: Исходная выборка
+            request: Запрос
+            view: Представление
+
+        Returns:
+            list | None: Объекты страницы или None, если пагинация не запрошена
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            # Значения позиции приводятся к типам полей здесь: подмененный курсор — 404, а не 500
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(ordering, current_position))
+            except (ValueError, TypeError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Лишняя запись нужна только для того, чтобы узнать, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Строит условие "строго после позиции" для составного ключа сортировки.
+
+        Для ключа (a, b, c) условие раскрывается в
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc),
+        где знак сравнения зависит от направления сортировки каждого поля.
+
+        Args:
+            ordering (tuple): Поля сортировки в порядке выборки
+            position (str): Позиция из курсора
+
+        Returns:
+            Q: Условие фильтрации
+
+        Raises:
+            NotFound: Если позиция курсора повреждена
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        conditions = []
+        for index, field in enumerate(ordering):
+            attr = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {ordering[i].lstrip('-'): values[i] for i in range(index)}
+            conditions.append(Q(**equal, **{f'{attr}__{lookup}': values[index]}))
+
+        return reduce(lambda left, right: left | right, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """
+        Сериализует значения всех полей сортировки объекта в позицию курсора.
+
+        Объект — экземпляр модели (связи обходятся по __) или именованный кортеж
+        values_list(), в котором поле называется полным путем ORM.
+        """
+        values = []
+        for field in ordering:
+            path = field.lstrip('-')
+            if hasattr(instance, path):
+                value = getattr(instance, path)
+            else:
+                value = instance
+                for attr in path.split('__'):
+                    value = getattr(value, attr)
+            values.append(str(value))
+        return json.dumps(values)
+
+    def get_next_link(self):
+        """Ссылка на следующую страницу: позиция последнего объекта текущей."""
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        """Ссылка на предыдущую страницу: позиция первого объекта текущей, в обратном порядке."""
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
@@ -148,12 +148,12 @@ class VehiclePermission(permissions.BasePermission):
 
         if request.user.type == 'CL':
             return (
-                request.method == 'GET' and obj.client == request.user
+                request.method == 'GET' and obj.client_id == request.user.pk
             )
 
         if request.user.type == 'SO':
             return (
-                request.method == 'GET' and obj.service == request.user
+                request.method == 'GET' and obj.service_id == request.user.pk
             )
 
         return False
@@ -206,12 +206,12 @@ class MaintenancePermission(permissions.BasePermission):
 
         if user.type == 'CL':
             if request.method in ['GET', 'POST', 'PUT', 'DELETE']:
-                return obj.vehicle.client == user
+                return obj.vehicle.client_id == user.pk
             return False
 
         if user.type == 'SO':
             if request.method in ['GET', 'POST', 'PUT', 'DELETE']:
-                return obj.vehicle.service == user
+                return obj.vehicle.service_id == user.pk
             return False
 
         return False
@@ -264,13 +264,53 @@ class WarrantyClaimPermission(permissions.BasePermission):
             return True
 
         if user.type == 'CL':
-            return request.method == 'GET' and obj.vehicle.client == user
+            return request.method == 'GET' and obj.vehicle.client_id == user.pk
 
         if user.type == 'SO':
             if request.method in ['GET', 'POST', 'PUT', 'DELETE']:
-                return obj.vehicle.service == user
+                return obj.vehicle.service_id == user.pk
             return False
 
         return False
 
 
+class FleetImportPermission(permissions.BasePermission):
+    """
+    Разрешения для импорта парка техники.
+
+    Доступ только для менеджеров (MR).
+    """
+
+    def has_permission(self, request, view):
+        """
+        Проверяет, что пользователь — менеджер.
+
+        Args:
+            request: Запрос
+            view: Представление
+
+        Returns:
+            bool: True если пользователь аутентифицирован и является менеджером (MR)
+        """
+        return request.user.is_authenticated and request.user.type == 'MR'
+
+
+class SearchPermission(permissions.BasePermission):
+    """
+    Разрешения для полнотекстового поиска.
+
+    Доступ для всех аутентифицированных пользователей; выдача ограничивается ролью (app.search).
+    """
+
+    def has_permission(self, request, view):
+        """
+        Проверяет, что пользователь аутентифицирован.
+
+        Args:
+            request: Запрос
+            view: Представление
+
+        Returns:
+            bool: True если пользователь аутентифицирован
+        """
+        return request.user.is_authenticated
@@ -0,0 +1,332 @@
+"""
+Быстрый путь чтения списков через values_list().
+
+Для списков техники, ТО и рекламаций DRF создает экземпляр модели, вложенные
+сериализаторы справочников и словари SerializerMethodField на каждую строку.
+Проекция выбирает плоские кортежи через values_list() (связи разрешаются JOIN'ами
+в том же запросе), вложенные справочники берет готовыми из кэша справочников
+и собирает ровно ту же структуру JSON, что и соответствующий сериализатор.
+
+Поля *_id тоже попадают в ответ: extra_kwargs write_only не действует на поля,
+явно объявленные в сериализаторе, и проекции воспроизводят это поведение.
+
+Соответствие вывода проекций сериализаторам проверяется тестами (app.tests)
+и командой benchmark_projections.
+"""
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from . import reference_cache, vehicle_stats
+from .timing import timed
+from .serializers import ReferenceDirectorySerializer, VehicleSerializer, VehiclePublicSerializer, \
+    MaintenanceSerializer, WarrantyClaimSerializer, VehicleStatsSerializer
+
+STATS_FIELDS = VehicleStatsSerializer.Meta.fields
+
+
+def _date(value):
+    """Дата в формате, который выдает DateField сериализатора."""
+    return value.isoformat() if value else None
+
+
+class Projection:
+    """
+    Базовая проекция списка.
+
+    Атрибуты:
+        serializer_class: Сериализатор, вывод которого воспроизводит проекция
+        columns (tuple): Колонки values_list() (пути ORM, допускаются связи через __)
+        annotations (dict): Вычисляемые колонки: имя -> функция, возвращающая выражение
+            (добавляются, если выборка еще не содержит аннотацию с этим именем)
+    """
+
+    serializer_class = None
+    columns = ()
+    annotations = {}
+
+    def get_rows(self, queryset, extra_columns=()):
+        """
+        Возвращает выборку именованных кортежей.
+
+        Args:
+            queryset: Выборка модели с фильтрами и сортировкой
+            extra_columns (iterable): Дополнительные колонки (например, поля сортировки
+                для позиции курсора пагинации)
+
+        Returns:
+            QuerySet: values_list(named=True)
+        """
+        missing = {name: expression() for name, expression in self.annotations.items()
+                   if name not in queryset.query.annotations}
+        if missing:
+            queryset = queryset.annotate(**missing)
+        columns = list(self.columns)
+        columns += [column for column in extra_columns if column not in columns]
+        return queryset.values_list(*columns, named=True)
+
+    def get_references(self):
+        """Сериализованные справочники по id из кэша справочников."""
+        return reference_cache.get_snapshot().serialized_by_id(ReferenceDirectorySerializer)
+
+    def serialize(self, rows):
+        """
+        Собирает данные ответа по строкам выборки.
+
+        Если строка ссылается на справочник, которого еще нет в снимке (снимок
+        устарел), снимок перечитывается один раз.
+
+        Args:
+            rows (iterable): Строки из get_rows()
+
+        Returns:
+            list: Данные в формате serializer_class(many=True).data
+        """
+        rows = list(rows)
+        with timed('serialize'):
+            try:
+                return [self.build(row, self.get_references()) for row in rows]
+            except KeyError:
+                reference_cache.invalidate()
+                return [self.build(row, self.get_references()) for row in rows]
+
+    async def aserialize(self, rows):
+        """
+        Асинхронный serialize() для асинхронных представлений (app.async_views).
+
+        Args:
+            rows: Выборка из get_rows() (читается async ORM) или уже прочитанные строки
+
+        Returns:
+            list: Данные в формате serializer_class(many=True).data
+        """
+        if hasattr(rows, '__aiter__'):
+            rows = [row async for row in rows]
+        references = (await reference_cache.aget_snapshot()).serialized_by_id(ReferenceDirectorySerializer)
+        with timed('serialize'):
+            try:
+                return [self.build(row, references) for row in rows]
+            except KeyError:
+                reference_cache.invalidate()
+        references = (await reference_cache.aget_snapshot()).serialized_by_id(ReferenceDirectorySerializer)
+        with timed('serialize'):
+            return [self.build(row, references) for row in rows]
+
+    def iter_serialize(self, rows):
+        """
+        Лениво собирает данные ответа по строкам выборки (для потоковой выдачи).
+
+        Args:
+            rows (iterable): Строки из get_rows(), обычно через .iterator()
+
+        Yields:
+            dict: Данные одной строки
+        """
+        references = self.get_references()
+        for row in rows:
+            try:
+                yield self.build(row, references)
+            except KeyError:
+                reference_cache.invalidate()
+                references = self.get_references()
+                yield self.build(row, references)
+
+    def build(self, row, references):
+        """Собирает данные одной строки."""
+        raise NotImplementedError
+
+
+class VehicleProjection(Projection):
+    """Проекция VehicleSerializer."""
+
+    serializer_class = VehicleSerializer
+    columns = (
+        'id', 'factory_number', 'vehicle_model_id', 'engine_model_id', 'engine_number', 'transmission_model_id',
+        'transmission_number', 'drive_bridge_model_id', 'drive_bridge_number', 'control_bridge_model_id',
+        'control_bridge_number', 'supply_contract', 'shipping_date', 'recipient', 'delivery_address', 'equipment',
+        'client_id', 'client__fullname', 'service_id', 'service__fullname',
+    ) + tuple(f'stats__{name}' for name in STATS_FIELDS if name != 'open_claims') + ('open_claims',)
+    # Число незакрытых рекламаций зависит от текущей даты и считается при чтении
+    annotations = {'open_claims': vehicle_stats.open_claims}
+
+    def build(self, row, references):
+        """Собирает данные техники."""
+        return {
+            'id': row.id,
+            'factory_number': row.factory_number,
+            'vehicle_model': references[row.vehicle_model_id],
+            'vehicle_model_id': row.vehicle_model_id,
+            'engine_model': references[row.engine_model_id],
+            'engine_model_id': row.engine_model_id,
+            'engine_number': row.engine_number,
+            'transmission_model': references[row.transmission_model_id],
+            'transmission_model_id': row.transmission_model_id,
+            'transmission_number': row.transmission_number,
+            'drive_bridge_model': references[row.drive_bridge_model_id],
+            'drive_bridge_model_id': row.drive_bridge_model_id,
+            'drive_bridge_number': row.drive_bridge_number,
+            'control_bridge_model': references[row.control_bridge_model_id],
+            'control_bridge_model_id': row.control_bridge_model_id,
+            'control_bridge_number': row.control_bridge_number,
+            'supply_contract': row.supply_contract,
+            'shipping_date': _date(row.shipping_date),
+            'recipient': row.recipient,
+            'delivery_address': row.delivery_address,
+            'equipment': row.equipment,
+            'client': {'id': row.client_id, 'fullname': row.client__fullname},
+            'client_id': row.client_id,
+            'service': {'id': row.service_id, 'fullname': row.service__fullname},
+            'service_id': row.service_id,
+            'stats': self.build_stats(row),
+        }
+
+    @staticmethod
+    def build_stats(row):
+        """Сводка машины (LEFT JOIN: None, если строки сводки нет)."""
+        if row.stats__maintenance_count is None:
+            return None
+        return {
+            'maintenance_count': row.stats__maintenance_count,
+            'last_maintenance_date': _date(row.stats__last_maintenance_date),
+            'claim_count': row.stats__claim_count,
+            'open_claims': row.open_claims,
+            'total_downtime': row.stats__total_downtime,
+            'operating_time': row.stats__operating_time,
+        }
+
+
+class VehiclePublicProjection(Projection):
+    """Проекция VehiclePublicSerializer."""
+
+    serializer_class = VehiclePublicSerializer
+    columns = (
+        'factory_number', 'vehicle_model_id', 'engine_model_id', 'engine_number', 'transmission_model_id',
+        'transmission_number', 'drive_bridge_model_id', 'drive_bridge_number', 'control_bridge_model_id',
+        'control_bridge_number',
+    )
+
+    def build(self, row, references):
+        """Собирает публичные данные техники."""
+        return {
+            'factory_number': row.factory_number,
+            'vehicle_model': references[row.vehicle_model_id]['name'],
+            'engine_model': references[row.engine_model_id]['name'],
+            'engine_number': row.engine_number,
+            'transmission_model': references[row.transmission_model_id]['name'],
+            'transmission_number': row.transmission_number,
+            'drive_bridge_model': references[row.drive_bridge_model_id]['name'],
+            'drive_bridge_number': row.drive_bridge_number,
+            'control_bridge_model': references[row.control_bridge_model_id]['name'],
+            'control_bridge_number': row.control_bridge_number,
+        }
+
+
+class MaintenanceProjection(Projection):
+    """Проекция MaintenanceSerializer."""
+
+    serializer_class = MaintenanceSerializer
+    columns = (
+        'id', 'vehicle_id', 'vehicle__factory_number', 'maintenance_type_id', 'maintenance_date', 'operating_time',
+        'order_number', 'order_date', 'service_id', 'service__fullname',
+    )
+
+    def build(self, row, references):
+        """Собирает данные записи ТО."""
+        return {
+            'id': row.id,
+            'vehicle': {'id': row.vehicle_id, 'number': row.vehicle__factory_number},
+            'vehicle_id': row.vehicle_id,
+            'maintenance_type': references[row.maintenance_type_id],
+            'maintenance_type_id': row.maintenance_type_id,
+            'maintenance_date': _date(row.maintenance_date),
+            'operating_time': row.operating_time,
+            'order_number': row.order_number,
+            'order_date': _date(row.order_date),
+            'service': {
+                'id': row.service_id if row.service_id else '',
+                'fullname': row.service__fullname if row.service_id else 'Cамостоятельно',
+            },
+        }
+
+
+class WarrantyClaimProjection(Projection):
+    """Проекция WarrantyClaimSerializer."""
+
+    serializer_class = WarrantyClaimSerializer
+    columns = (
+        'id', 'node_fail_id', 'method_recovery_id', 'vehicle_id', 'vehicle__factory_number', 'downtime',
+        'operating_time', 'fail_description', 'failure_date', 'recovery_date', 'spare_parts', 'service_id',
+        'service__fullname',
+    )
+
+    def build(self, row, references):
+        """Собирает данные рекламации."""
+        return {
+            'id': row.id,
+            'node_fail': references[row.node_fail_id],
+            'node_fail_id': row.node_fail_id,
+            'method_recovery': references[row.method_recovery_id],
+            'method_recovery_id': row.method_recovery_id,
+            'vehicle': {'id': row.vehicle_id, 'number': row.vehicle__factory_number},
+            'vehicle_id': row.vehicle_id,
+            'downtime': row.downtime,
+            'operating_time': row.operating_time,
+            'fail_description': row.fail_description,
+            'failure_date': _date(row.failure_date),
+            'recovery_date': _date(row.recovery_date),
+            'spare_parts': row.spare_parts,
+            'service': {'id': row.service_id, 'fullname': row.service__fullname},
+            'service_id': row.service_id,
+        }
+
+
+PROJECTIONS = {
+    projection.serializer_class: projection
+    for projection in (VehicleProjection(), VehiclePublicProjection(), MaintenanceProjection(),
+                       WarrantyClaimProjection())
+}
+
+
+class ProjectedListMixin:
+    """
+    Примесь к ViewSet: действие list через проекцию сериализатора, если она объявлена.
+
+    Отключается настройкой API_LIST_PROJECTIONS = False.
+    """
+
+    def get_projection(self):
+        """Возвращает проекцию для текущего сериализатора или None."""
+        if not settings.API_LIST_PROJECTIONS:
+            return None
+        return PROJECTIONS.get(self.get_serializer_class())
+
+    def get_projected_rows(self, projection):
+        """
+        Строки списка для проекции: выборка с фильтрами и сортировкой представления.
+
+        Args:
+            projection (Projection): Проекция сериализатора
+
+        Returns:
+            QuerySet: values_list(named=True)
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        # Поля активной сортировки нужны в строке для позиции курсора пагинации;
+        # без пагинации и для незапрошенных ordering_fields лишние колонки и JOIN не добавляются
+        paginator = self.paginator
+        ordering = ()
+        if paginator is not None and hasattr(paginator, 'get_ordering') and paginator.is_requested(self.request):
+            ordering = paginator.get_ordering(self.request, queryset, self)
+        return projection.get_rows(queryset, extra_columns=[field.lstrip('-') for field in ordering])
+
+    def list(self, request, *args, **kwargs):
+        """Список через values_list() с тем же JSON, что и у сериализатора."""
+        projection = self.get_projection()
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.get_projected_rows(projection)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.serialize(page))
+        return Response(projection.serialize(rows))
@@ -0,0 +1,243 @@
+"""
+Кэш публичных карточек техники (GET /api/vehicles/<factory_number>/ без аутентификации).
+
+Публичную карточку смотрят дилеры и покупатели, это самый нагруженный эндпоинт.
+Готовый JSON карточки хранится в памяти процесса в ограниченном LRU-кэше с TTL;
+при промахе карточка собирается одним запросом values_list() без JOIN'ов
+(названия моделей берутся из кэша справочников) проекцией VehiclePublicProjection.
+
+Запись кэша действительна, пока не сменились поколение ее заводского номера
+(изменение или удаление машины с этим номером, в том числе смена номера, см. app.signals)
+и поколение 'references' (любое изменение справочников). Изменение одной машины
+не сбрасывает карточки остальных.
+
+Отсутствующие номера не кэшируются: перебор случайных номеров не вытесняет из LRU
+карточки существующих машин (частоту анонимных запросов ограничивает ThrottleMiddleware).
+Поэтому созданная машина видна сразу и создание машин поколений не меняет.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from . import reference_cache
+from .cache import aget_generation, get_generation
+from .models import Vehicle
+from .projections import VehiclePublicProjection
+
+GENERATION = 'public-vehicle'
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш с ограничением числа записей и временем жизни.
+
+    Атрибуты:
+        maxsize (int): Максимальное число записей
+        ttl (float): Время жизни записи в секундах
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Возвращает значение или None, если записи нет или она устарела."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Сохраняет значение, вытесняя давно не использованные записи сверх maxsize."""
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        """Удаляет запись, если она есть."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Удаляет все записи."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PublicVehicle:
+    """
+    Готовая публичная карточка.
+
+    Атрибуты:
+        content (bytes | None): JSON карточки; None — машины с таким номером нет
+        etag (str | None): ETag карточки
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.etag = f'"{hashlib.sha1(content).hexdigest()}"' if content is not None else None
+
+
+_cache = LRUCache(settings.PUBLIC_VEHICLE_CACHE_SIZE, settings.PUBLIC_VEHICLE_CACHE_TTL)
+_projection = VehiclePublicProjection()
+_renderer = JSONRenderer()
+
+
+def card_generation(factory_number):
+    """
+    Имя поколения публичной карточки.
+
+    Номер приходит из адреса запроса и может содержать любые символы,
+    поэтому в имя входит его хэш.
+
+    Args:
+        factory_number (str): Заводской номер машины
+
+    Returns:
+        str: Имя поколения для get_generation()/bump_generation()
+    """
+    return f'{GENERATION}:{hashlib.sha1(factory_number.encode()).hexdigest()}'
+
+
+def _current_generations(factory_number):
+    """Поколения данных, из которых собрана карточка."""
+    return get_generation(card_generation(factory_number)), get_generation(reference_cache.GENERATION)
+
+
+async def _acurrent_generations(factory_number):
+    """Асинхронный _current_generations(): общий кэш читается без блокировки цикла событий."""
+    return (await aget_generation(card_generation(factory_number)),
+            await aget_generation(reference_cache.GENERATION))
+
+
+def _store(factory_number, generations, vehicle):
+    """Кэширует собранную карточку; отсутствующий номер не кэшируется, прежняя запись удаляется."""
+    if vehicle.content is None:
+        _cache.discard(factory_number)
+    else:
+        _cache.set(factory_number, (generations, vehicle))
+
+
+def render(factory_number):
+    """
+    Собирает публичную карточку одним запросом.
+
+    Args:
+        factory_number (str): Заводской номер машины
+
+    Returns:
+        PublicVehicle: Карточка (content=None, если машины нет)
+    """
+    rows = _projection.get_rows(Vehicle.objects.filter(factory_number=factory_number))
+    data = _projection.serialize(rows)
+    return PublicVehicle(_renderer.render(data[0]) if data else None)
+
+
+async def arender(factory_number):
+    """Асинхронный render(): строка читается async ORM."""
+    data = await _projection.aserialize(_projection.get_rows(Vehicle.objects.filter(factory_number=factory_number)))
+    return PublicVehicle(_renderer.render(data[0]) if data else None)
+
+
+def get_public_vehicle(factory_number):
+    """
+    Возвращает публичную карточку из кэша, собирая ее при промахе.
+
+    Args:
+        factory_number (str): Заводской номер машины
+
+    Returns:
+        PublicVehicle: Карточка (content=None, если машины нет)
+    """
+    generations = _current_generations(factory_number)
+    cached = _cache.get(factory_number)
+    if cached is not None and cached[0] == generations:
+        return cached[1]
+
+    # Поколения читаются до выборки: изменение, зафиксированное во время сборки,
+    # сменит поколение, и следующий запрос соберет карточку заново
+    vehicle = render(factory_number)
+    _store(factory_number, generations, vehicle)
+    return vehicle
+
+
+async def aget_public_vehicle(factory_number):
+    """Асинхронный get_public_vehicle() для асинхронных представлений (app.async_views)."""
+    generations = await _acurrent_generations(factory_number)
+    cached = _cache.get(factory_number)
+    if cached is not None and cached[0] == generations:
+        return cached[1]
+
+    vehicle = await arender(factory_number)
+    _store(factory_number, generations, vehicle)
+    return vehicle
+
+
+def invalidate():
+    """Сбрасывает кэш текущего процесса (другие процессы сбрасываются сменой поколения)."""
+    _cache.clear()
+
+
+def public_vehicle_response(request, factory_number):
+    """
+    Ответ с публичной карточкой: готовый JSON из кэша, ETag и публичный Cache-Control.
+
+    Args:
+        request: Запрос DRF
+        factory_number (str): Заводской номер машины
+
+    Returns:
+        HttpResponse | HttpResponseNotModified: Карточка или 304
+
+    Raises:
+        Http404: Если машины с таким номером нет
+    """
+    return build_response(request._request, get_public_vehicle(factory_number))
+
+
+def build_response(request, vehicle):
+    """
+    Ответ с готовой публичной карточкой (для синхронного и асинхронного представлений).
+
+    Args:
+        request: Запрос Django (HttpRequest)
+        vehicle (PublicVehicle): Карточка
+
+    Returns:
+        HttpResponse | HttpResponseNotModified: Карточка или 304
+
+    Raises:
+        Http404: Если машины с таким номером нет
+    """
+    if vehicle.content is None:
+        raise Http404
+
+    response = get_conditional_response(request, etag=vehicle.etag)
+    if response is None:
+        response = HttpResponse(vehicle.content, content_type='application/json')
+    response['ETag'] = vehicle.etag
+    # Карточка одинакова для всех анонимных пользователей, ее можно кэшировать в CDN и прокси;
+    # аутентифицированные пользователи получают другой ответ по тому же адресу
+    patch_cache_control(response, public=True, max_age=settings.PUBLIC_VEHICLE_MAX_AGE)
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,152 @@
+"""
+Бюджеты SQL-запросов представлений: защита от регрессий N+1.
+
+Представление объявляет бюджет по действиям — сколько запросов к БД допускает один
+запрос к API, независимо от числа строк и page_size:
+
+    class VehicleViewSet(...):
+        query_budget = {'list': 3, 'retrieve': 3}
+
+Для APIView ключ — HTTP-метод в нижнем регистре ('get'). Бюджет учитывает весь
+запрос, включая загрузку кэшей процесса после их сброса (холодный кэш справочников),
+поэтому он равен числу запросов с холодными кэшами, а не с прогретыми.
+
+QueryBudgetMiddleware (QUERY_BUDGET_ENABLED, по умолчанию при DEBUG и в тестах)
+считает запросы через счетчик app.timing. Запрос, который первым вышел за бюджет,
+пишется в логгер app.query_budget вместе со стеком вызовов кода проекта. С
+QUERY_BUDGET_RAISE = True запрос к API завершается исключением QueryBudgetExceeded:
+при разработке это 500 с описанием, в тестах — ошибка теста.
+
+Не учитываются запросы потоковых ответов (stream=1, выгрузка CSV): они выполняются
+после выхода из middleware, во время отправки тела ответа.
+"""
+
+import logging
+import traceback
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .timing import collect, current_timings
+
+logger = logging.getLogger('app.query_budget')
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к API выполнил больше SQL-запросов, чем допускает бюджет действия."""
+
+
+def get_query_budget(view_func, method):
+    """
+    Бюджет запросов представления для HTTP-метода.
+
+    Args:
+        view_func: Функция представления из URLconf (as_view() ViewSet или APIView, app.async_views)
+        method (str): HTTP-метод запроса
+
+    Returns:
+        tuple: (действие, бюджет); бюджет None — не объявлен
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None) or {}
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return action, budget.get(action)
+
+
+def get_project_stack():
+    """Стек вызовов кода проекта (без Django, сторонних библиотек и обертки SQL app.timing.time_query)."""
+    root = str(settings.BASE_DIR)
+    # Последние кадры — эта функция, BudgetCheck.__call__ и time_query
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(root) and 'site-packages' not in frame.filename
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+class BudgetCheck:
+    """
+    Проверка бюджета одного запроса к API: запоминает SQL-запрос, который первым вышел за бюджет.
+
+    Атрибуты:
+        view (str): Представление и действие (VehicleViewSet.list)
+        budget (int): Бюджет запросов
+        start (int): Значение счетчика запросов до вызова представления
+        offending (tuple | None): (SQL, стек кода проекта) первого запроса сверх бюджета
+    """
+
+    def __init__(self, view, budget, start):
+        self.view = view
+        self.budget = budget
+        self.start = start
+        self.offending = None
+
+    def __call__(self, timings, sql):
+        """Обработчик каждого SQL-запроса (RequestTimings.query_hook)."""
+        if self.offending is None and timings.queries - self.start > self.budget:
+            self.offending = (sql, get_project_stack())
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware проверки бюджета SQL-запросов (QUERY_BUDGET_ENABLED = True).
+
+    Подключается после MetricsMiddleware: счетчик запросов общий (app.timing.collect).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with collect() as timings:
+            response = self.get_response(request)
+        self.check(request, timings)
+        return response
+
+    async def __acall__(self, request):
+        with collect() as timings:
+            response = await self.get_response(request)
+        self.check(request, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Подключает проверку, если для действия представления объявлен бюджет."""
+        action, budget = get_query_budget(view_func, request.method)
+        timings = current_timings()
+        if budget is None or timings is None:
+            return
+        check = BudgetCheck(f'{view_func.cls.__name__}.{action}', budget, timings.queries)
+        request.query_budget_check = timings.query_hook = check
+
+    @staticmethod
+    def check(request, timings):
+        """
+        Сравнивает число запросов с бюджетом.
+
+        Raises:
+            QueryBudgetExceeded: Если бюджет превышен и QUERY_BUDGET_RAISE = True
+        """
+        check = getattr(request, 'query_budget_check', None)
+        if check is None:
+            return
+        timings.query_hook = None
+        used = timings.queries - check.start
+        if used <= check.budget:
+            return
+        message = f'{check.view}: {used} SQL-запросов при бюджете {check.budget} ({request.get_full_path()})'
+        sql, stack = check.offending
+        logger.warning('%s\nПервый запрос сверх бюджета: %s\n%s', message, sql, stack)
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
@@ -0,0 +1,133 @@
+"""
+Построение плана выборки (select_related / only) по полям сериализатора.
+
+Сериализатор сам описывает, какие данные ему нужны: обычные поля — колонками
+модели, вложенные сериализаторы — связями, а SerializerMethodField — путями,
+перечисленными в Meta.method_field_sources. По этому описанию строится выборка,
+которая загружает все необходимое одним запросом и не тянет лишние колонки.
+
+Пример:
+    class Meta:
+        method_field_sources = {
+            'service': ('service__fullname',),
+        }
+"""
+
+import re
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+
+DISPLAY_SOURCE = re.compile(r'^get_(\w+)_display$')
+
+
+class QueryPlan:
+    """
+    План выборки для сериализатора.
+
+    Атрибуты:
+        select_related (tuple): Связи, загружаемые JOIN'ом
+        only (tuple | None): Загружаемые колонки; None — загружать все колонки
+    """
+
+    def __init__(self, select_related, only):
+        self.select_related = tuple(sorted(select_related))
+        self.only = tuple(sorted(only)) if only is not None else None
+
+    def apply(self, queryset, restrict_columns=True):
+        """
+        Применяет план к выборке.
+
+        Args:
+            queryset: Исходная выборка
+            restrict_columns (bool): Ограничивать ли колонки через only(). Для выборок,
+                объекты которых будут сохраняться, нужно передавать False: save() у объекта
+                с отложенными полями обновляет только загруженные колонки.
+
+        Returns:
+            QuerySet: Выборка с select_related (и only)
+        """
+        queryset = queryset.select_related(*self.select_related)
+        if restrict_columns and self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def _model_field_name(model, source):
+    """Возвращает имя поля модели для source сериализатора или None, если это не поле."""
+    match = DISPLAY_SOURCE.match(source)
+    if match:
+        source = match.group(1)
+    try:
+        return model._meta.get_field(source).name
+    except FieldDoesNotExist:
+        return None
+
+
+def _collect(serializer, prefix, related, only):
+    """
+    Обходит читаемые поля сериализатора, накапливая связи и колонки.
+
+    Returns:
+        bool: False, если у какого-то поля источник не удалось сопоставить с колонкой
+              и ограничивать колонки через only() небезопасно
+    """
+    model = serializer.Meta.model
+    method_sources = getattr(serializer.Meta, 'method_field_sources', {})
+    restrictable = True
+
+    only.add(prefix + model._meta.pk.name)
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        if isinstance(field, serializers.ListSerializer):
+            raise ImproperlyConfigured(
+                f'{type(serializer).__name__}.{name}: вложенные списки не поддерживаются планом выборки'
+            )
+
+        if isinstance(field, serializers.BaseSerializer):
+            path = prefix + field.source
+            related.add(path)
+            only.add(path)
+            restrictable &= _collect(field, path + '__', related, only)
+        elif isinstance(field, serializers.SerializerMethodField):
+            if name not in method_sources:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{name}: укажите используемые поля в Meta.method_field_sources'
+                )
+            for source in method_sources[name]:
+                parts = source.split('__')
+                for depth in range(1, len(parts)):
+                    path = prefix + '__'.join(parts[:depth])
+                    related.add(path)
+                    only.add(path)
+                only.add(prefix + source)
+        else:
+            field_name = _model_field_name(model, field.source)
+            if field_name is None:
+                restrictable = False
+            else:
+                only.add(prefix + field_name)
+
+    return restrictable
+
+
+@lru_cache(maxsize=None)
+def get_query_plan(serializer_class):
+    """
+    Возвращает план выборки для класса сериализатора (вычисляется один раз на класс).
+
+    Args:
+        serializer_class: Класс ModelSerializer
+
+    Returns:
+        QueryPlan: План выборки
+
+    Raises:
+        ImproperlyConfigured: Если для SerializerMethodField не указаны источники
+    """
+    related, only = set(), set()
+    restrictable = _collect(serializer_class(), '', related, only)
+    return QueryPlan(related, only if restrictable else None)
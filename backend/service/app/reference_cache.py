@@ -0,0 +1,159 @@
+"""
+Кэш справочников (ReferenceDirectory) в памяти процесса.
+
+Справочники — маленькая и почти неизменная таблица, но к ней обращаются при
+каждой записи техники, ТО и рекламаций (проверка ссылок) и при каждом открытии
+экрана (/api/references/). Модуль держит снимок таблицы, проиндексированный
+по id и по типу справочника, и перечитывает его только при смене поколения
+'references' (см. app.cache и app.signals).
+"""
+
+import threading
+
+from .cache import aget_generation, get_generation
+from .models import ReferenceDirectory
+
+GENERATION = 'references'
+
+
+class ReferenceSnapshot:
+    """
+    Неизменяемый снимок таблицы справочников.
+
+    Атрибуты:
+        generation: Номер поколения, под которым снимок был загружен
+        rows (list): Все записи в порядке id
+        by_id (dict): Запись по id
+        by_type (dict): Записи по типу справочника
+    """
+
+    def __init__(self, generation, rows):
+        self.generation = generation
+        self.rows = rows
+        self.by_id = {row.id: row for row in rows}
+        self.by_type = {}
+        for row in rows:
+            self.by_type.setdefault(row.ref_type, []).append(row)
+        self._by_name = None
+        self._serialized = None
+        self._serialized_by_id = None
+        self._lock = threading.Lock()
+
+    def get(self, pk, ref_type=None):
+        """
+        Возвращает запись справочника по id.
+
+        Args:
+            pk (int): id записи
+            ref_type (str): Ожидаемый тип справочника (не проверяется, если None)
+
+        Returns:
+            ReferenceDirectory | None: Запись или None, если она не найдена или другого типа
+        """
+        row = self.by_id.get(pk)
+        if row is None or (ref_type is not None and row.ref_type != ref_type):
+            return None
+        return row
+
+    def get_by_name(self, ref_type, name):
+        """
+        Возвращает запись справочника по названию (без учета регистра и крайних пробелов).
+
+        Используется импортом (app.fleet_import), где справочники указаны названиями.
+
+        Args:
+            ref_type (str): Тип справочника
+            name (str): Название
+
+        Returns:
+            ReferenceDirectory | None: Запись или None, если она не найдена
+        """
+        if self._by_name is None:
+            self._by_name = {(row.ref_type, row.name.strip().casefold()): row for row in self.rows}
+        return self._by_name.get((ref_type, name.strip().casefold()))
+
+    def serialized(self, serializer_class):
+        """
+        Возвращает сериализованный список справочников, вычисляя его один раз на снимок.
+
+        Args:
+            serializer_class: Класс сериализатора записи справочника
+
+        Returns:
+            list: Данные для ответа API
+        """
+        if self._serialized is None:
+            with self._lock:
+                if self._serialized is None:
+                    self._serialized = serializer_class(self.rows, many=True).data
+        return self._serialized
+
+    def serialized_by_id(self, serializer_class):
+        """
+        Возвращает сериализованные записи справочников, проиндексированные по id.
+
+        Используется быстрыми проекциями списков (app.projections) для вложенных справочников.
+
+        Args:
+            serializer_class: Класс сериализатора записи справочника
+
+        Returns:
+            dict: Данные записи по id
+        """
+        if self._serialized_by_id is None:
+            data = self.serialized(serializer_class)
+            self._serialized_by_id = {item['id']: item for item in data}
+        return self._serialized_by_id
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Возвращает актуальный снимок справочников, перечитывая таблицу при смене поколения.
+
+    Returns:
+        ReferenceSnapshot: Снимок справочников
+    """
+    global _snapshot
+
+    generation = get_generation(GENERATION)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            # Поколение читается до выборки: изменение, зафиксированное во время
+            # загрузки, сменит поколение, и следующий вызов перечитает таблицу
+            _snapshot = ReferenceSnapshot(generation, list(ReferenceDirectory.objects.order_by('id')))
+        return _snapshot
+
+
+async def aget_snapshot():
+    """
+    Асинхронный get_snapshot() для асинхронных представлений (app.async_views): таблица читается async ORM.
+
+    Returns:
+        ReferenceSnapshot: Снимок справочников
+    """
+    global _snapshot
+
+    generation = await aget_generation(GENERATION)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+
+    # Параллельные запросы могут прочитать таблицу одновременно: сохраняется любой из одинаковых снимков
+    snapshot = ReferenceSnapshot(generation, [row async for row in ReferenceDirectory.objects.order_by('id')])
+    with _snapshot_lock:
+        _snapshot = snapshot
+    return snapshot
+
+
+def invalidate():
+    """Сбрасывает снимок текущего процесса (другие процессы сбрасываются сменой поколения)."""
+    global _snapshot
+    _snapshot = None
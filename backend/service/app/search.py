@@ -0,0 +1,154 @@
+"""
+Полнотекстовый поиск по технике и рекламациям (GET /api/search/?q=...).
+
+Ищет по индексам SQLite FTS5 (миграция 0006_search_index): у техники — заводской
+номер, грузополучатель, адрес поставки и комплектация, у рекламаций — описание
+отказа и запасные части. Токенизатор trigram находит части слов и номеров без
+учета регистра, поэтому каждое слово запроса должно быть не короче трех символов;
+слова объединяются по И.
+
+Выдача ограничена ролью пользователя по тем же правилам, что и списки
+(app.bulk.visible_vehicles): условие роли подставляется подзапросом в запрос к
+индексу, результаты упорядочены по релевантности (bm25). Весь поиск — один
+запрос к индексу и один запрос за данными найденных записей на каждый тип.
+На 100 тыс. машин поиск по номеру занимает единицы миллисекунд; частое слово,
+встречающееся в десятках тысяч записей, — около 100 мс (bm25 ранжирует все совпадения).
+
+Триггеры индекса создает миграция; если миграция пересоздаст таблицу app_vehicle
+или app_warrantyclaim (изменение столбцов в SQLite), триггеры нужно создать заново.
+"""
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from .bulk import visible_vehicles
+from .models import Vehicle, WarrantyClaim
+
+# Минимальная длина слова запроса (токенизатор trigram)
+MIN_TERM_LENGTH = 3
+
+
+def parse_query(raw):
+    """
+    Преобразует строку пользователя в запрос FTS5: каждое слово — фраза в кавычках.
+
+    Args:
+        raw (str): Строка поиска
+
+    Returns:
+        str: Выражение MATCH
+
+    Raises:
+        ValidationError: Если в строке нет слов длиной от MIN_TERM_LENGTH символов
+    """
+    terms = [term for term in (raw or '').split() if len(term) >= MIN_TERM_LENGTH]
+    if not terms:
+        raise ValidationError({'q': [f'Введите хотя бы одно слово длиной от {MIN_TERM_LENGTH} символов']})
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def match(index, query, scope, limit):
+    """
+    Находит записи в индексе.
+
+    Args:
+        index (str): Таблица FTS5 (vehicle_search, claim_search)
+        query (str): Выражение MATCH
+        scope: Выборка модели, ограничивающая результаты (None — без ограничения)
+        limit (int): Максимум результатов
+
+    Returns:
+        list: Кортежи (id, rank) по возрастанию rank (лучшие первыми)
+    """
+    sql = f'SELECT rowid, rank FROM {index} WHERE {index} MATCH %s'
+    params = [query]
+    if scope is not None:
+        scope_sql, scope_params = scope.values('pk').query.sql_with_params()
+        # Унарный плюс не дает передать условие в FTS5: иначе индекс выполняет MATCH заново
+        # для каждого id из выборки роли, и частые слова ищутся секундами
+        sql += f' AND +rowid IN ({scope_sql})'
+        params += list(scope_params)
+    sql += ' ORDER BY rank LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_vehicles(query, user, limit):
+    """Найденные машины в пределах видимости пользователя."""
+    scope = None if user.type == 'MR' else visible_vehicles(user)
+    ranks = dict(match('vehicle_search', query, scope, limit))
+    rows = Vehicle.objects.filter(pk__in=ranks).values_list(
+        'id', 'factory_number', 'recipient', 'delivery_address', named=True
+    )
+    return [
+        {
+            'type': 'vehicle',
+            'id': row.id,
+            'factory_number': row.factory_number,
+            'recipient': row.recipient,
+            'delivery_address': row.delivery_address,
+            'rank': ranks[row.id],
+        }
+        for row in rows
+    ]
+
+
+def search_claims(query, user, limit):
+    """Найденные рекламации в пределах видимости пользователя."""
+    scope = None if user.type == 'MR' else WarrantyClaim.objects.filter(vehicle__in=visible_vehicles(user))
+    ranks = dict(match('claim_search', query, scope, limit))
+    rows = WarrantyClaim.objects.filter(pk__in=ranks).values_list(
+        'id', 'vehicle_id', 'vehicle__factory_number', 'failure_date', 'fail_description', 'spare_parts',
+        named=True,
+    )
+    return [
+        {
+            'type': 'claim',
+            'id': row.id,
+            'vehicle': {'id': row.vehicle_id, 'number': row.vehicle__factory_number},
+            'failure_date': row.failure_date.isoformat(),
+            'fail_description': row.fail_description,
+            'spare_parts': row.spare_parts,
+            'rank': ranks[row.id],
+        }
+        for row in rows
+    ]
+
+
+SEARCHES = {
+    'vehicle': search_vehicles,
+    'claim': search_claims,
+}
+
+
+def search(raw_query, user, types=None, limit=None):
+    """
+    Ищет технику и рекламации.
+
+    Args:
+        raw_query (str): Строка поиска
+        user: Аутентифицированный пользователь
+        types (iterable): Типы записей (ключи SEARCHES); None — все
+        limit (int): Максимум результатов (по умолчанию SEARCH_LIMIT)
+
+    Returns:
+        list: Результаты всех типов по релевантности (rank — оценка bm25, меньше — лучше)
+
+    Raises:
+        ValidationError: Если строка поиска пуста или задан неизвестный тип
+    """
+    query = parse_query(raw_query)
+    types = list(types or SEARCHES)
+    unknown = [name for name in types if name not in SEARCHES]
+    if unknown:
+        raise ValidationError({'type': [f'Ожидается одно из значений: {", ".join(SEARCHES)}']})
+    limit = limit or settings.SEARCH_LIMIT
+
+    results = []
+    for name in types:
+        results.extend(SEARCHES[name](query, user, limit))
+    results.sort(key=lambda item: item['rank'])
+    return results[:limit]
@@ -9,29 +9,52 @@
 - Рекламациями (WarrantyClaim)
 """
 
-from datetime import datetime
-import pytz
-
+import re
+from contextlib import contextmanager
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth.models import update_last_login
+from django.db import IntegrityError, transaction
+from django.utils.text import capfirst
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import AccessToken
 
-from .models import ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim
+from .authentication import is_revoked
+from .models import ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim, VehicleStats
+from .reference_cache import get_snapshot
+from .timing import TimedRepresentationMixin
 
 # Получаем модель пользователя
 User = get_user_model()
 
 
+def expires_at(token):
+    """Срок действия токена (timestamp)."""
+    return float(token['exp'])
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Кастомный сериализатор для получения JWT токенов с дополнительными полями."""
 
+    @classmethod
+    def get_token(cls, user):
+        """Добавляет в токен роль пользователя (claim type) — по ней выбирается бюджет запросов."""
+        token = super().get_token(user)
+        token['type'] = user.type
+        return token
+
     def validate(self, attrs):
         """
         Валидация учетных данных и формирование ответа с токенами.
 
+        Пароль проверяется один раз (authenticate), пара токенов выпускается
+        один раз: access-токен получается из того же refresh-токена.
+
         Добавляет к стандартному ответу:
         - Сроки действия access и refresh токенов
         - Основную информацию о пользователе
@@ -45,32 +68,26 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         Raises:
             ValidationError: Если аутентификация не удалась
         """
-        auth_kwargs = {
-            'username': attrs['username'],
-            'password': attrs['password'],
-        }
-
-        user = authenticate(**auth_kwargs)
-
-        if user is None:
+        self.user = authenticate(
+            request=self.context.get('request'),
+            username=attrs[self.username_field],
+            password=attrs['password'],
+        )
+        if not jwt_settings.USER_AUTHENTICATION_RULE(self.user):
             raise serializers.ValidationError({
                 'error': 'Неверный логин или пароль'
             })
 
-        data = super().validate(attrs)
-
         refresh = self.get_token(self.user)
         access = refresh.access_token
+        data = {'refresh': str(refresh), 'access': str(access)}
+
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
 
         # Добавляем сроки действия токенов в формате timestamp
-        data['access_expires_at'] = datetime.fromtimestamp(
-            access.payload['exp'],
-            tz=pytz.timezone('Asia/Yekaterinburg')
-        ).timestamp()
-        data['refresh_expires_at'] = datetime.fromtimestamp(
-            refresh.payload['exp'],
-            tz=pytz.timezone('Asia/Yekaterinburg')
-        ).timestamp()
+        data['access_expires_at'] = expires_at(access)
+        data['refresh_expires_at'] = expires_at(refresh)
 
         # Добавляем основную информацию о пользователе
         data['user'] = {
@@ -88,27 +105,75 @@ class CustomTokenRefreshSerializer(TokenRefreshSerializer):
         """
         Обновление access токена и добавление информации о сроке его действия.
 
+        Refresh-токен декодируется один раз, новый access-токен выпускается из него
+        без повторного декодирования. При включенном отзыве токенов (JWT_REVOCATION)
+        пользователь не запрашивается из БД: изменение или блокировка пользователя
+        отзывает его токены. Без отзыва и при ротации refresh-токенов используется
+        стандартная проверка simplejwt.
+
         Args:
             attrs (dict): Входные данные (refresh токен)
 
         Returns:
             dict: Новый access токен и срок его действия
-        """
 
-        data = super().validate(attrs)
+        Raises:
+            InvalidToken: Если refresh токен отозван (пользователь изменен после его выдачи)
+        """
+        if not settings.JWT_REVOCATION or jwt_settings.ROTATE_REFRESH_TOKENS:
+            data = super().validate(attrs)
+            data['access_expires_at'] = expires_at(AccessToken(data['access']))
+            return data
 
-        access = AccessToken(data['access'])
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken('Токен отозван')
 
+        access = refresh.access_token
         # Добавляем срок действия нового access токена
-        data['access_expires_at'] = datetime.fromtimestamp(
-            access.payload['exp'],
-            tz=pytz.timezone('Asia/Yekaterinburg')
-        ).timestamp()
+        return {'access': str(access), 'access_expires_at': expires_at(access)}
 
-        return data
 
+class ReferenceDirectoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле ссылки на справочник заданного типа.
+
+    Проверяет id по кэшу справочников (app.reference_cache) вместо запроса
+    к ReferenceDirectory на каждое поле каждой записи.
+    """
+
+    def __init__(self, ref_type, **kwargs):
+        self.ref_type = ref_type
+        kwargs.setdefault('queryset', ReferenceDirectory.objects.filter(ref_type=ref_type))
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        """
+        Возвращает запись справочника по id из кэша.
+
+        Args:
+            data: id записи справочника
 
-class ReferenceDirectorySerializer(serializers.ModelSerializer):
+        Returns:
+            ReferenceDirectory: Запись справочника
+
+        Raises:
+            ValidationError: Если id некорректен или запись нужного типа не найдена
+        """
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        instance = get_snapshot().get(pk, self.ref_type)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class ReferenceDirectorySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для справочников."""
 
     ref_type_display = serializers.CharField(source='get_ref_type_display', read_only=True)
@@ -118,7 +183,7 @@ class ReferenceDirectorySerializer(serializers.ModelSerializer):
         fields = ['id', 'ref_type', 'ref_type_display', 'name', 'description']
 
 
-class ClientsSerializer(serializers.ModelSerializer):
+class ClientsSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для клиентов (пользователей с типом 'CL')."""
 
     class Meta:
@@ -130,7 +195,7 @@ class ClientsSerializer(serializers.ModelSerializer):
         return User.objects.filter(type='CL')
 
 
-class ServiceOrganizationSerializer(serializers.ModelSerializer):
+class ServiceOrganizationSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для сервисных организаций (пользователей с типом 'SO')."""
 
     class Meta:
@@ -142,7 +207,7 @@ class ServiceOrganizationSerializer(serializers.ModelSerializer):
         return User.objects.filter(type='SO')
 
 
-class VehiclePublicSerializer(serializers.ModelSerializer):
+class VehiclePublicSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для публичного отображения информации о технике (без привязки к клиентам)."""
 
     vehicle_model = serializers.SerializerMethodField()
@@ -158,6 +223,13 @@ class VehiclePublicSerializer(serializers.ModelSerializer):
             'transmission_number', 'drive_bridge_model', 'drive_bridge_number', 'control_bridge_model',
             'control_bridge_number'
         ]
+        method_field_sources = {
+            'vehicle_model': ('vehicle_model__name',),
+            'engine_model': ('engine_model__name',),
+            'transmission_model': ('transmission_model__name',),
+            'drive_bridge_model': ('drive_bridge_model__name',),
+            'control_bridge_model': ('control_bridge_model__name',),
+        }
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_vehicle_model(self, obj):
@@ -185,34 +257,51 @@ class VehiclePublicSerializer(serializers.ModelSerializer):
         return obj.control_bridge_model.name
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleStatsSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """Сводные показатели машины по ТО и рекламациям (только чтение)."""
+
+    open_claims = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VehicleStats
+        fields = [
+            'maintenance_count',
+            'last_maintenance_date',
+            'claim_count',
+            'open_claims',
+            'total_downtime',
+            'operating_time',
+        ]
+        method_field_sources = {
+            'open_claims': ('last_recovery_date',),
+        }
+
+    @extend_schema_field(OpenApiTypes.INT)
+    def get_open_claims(self, obj):
+        """
+        Возвращает число незакрытых рекламаций на текущую дату.
+
+        Берется из аннотации open_claims выборки машин (VehicleViewSet.get_queryset),
+        если сводка загружена вместе с машиной, иначе считается отдельным запросом.
+        """
+        if VehicleStats.vehicle.is_cached(obj) and hasattr(obj.vehicle, 'open_claims'):
+            return obj.vehicle.open_claims
+        return obj.get_open_claims()
+
+
+class VehicleSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Полный сериализатор для техники со всеми связями."""
 
     vehicle_model = ReferenceDirectorySerializer(read_only=True)
-    vehicle_model_id = serializers.PrimaryKeyRelatedField(
-        source='vehicle_model',
-        queryset=ReferenceDirectory.objects.filter(ref_type='model_tech')
-    )
+    vehicle_model_id = ReferenceDirectoryField('model_tech', source='vehicle_model')
     engine_model = ReferenceDirectorySerializer(read_only=True)
-    engine_model_id = serializers.PrimaryKeyRelatedField(
-        source='engine_model',
-        queryset=ReferenceDirectory.objects.filter(ref_type='model_engine')
-    )
+    engine_model_id = ReferenceDirectoryField('model_engine', source='engine_model')
     transmission_model = ReferenceDirectorySerializer(read_only=True)
-    transmission_model_id = serializers.PrimaryKeyRelatedField(
-        source='transmission_model',
-        queryset=ReferenceDirectory.objects.filter(ref_type='model_transmission')
-    )
+    transmission_model_id = ReferenceDirectoryField('model_transmission', source='transmission_model')
     drive_bridge_model = ReferenceDirectorySerializer(read_only=True)
-    drive_bridge_model_id = serializers.PrimaryKeyRelatedField(
-        source='drive_bridge_model',
-        queryset=ReferenceDirectory.objects.filter(ref_type='model_drive_bridge')
-    )
+    drive_bridge_model_id = ReferenceDirectoryField('model_drive_bridge', source='drive_bridge_model')
     control_bridge_model = ReferenceDirectorySerializer(read_only=True)
-    control_bridge_model_id = serializers.PrimaryKeyRelatedField(
-        source='control_bridge_model',
-        queryset=ReferenceDirectory.objects.filter(ref_type='model_control_bridge')
-    )
+    control_bridge_model_id = ReferenceDirectoryField('model_control_bridge', source='control_bridge_model')
     client = serializers.SerializerMethodField()
     client_id = serializers.PrimaryKeyRelatedField(
         source='client',
@@ -223,6 +312,8 @@ class VehicleSerializer(serializers.ModelSerializer):
         source='service',
         queryset=User.objects.filter(type='SO')
     )
+    # null, если сводка еще не построена (rebuild_vehicle_stats)
+    stats = VehicleStatsSerializer(read_only=True, allow_null=True)
 
     class Meta:
         model = Vehicle
@@ -252,6 +343,7 @@ class VehicleSerializer(serializers.ModelSerializer):
             'client_id',
             'service',
             'service_id',
+            'stats',
         ]
         extra_kwargs = {
             'vehicle_model_id': {'write_only': True},
@@ -262,6 +354,10 @@ class VehicleSerializer(serializers.ModelSerializer):
             'client_id': {'write_only': True},
             'service_id': {'write_only': True},
         }
+        method_field_sources = {
+            'client': ('client__fullname',),
+            'service': ('service__fullname',),
+        }
 
     @extend_schema_field(OpenApiTypes.OBJECT)
     def get_client(self, obj):
@@ -280,14 +376,80 @@ class VehicleSerializer(serializers.ModelSerializer):
         }
 
 
-class MaintenanceSerializer(serializers.ModelSerializer):
+def is_unique_maintenance_type_violation(exc):
+    """
+    Проверяет, что IntegrityError — нарушение именно unique_vehicle_maintenance_type.
+
+    PostgreSQL называет ограничение по имени, SQLite — перечисляет его столбцы.
+    Другие ошибки тех же столбцов (NOT NULL, внешний ключ) сюда не относятся.
+    """
+    table = Maintenance._meta.db_table
+    message = str(exc)
+    return ('unique_vehicle_maintenance_type' in message
+            or f'UNIQUE constraint failed: {table}.vehicle_id, {table}.maintenance_type_id' in message)
+
+
+UNIQUE_MAINTENANCE_TYPE_MESSAGE = 'ТО уже существует'
+INTEGRITY_ERROR_MESSAGE = 'Запись нарушает ограничения целостности данных'
+
+
+def integrity_error_detail(exc, model, type_field='type'):
+    """
+    Преобразует IntegrityError при записи объекта модели в ошибки валидации по полям.
+
+    Текст ошибки БД (имена таблиц и столбцов) клиенту не возвращается: нарушение
+    unique_vehicle_maintenance_type и уникальных полей модели дает те же сообщения,
+    что и сериализатор, остальные нарушения — общее сообщение.
+
+    Args:
+        exc (IntegrityError): Ошибка записи
+        model: Класс модели записываемого объекта
+        type_field (str): Ключ ошибки для повторяющегося вида ТО
+
+    Returns:
+        dict: Ошибки в формате serializer.errors
+    """
+    if model is Maintenance and is_unique_maintenance_type_violation(exc):
+        return {type_field: [UNIQUE_MAINTENANCE_TYPE_MESSAGE]}
+    message = str(exc)
+    table = model._meta.db_table
+    for field in model._meta.concrete_fields:
+        if not field.unique or field.primary_key:
+            continue
+        # SQLite: "UNIQUE constraint failed: table.column", PostgreSQL: "Key (column)=(...) already exists"
+        if re.search(rf'\b{table}\.{field.column}\b', message) or f'({field.column})=' in message:
+            return {field.name: [field.error_messages['unique'] % {
+                'model_name': capfirst(model._meta.verbose_name),
+                'field_label': capfirst(field.verbose_name),
+            }]}
+    return {'non_field_errors': [INTEGRITY_ERROR_MESSAGE]}
+
+
+@contextmanager
+def unique_maintenance_type_guard():
+    """
+    Преобразует нарушение ограничения unique_vehicle_maintenance_type в ошибку валидации.
+
+    Запись выполняется в отдельной точке сохранения, поэтому конкурентные запросы
+    не могут оба пройти проверку, а лишний SELECT перед INSERT не нужен.
+
+    Raises:
+        ValidationError: Если ТО такого типа для этой техники уже существует
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if is_unique_maintenance_type_violation(exc):
+            raise serializers.ValidationError({'type': [UNIQUE_MAINTENANCE_TYPE_MESSAGE]})
+        raise
+
+
+class MaintenanceSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для записей о техническом обслуживании."""
 
     maintenance_type = ReferenceDirectorySerializer(read_only=True)
-    maintenance_type_id = serializers.PrimaryKeyRelatedField(
-        source='maintenance_type',
-        queryset=ReferenceDirectory.objects.filter(ref_type='type_maintenance')
-    )
+    maintenance_type_id = ReferenceDirectoryField('type_maintenance', source='maintenance_type')
     vehicle = serializers.SerializerMethodField()
     vehicle_id = serializers.PrimaryKeyRelatedField(
         source='vehicle',
@@ -313,6 +475,13 @@ class MaintenanceSerializer(serializers.ModelSerializer):
             'maintenance_type_id': {'write_only': True},
             'vehicle_id': {'write_only': True},
         }
+        # Уникальность (vehicle, maintenance_type) обеспечивает UniqueConstraint в БД,
+        # без предварительного запроса на существование записи
+        validators = []
+        method_field_sources = {
+            'vehicle': ('vehicle__factory_number',),
+            'service': ('service__fullname',),
+        }
 
     @extend_schema_field({
         'type': 'object',
@@ -342,48 +511,23 @@ class MaintenanceSerializer(serializers.ModelSerializer):
             'fullname': obj.service.fullname if obj.service else 'Cамостоятельно',
         }
 
-    def validate(self, data):
-        """
-        Проверка, что для данной техники не существует уже ТО такого типа.
+    def create(self, validated_data):
+        """Создание записи ТО с проверкой уникальности вида ТО на уровне БД."""
+        with unique_maintenance_type_guard():
+            return super().create(validated_data)
 
-        Args:
-            data (dict): Входные данные для валидации
+    def update(self, instance, validated_data):
+        """Обновление записи ТО с проверкой уникальности вида ТО на уровне БД."""
+        with unique_maintenance_type_guard():
+            return super().update(instance, validated_data)
 
-        Returns:
-            dict: Валидированные данные
 
-        Raises:
-            ValidationError: Если ТО такого типа для этой техники уже существует
-        """
-        maintenance_type = data.get('maintenance_type')
-        vehicle = data.get('vehicle')
-
-        if maintenance_type and vehicle:
-            existing_maintenance = Maintenance.objects.filter(
-                vehicle=vehicle, maintenance_type=maintenance_type
-            )
-
-            if self.instance:
-                existing_maintenance = existing_maintenance.exclude(id=self.instance.id)
-
-            if existing_maintenance.exists():
-                raise serializers.ValidationError({'type': 'ТО уже существует'})
-
-        return super().validate(data)
-
-
-class WarrantyClaimSerializer(serializers.ModelSerializer):
+class WarrantyClaimSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для рекламаций по гарантии."""
     node_fail = ReferenceDirectorySerializer(read_only=True)
-    node_fail_id = serializers.PrimaryKeyRelatedField(
-        source='node_fail',
-        queryset=ReferenceDirectory.objects.filter(ref_type='node_fail')
-    )
+    node_fail_id = ReferenceDirectoryField('node_fail', source='node_fail')
     method_recovery = ReferenceDirectorySerializer(read_only=True)
-    method_recovery_id = serializers.PrimaryKeyRelatedField(
-        source='method_recovery',
-        queryset=ReferenceDirectory.objects.filter(ref_type='method_recovery')
-    )
+    method_recovery_id = ReferenceDirectoryField('method_recovery', source='method_recovery')
     vehicle = serializers.SerializerMethodField()
     vehicle_id = serializers.PrimaryKeyRelatedField(
         source='vehicle',
@@ -420,6 +564,10 @@ class WarrantyClaimSerializer(serializers.ModelSerializer):
             'vehicle_id': {'write_only': True},
             'service_id': {'write_only': True},
         }
+        method_field_sources = {
+            'vehicle': ('vehicle__factory_number',),
+            'service': ('service__fullname',),
+        }
 
     @extend_schema_field(OpenApiTypes.OBJECT)
     def get_vehicle(self, obj):
@@ -436,3 +584,59 @@ class WarrantyClaimSerializer(serializers.ModelSerializer):
             'id': obj.service.id,
             'fullname': obj.service.fullname,
         }
+
+
+class PreloadedPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле ссылки, разрешаемое по заранее загруженному словарю из контекста сериализатора.
+
+    Используется при пакетной записи: связанные объекты всей пачки загружаются
+    одним запросом, а не запросом на каждую строку.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        """
+        Возвращает объект по id из self.context[context_key].
+
+        Raises:
+            ValidationError: Если id некорректен или объект не загружен (не существует или недоступен)
+        """
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        instance = self.context[self.context_key].get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class MaintenanceBulkSerializer(MaintenanceSerializer):
+    """
+    Сериализатор строки пакетной записи ТО.
+
+    Машина берется из предзагруженного словаря, уникальность номера заказ-наряда
+    и вида ТО проверяется для всей пачки сразу (app.bulk).
+    """
+
+    vehicle_id = PreloadedPrimaryKeyField('vehicles', source='vehicle', queryset=Vehicle.objects.all())
+
+    class Meta(MaintenanceSerializer.Meta):
+        extra_kwargs = {
+            **MaintenanceSerializer.Meta.extra_kwargs,
+            'order_number': {'validators': []},
+        }
+
+
+class WarrantyClaimBulkSerializer(WarrantyClaimSerializer):
+    """Сериализатор строки пакетной записи рекламаций с предзагруженными машинами и сервисными компаниями."""
+
+    vehicle_id = PreloadedPrimaryKeyField('vehicles', source='vehicle', queryset=Vehicle.objects.all())
+    service_id = PreloadedPrimaryKeyField('services', source='service', queryset=User.objects.filter(type='SO'))
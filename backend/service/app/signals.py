@@ -0,0 +1,75 @@
+"""
+Обработчики сигналов моделей.
+
+Инвалидируют кэши приложения при изменении данных, от которых они зависят,
+и пересчитывают сводку машин (VehicleStats) при изменении ТО и рекламаций.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import public_cache, reference_cache, vehicle_stats
+from .authentication import revoke_tokens
+from .cache import bump_generation
+from .conditional import USER_GENERATION, VEHICLE_GENERATION
+from .models import User, ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim, VehicleStats
+
+
+@receiver([post_save, post_delete], sender=ReferenceDirectory)
+def reference_directory_changed(sender, **kwargs):
+    """Сбрасывает кэш справочников и публичных карточек в текущем процессе и во всех остальных воркерах."""
+    reference_cache.invalidate()
+    public_cache.invalidate()
+    bump_generation(reference_cache.GENERATION)
+
+
+@receiver([post_save, post_delete], sender=Vehicle)
+def vehicle_changed(sender, instance, **kwargs):
+    """Сбрасывает публичные карточки машины (по текущему и исходному номеру) и ETag ответов с данными машин."""
+    for factory_number in instance.get_public_numbers():
+        bump_generation(public_cache.card_generation(factory_number))
+    bump_generation(VEHICLE_GENERATION)
+
+
+@receiver(post_save, sender=Vehicle)
+def vehicle_created(sender, instance, created, **kwargs):
+    """Создает пустую сводку новой машины, чтобы по ней можно было сортировать список."""
+    if created:
+        VehicleStats.objects.bulk_create([VehicleStats(vehicle=instance)], ignore_conflicts=True)
+
+
+@receiver(post_delete, sender=Vehicle)
+def vehicle_deleted(sender, instance, **kwargs):
+    """
+    Удаляет сводку удаленной машины.
+
+    Сводка удаляется каскадно раньше ТО и рекламаций машины, и их обработчики
+    могут создать ее заново; машина удаляется последней.
+    """
+    VehicleStats.objects.filter(vehicle_id=instance.pk).delete()
+
+
+@receiver([post_save, post_delete], sender=Maintenance)
+@receiver([post_save, post_delete], sender=WarrantyClaim)
+def vehicle_history_changed(sender, instance, origin=None, **kwargs):
+    """Пересчитывает сводку машины (и исходной машины при переносе записи)."""
+    # При удалении машины ее ТО и рекламации удаляются вместе с ней, сводка не нужна
+    if isinstance(origin, Vehicle):
+        return
+    vehicle_stats.refresh(instance.get_stats_vehicle_ids())
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Отзывает токены измененного пользователя (роль в них могла устареть) и сбрасывает ETag ответов с его именем."""
+    # Отметка времени входа (UPDATE_LAST_LOGIN) пользователя не меняет
+    if not created and update_fields != frozenset({'last_login'}):
+        revoke_tokens(instance.pk)
+        bump_generation(USER_GENERATION)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Отзывает токены удаленного пользователя и сбрасывает ETag ответов с его именем."""
+    revoke_tokens(instance.pk)
+    bump_generation(USER_GENERATION)
@@ -0,0 +1,89 @@
+"""
+Потоковая выдача больших списков в формате JSON.
+
+Обычный ответ DRF держит в памяти одновременно выборку, serializer.data и готовые
+байты ответа, поэтому пиковое потребление памяти воркера растет с размером парка.
+В потоковом режиме выборка читается порциями через .iterator(chunk_size=...),
+а JSON-массив формируется и отправляется клиенту по частям через
+StreamingHttpResponse — объем памяти ограничен размером порции.
+
+Режим включается параметром запроса stream=1 (без параметров пагинации).
+"""
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_QUERY_PARAM = 'stream'
+
+
+def _json_encoder():
+    """Кодировщик JSON с теми же настройками, что у JSONRenderer DRF."""
+    return JSONEncoder(
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+    )
+
+
+def iter_json_array(items, batch_size):
+    """
+    Кодирует последовательность объектов в JSON-массив по частям.
+
+    Args:
+        items (iterable): Объекты для кодирования
+        batch_size (int): Число объектов в одной части ответа
+
+    Yields:
+        bytes: Очередная часть JSON-массива
+    """
+    encoder = _json_encoder()
+    yield b'['
+    separator = ''
+    batch = []
+    for item in items:
+        batch.append(encoder.encode(item))
+        if len(batch) >= batch_size:
+            yield (separator + ','.join(batch)).encode()
+            separator, batch = ',', []
+    if batch:
+        yield (separator + ','.join(batch)).encode()
+    yield b']'
+
+
+class StreamingListMixin:
+    """
+    Примесь к ViewSet: потоковая выдача списка по параметру stream=1.
+
+    Использует проекцию списка (app.projections), если она есть у представления,
+    иначе сериализует объекты по одному.
+    """
+
+    def is_streaming_requested(self, request):
+        """Проверяет, запрошен ли потоковый режим (и не запрошена ли пагинация)."""
+        if request.query_params.get(STREAM_QUERY_PARAM) not in ('1', 'true'):
+            return False
+        paginator = self.paginator
+        return paginator is None or not paginator.is_requested(request)
+
+    def list(self, request, *args, **kwargs):
+        """Список целиком, отправляемый клиенту по мере чтения из БД."""
+        if not self.is_streaming_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        chunk_size = settings.API_STREAM_CHUNK_SIZE
+        queryset = self.filter_queryset(self.get_queryset())
+        projection = self.get_projection() if hasattr(self, 'get_projection') else None
+
+        if projection is not None:
+            items = projection.iter_serialize(projection.get_rows(queryset).iterator(chunk_size=chunk_size))
+        else:
+            serializer_class = self.get_serializer_class()
+            context = self.get_serializer_context()
+            items = (
+                serializer_class(instance, context=context).data
+                for instance in queryset.iterator(chunk_size=chunk_size)
+            )
+
+        return StreamingHttpResponse(iter_json_array(items, chunk_size), content_type='application/json')
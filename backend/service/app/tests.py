@@ -1,3 +1,1453 @@
-from django.test import TestCase
+"""
+Тесты API приложения.
+"""
 
-# Create your tests here.
+import io
+import json
+import tempfile
+import time
+from base64 import b64decode, b64encode
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from openpyxl import Workbook
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import User, ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim, VehicleStats, ComponentSerial
+from . import analytics, cache, metrics, public_cache, reference_cache, vehicle_stats
+from .cache import forget_generations
+from .fleet_generator import FleetGenerator
+from .projections import PROJECTIONS
+from .query_budget import QueryBudgetExceeded, get_query_budget
+from .query_plan import get_query_plan
+from .serializers import (
+    INTEGRITY_ERROR_MESSAGE, CustomTokenObtainPairSerializer, VehiclePublicSerializer, integrity_error_detail,
+    unique_maintenance_type_guard,
+)
+from .timing import RequestTimings
+from .urls import router
+from .views import SearchView, VehicleViewSet
+
+
+@override_settings(THROTTLE_ENABLED=False, METRICS_ENABLED=False, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-shared'},
+})
+class AppTestCase(TestCase):
+    """
+    Базовый тест API: ограничение частоты запросов и метрики выключены (их проверяют ThrottleTest
+    и MetricsTest), общий кэш — в памяти процесса, чтобы тесты не зависели от каталога cache/.
+    """
+
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        forget_generations()
+
+
+class FleetFactory:
+    """Создает справочники, пользователей всех ролей и технику с историей ТО и рекламаций."""
+
+    def __init__(self):
+        self.references = {
+            ref_type: ReferenceDirectory.objects.create(ref_type=ref_type, name=f'{ref_type} 1')
+            for ref_type in ReferenceDirectory.DIR_TYPES
+        }
+        self.maintenance_types = [self.references['type_maintenance']] + [
+            ReferenceDirectory.objects.create(ref_type='type_maintenance', name=f'ТО-{index}')
+            for index in range(2, 4)
+        ]
+        self.manager = User.objects.create_user('manager', password='password', type=User.MANAGER)
+        self.client = User.objects.create_user('client', password='password', type=User.CLIENT, fullname='Клиент')
+        self.service = User.objects.create_user('service', password='password', type=User.SERV_ORG,
+                                                fullname='Сервис')
+        self.count = 0
+
+    def create_vehicles(self, count):
+        """Создает count машин, у каждой по три ТО и две рекламации."""
+        for _ in range(count):
+            self.count += 1
+            number = f'{self.count:06}'
+            vehicle = Vehicle.objects.create(
+                factory_number=f'F{number}', engine_number=f'E{number}', transmission_number=f'T{number}',
+                drive_bridge_number=f'D{number}', control_bridge_number=f'C{number}',
+                vehicle_model=self.references['model_tech'], engine_model=self.references['model_engine'],
+                transmission_model=self.references['model_transmission'],
+                drive_bridge_model=self.references['model_drive_bridge'],
+                control_bridge_model=self.references['model_control_bridge'],
+                supply_contract='Договор', shipping_date=date(2024, 1, 1), recipient='Получатель',
+                delivery_address='Адрес', equipment='Стандарт', client=self.client, service=self.service,
+            )
+            for index, maintenance_type in enumerate(self.maintenance_types):
+                Maintenance.objects.create(
+                    vehicle=vehicle, maintenance_type=maintenance_type,
+                    maintenance_date=date(2024, 2, 1) + timedelta(days=index), operating_time=100 * index,
+                    order_number=f'{number}-{index}', order_date=date(2024, 2, 1),
+                    service=self.service if index % 2 else None,
+                )
+            for index in range(2):
+                WarrantyClaim.objects.create(
+                    vehicle=vehicle, failure_date=date(2024, 3, 1), operating_time=150,
+                    node_fail=self.references['node_fail'], fail_description='Отказ',
+                    method_recovery=self.references['method_recovery'], recovery_date=date(2024, 3, 5),
+                    service=self.service,
+                )
+
+
+class KeysetPaginationTest(AppTestCase):
+    """Keyset-пагинация: переходы по курсорам, одинаковые значения сортировки, page_size, поврежденный курсор."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        # 12 ТО, даты повторяются у каждой машины
+        self.fleet.create_vehicles(4)
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def walk(self, url, params, link='next'):
+        """Проходит страницы по ссылкам link; возвращает id записей каждой страницы и последний ответ."""
+        pages = []
+        response = self.api.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.data['results']])
+            if not response.data[link]:
+                return pages, response
+            response = self.api.get(response.data[link])
+
+    def test_next_and_previous_round_trip(self):
+        pages, response = self.walk('/api/vehicles/', {'page_size': 3})
+        self.assertEqual([len(page) for page in pages], [3, 1])
+        self.assertEqual(sum(pages, []), list(Vehicle.objects.order_by('id').values_list('id', flat=True)))
+        previous = self.api.get(response.data['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], pages[0])
+        self.assertIsNone(previous.data['previous'])
+
+    def test_ties_on_non_unique_ordering(self):
+        expected = list(Maintenance.objects.order_by('maintenance_date', 'id').values_list('id', flat=True))
+        pages, response = self.walk('/api/maintenances/', {'ordering': 'maintenance_date', 'page_size': 2})
+        self.assertEqual(sum(pages, []), expected)
+
+        # Обратно от последней страницы — те же записи без пропусков и повторов
+        backward = [pages[-1]]
+        while response.data['previous']:
+            response = self.api.get(response.data['previous'])
+            backward.insert(0, [item['id'] for item in response.data['results']])
+        self.assertEqual(sum(backward, []), expected)
+
+    @override_settings(API_PAGE_SIZE=2, API_MAX_PAGE_SIZE=5)
+    def test_page_size_limits(self):
+        self.assertEqual(len(self.api.get('/api/maintenances/', {'page_size': 100}).data['results']), 5)
+        self.assertEqual(len(self.api.get('/api/maintenances/', {'page_size': 'x'}).data['results']), 2)
+
+    def test_tampered_cursor(self):
+        def cursor(position):
+            return b64encode(urlencode({'o': 0, 'r': 0, 'p': json.dumps(position)}).encode()).decode()
+
+        for url, value in (('/api/vehicles/', 'garbage!'), ('/api/vehicles/', cursor(['1', '2'])),
+                           ('/api/vehicles/', cursor(['abc'])), ('/api/maintenances/', cursor(['not-a-date', '1']))):
+            with self.subTest(url=url, cursor=value):
+                self.assertEqual(self.api.get(url, {'cursor': value}).status_code, 404)
+
+
+class DeclarativeFilterTest(AppTestCase):
+    """Фильтры списков из белого списка filter_fields и сортировка, по которой строится курсор."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(3)
+        self.other = User.objects.create_user('other', password='password', type=User.CLIENT)
+        Vehicle.objects.filter(factory_number='F000003').update(client=self.other, shipping_date=date(2024, 6, 1))
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def numbers(self, params):
+        response = self.api.get('/api/vehicles/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['factory_number'] for item in response.data)
+
+    def test_whitelisted_filters(self):
+        self.assertEqual(self.numbers({'client': self.other.pk}), ['F000003'])
+        self.assertEqual(self.numbers({'client': f'{self.fleet.client.pk},{self.other.pk}'}),
+                         ['F000001', 'F000002', 'F000003'])
+        self.assertEqual(self.numbers({'shipping_date_from': '2024-02-01'}), ['F000003'])
+        self.assertEqual(self.numbers({'shipping_date_to': '2024-02-01', 'client': self.fleet.client.pk}),
+                         ['F000001', 'F000002'])
+
+        maintenance_type = self.fleet.maintenance_types[1]
+        response = self.api.get('/api/maintenances/', {'maintenance_type': maintenance_type.pk,
+                                                       'operating_time_from': 100})
+        self.assertEqual({item['maintenance_type']['id'] for item in response.data}, {maintenance_type.pk})
+        self.assertEqual(len(response.data), 3)
+
+    def test_field_outside_whitelist_is_rejected(self):
+        for params in ({'recipient': 'Получатель'}, {'client__username': 'client'}, {'client_id': 1}):
+            with self.subTest(params=params):
+                response = self.api.get('/api/vehicles/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.data)
+        # Параметры, не относящиеся к полям модели, не мешают запросу
+        self.assertEqual(self.api.get('/api/vehicles/', {'_': '1'}).status_code, 200)
+
+    def test_bad_values(self):
+        for url, params in (('/api/vehicles/', {'shipping_date_from': '2024-13-01'}),
+                            ('/api/vehicles/', {'client': 'x'}),
+                            ('/api/maintenances/', {'operating_time_to': 'abc'})):
+            with self.subTest(params=params):
+                response = self.api.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(list(response.data), list(params))
+
+    def test_ordering_drives_cursor(self):
+        response = self.api.get('/api/vehicles/', {'ordering': '-factory_number', 'page_size': 2})
+        self.assertEqual([item['factory_number'] for item in response.data['results']], ['F000003', 'F000002'])
+        # Позиция курсора — значения полей сортировки последней записи страницы
+        cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        position = json.loads(parse_qs(b64decode(cursor).decode())['p'][0])
+        self.assertEqual(position, ['F000002', str(Vehicle.objects.get(factory_number='F000002').pk)])
+        response = self.api.get(response.data['next'])
+        self.assertEqual([item['factory_number'] for item in response.data['results']], ['F000001'])
+
+
+class ReferenceCacheTest(AppTestCase):
+    """Снимок справочников: сброс при записи в этом процессе и по поколению из других воркеров."""
+
+    def setUp(self):
+        super().setUp()
+        self.reference = ReferenceDirectory.objects.create(ref_type='node_fail', name='Двигатель')
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('manager', password='password', type=User.MANAGER))
+
+    def names(self):
+        return {item['id']: item['name'] for item in self.api.get('/api/references/').data}
+
+    def test_save_and_delete_invalidate_snapshot(self):
+        self.assertEqual(reference_cache.get_snapshot().get(self.reference.pk).name, 'Двигатель')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reference.name = 'Трансмиссия'
+            self.reference.save()
+        self.assertEqual(reference_cache.get_snapshot().get(self.reference.pk).name, 'Трансмиссия')
+        self.assertEqual(self.names()[self.reference.pk], 'Трансмиссия')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reference.delete()
+        self.assertIsNone(reference_cache.get_snapshot().get(self.reference.pk))
+        self.assertEqual(self.names(), {})
+
+    def test_other_worker_change(self):
+        snapshot = reference_cache.get_snapshot()
+        # Другой воркер изменил таблицу и сменил поколение; снимок этого процесса не сброшен сигналом
+        ReferenceDirectory.objects.filter(pk=self.reference.pk).update(name='Трансмиссия')
+        caches['shared'].set('generation:references', 'other-worker', timeout=None)
+
+        with mock.patch('app.cache.monotonic', return_value=time.monotonic()):
+            self.assertIs(reference_cache.get_snapshot(), snapshot)
+        with mock.patch('app.cache.monotonic', return_value=time.monotonic() + settings.GENERATION_CHECK_INTERVAL):
+            self.assertEqual(reference_cache.get_snapshot().get(self.reference.pk).name, 'Трансмиссия')
+
+    def test_generation_is_read_once_per_interval(self):
+        reference_cache.get_snapshot()
+        shared = caches['shared']
+        with mock.patch.object(shared, 'get', wraps=shared.get) as get:
+            for _ in range(10):
+                reference_cache.get_snapshot()
+            self.names()
+        self.assertEqual(get.call_count, 0)
+
+    def test_stale_generations_are_forgotten(self):
+        now = time.monotonic()
+        with mock.patch('app.cache.LOCAL_GENERATIONS_LIMIT', 3):
+            with mock.patch('app.cache.monotonic', return_value=now):
+                for number in range(3):
+                    cache.get_generation(f'card-{number}')
+            with mock.patch('app.cache.monotonic', return_value=now + settings.GENERATION_CHECK_INTERVAL):
+                cache.get_generation('card-new')
+        self.assertEqual(set(cache._local), {'card-new'})
+
+
+class ConditionalGetTest(AppTestCase):
+    """ETag и Last-Modified: 304 для неизмененных ответов, новый ответ после изменения связанных строк и удаления."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def assertNotModified(self, url, response, modified=False):
+        """Повторяет запрос с If-None-Match ответа: 304, если ответ не изменился, иначе 200."""
+        repeated = self.api.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 200 if modified else 304)
+        return repeated
+
+    def test_list_and_detail(self):
+        maintenance = Maintenance.objects.order_by('pk').first()
+        for url in ('/api/vehicles/', '/api/maintenances/', '/api/claims/',
+                    '/api/vehicles/F000001/', f'/api/maintenances/{maintenance.pk}/'):
+            with self.subTest(url=url):
+                response = self.api.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotModified(url, response)
+
+        # Last-Modified — только у записи: If-Modified-Since списка не дает 304
+        response = self.api.get('/api/vehicles/F000001/')
+        self.assertEqual(self.api.get('/api/vehicles/F000001/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                         .status_code, 304)
+        self.assertNotIn('Last-Modified', self.api.get('/api/maintenances/'))
+
+    def test_related_rows_change_etag(self):
+        responses = {url: self.api.get(url) for url in ('/api/vehicles/', '/api/maintenances/', '/api/claims/')}
+        vehicle = Vehicle.objects.get(factory_number='F000001')
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle.factory_number = 'F900001'
+            vehicle.save()
+        for url in ('/api/maintenances/', '/api/claims/'):
+            with self.subTest(url=url):
+                response = self.assertNotModified(url, responses[url], modified=True)
+                self.assertIn('F900001', response.content.decode())
+                responses[url] = response
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fleet.service.fullname = 'Сервис 2'
+            self.fleet.service.save()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertIn('Сервис 2', self.assertNotModified(url, response, modified=True).content.decode())
+
+    def test_delete_changes_etag(self):
+        response = self.api.get('/api/maintenances/')
+        # Удаляется не последняя измененная запись: max(updated_at) остается прежним
+        Maintenance.objects.order_by('updated_at').first().delete()
+        self.assertEqual(len(self.assertNotModified('/api/maintenances/', response, modified=True).data), 5)
+
+
+class ListQueryCountTest(AppTestCase):
+    """Количество запросов списочных эндпоинтов не должно зависеть от числа строк."""
+
+    endpoints = ['/api/vehicles/', '/api/maintenances/', '/api/claims/']
+
+    def count_queries(self, api, url):
+        """Выполняет GET и возвращает число SQL-запросов (после прогрева кэшей процесса)."""
+        api.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        fleet = FleetFactory()
+        users = {'MR': fleet.manager, 'CL': fleet.client, 'SO': fleet.service, 'anonymous': None}
+
+        fleet.create_vehicles(2)
+        small = {}
+        for role, user in users.items():
+            api = APIClient()
+            api.force_authenticate(user)
+            for url in self.endpoints if user else self.endpoints[:1]:
+                small[role, url] = self.count_queries(api, url)
+
+        fleet.create_vehicles(8)
+        for role, user in users.items():
+            api = APIClient()
+            api.force_authenticate(user)
+            for url in self.endpoints if user else self.endpoints[:1]:
+                with self.subTest(role=role, url=url):
+                    self.assertEqual(self.count_queries(api, url), small[role, url])
+
+
+@override_settings(API_LIST_PROJECTIONS=False)
+class SerializerListQueryCountTest(ListQueryCountTest):
+    """То же для списков через сериализаторы (без проекций values_list)."""
+
+
+class ProjectionParityTest(AppTestCase):
+    """Проекции списков должны выдавать тот же JSON, что и сериализаторы, байт в байт."""
+
+    def test_projection_matches_serializer(self):
+        fleet = FleetFactory()
+        fleet.create_vehicles(3)
+        renderer = JSONRenderer()
+
+        for serializer_class, projection in PROJECTIONS.items():
+            model = serializer_class.Meta.model
+            queryset = get_query_plan(serializer_class).apply(model.objects.order_by('id'))
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = renderer.render(serializer_class(queryset, many=True).data)
+                actual = renderer.render(projection.serialize(projection.get_rows(queryset)))
+                self.assertEqual(actual, expected)
+
+    def test_only_active_ordering_is_selected(self):
+        fleet = FleetFactory()
+        fleet.create_vehicles(3)
+        api = APIClient()
+        api.force_authenticate(fleet.manager)
+
+        def list_sql(params):
+            with CaptureQueriesContext(connection) as queries:
+                response = api.get('/api/claims/', params)
+            self.assertEqual(response.status_code, 200)
+            [sql] = [query['sql'] for query in queries.captured_queries
+                     if query['sql'].startswith('SELECT "app_warrantyclaim"."id"')]
+            return sql
+
+        # Справочники берутся из кэша: JOIN нужен только для сортировки по названию узла отказа
+        self.assertNotIn('app_referencedirectory', list_sql({'page_size': 2}))
+        # Колонка для курсора — только поле запрошенной сортировки
+        sql = list_sql({'page_size': 2, 'ordering': 'node_fail__name'})
+        self.assertIn('AS "node_fail__name"', sql)
+        self.assertNotIn('method_recovery__name', sql)
+        # Без пагинации курсор не строится, колонка не выбирается
+        self.assertNotIn('AS "node_fail__name"', list_sql({'ordering': 'node_fail__name'}))
+
+
+@override_settings(API_STREAM_CHUNK_SIZE=4)
+class StreamingListTest(AppTestCase):
+    """Потоковая выдача (stream=1) должна совпадать с обычным ответом списка."""
+
+    def test_streamed_list_matches_regular_list(self):
+        fleet = FleetFactory()
+        fleet.create_vehicles(5)
+        api = APIClient()
+        api.force_authenticate(fleet.manager)
+
+        for projections in (True, False):
+            for url in ListQueryCountTest.endpoints:
+                with self.subTest(url=url, projections=projections), \
+                        override_settings(API_LIST_PROJECTIONS=projections):
+                    regular = api.get(url)
+                    streamed = api.get(url, {'stream': 1})
+                    self.assertTrue(streamed.streaming)
+                    self.assertEqual(b''.join(streamed.streaming_content), regular.content)
+
+
+class BulkWriteTest(AppTestCase):
+    """Пакетная запись ТО и рекламаций: построчные ошибки и число запросов, не зависящее от размера пачки."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(3)
+        self.vehicles = list(Vehicle.objects.order_by('id'))
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.service)
+
+    def maintenance_rows(self, count, prefix):
+        """Строки ТО с видами ТО, которых у машин еще нет."""
+        maintenance_type = ReferenceDirectory.objects.create(ref_type='type_maintenance', name=f'ТО-{prefix}')
+        return [
+            {
+                'vehicle_id': self.vehicles[index % len(self.vehicles)].pk, 'maintenance_type_id': maintenance_type.pk, 'maintenance_date': '2024-05-01',
+                'operating_time': 300, 'order_number': f'{prefix}-{index}', 'order_date': '2024-05-01',
+            }
+            for index in range(count)
+        ]
+
+    def claim_rows(self, count):
+        """Строки рекламаций с простоем 3 дня."""
+        return [
+            {
+                'vehicle_id': self.vehicles[index % len(self.vehicles)].pk,
+                'node_fail_id': self.fleet.references['node_fail'].pk,
+                'method_recovery_id': self.fleet.references['method_recovery'].pk,
+                'operating_time': 200, 'fail_description': 'Отказ', 'failure_date': '2024-06-01',
+                'recovery_date': '2024-06-04', 'service_id': self.fleet.service.pk,
+            }
+            for index in range(count)
+        ]
+
+    def test_maintenance_bulk_reports_row_errors(self):
+        rows = self.maintenance_rows(3, 'A')
+        rows.append(dict(rows[0], order_number='A-dup'))
+        rows.append(dict(rows[1], order_number='000001-0'))
+        rows.append(dict(rows[2], maintenance_date='не дата'))
+
+        response = self.api.post('/api/maintenances/bulk/', rows, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['index'] for item in response.data['created']], [0, 1, 2])
+        errors = {item['index']: item['errors'] for item in response.data['errors']}
+        self.assertEqual(errors[3], {'type': ['ТО уже существует']})
+        self.assertEqual(errors[4], {'order_number': ['Номер используется']})
+        self.assertIn('maintenance_date', errors[5])
+
+        record = Maintenance.objects.get(pk=response.data['created'][0]['id'])
+        update = dict(rows[0], id=record.pk, operating_time=350)
+        response = self.api.post('/api/maintenances/bulk/', [update], format='json')
+        self.assertEqual(response.data['updated'], [{'index': 0, 'id': record.pk}])
+        record.refresh_from_db()
+        self.assertEqual(record.operating_time, 350)
+
+    def test_claim_bulk_computes_downtime(self):
+        response = self.api.post('/api/claims/bulk/', self.claim_rows(3), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        ids = [item['id'] for item in response.data['created']]
+        self.assertEqual(set(WarrantyClaim.objects.filter(pk__in=ids).values_list('downtime', flat=True)), {3})
+
+    def test_duplicate_maintenance_type(self):
+        row = self.maintenance_rows(1, 'B')[0]
+        self.assertEqual(self.api.post('/api/maintenances/', row, format='json').status_code, 201)
+        response = self.api.post('/api/maintenances/', dict(row, order_number='B-dup'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'type': ['ТО уже существует']})
+
+        # Другие ошибки целостности тех же столбцов не выдаются за дубликат
+        with self.assertRaisesMessage(IntegrityError, 'NOT NULL'), unique_maintenance_type_guard():
+            Maintenance.objects.create(vehicle=self.vehicles[0], maintenance_type_id=None, operating_time=1,
+                                       maintenance_date=date.today(), order_number='B-null', order_date=date.today())
+
+    def test_race_fallback_returns_field_errors(self):
+        rows = self.maintenance_rows(3, 'R')
+        other_type = ReferenceDirectory.objects.create(ref_type='type_maintenance', name='ТО-R2')
+        self.assertEqual(self.api.post('/api/maintenances/', dict(rows[0], maintenance_type_id=other_type.pk),
+                                       format='json').status_code, 201)
+        self.assertEqual(self.api.post('/api/maintenances/', dict(rows[1], order_number='R-x'),
+                                       format='json').status_code, 201)
+
+        # Параллельный запрос занял значения между проверкой пачки и записью
+        with mock.patch('app.bulk.MaintenanceBulkWriter.check_batch', return_value={}):
+            response = self.api.post('/api/maintenances/bulk/', rows, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['index'] for item in response.data['created']], [2])
+        errors = {item['index']: item['errors'] for item in response.data['errors']}
+        self.assertEqual(errors, {0: {'order_number': ['Номер используется']}, 1: {'type': ['ТО уже существует']}})
+        self.assertNotIn(Maintenance._meta.db_table, response.content.decode())
+
+        # Прочие нарушения ограничений — общее сообщение без текста ошибки БД
+        exc = IntegrityError('CHECK constraint failed: app_maintenance')
+        self.assertEqual(integrity_error_detail(exc, Maintenance), {'non_field_errors': [INTEGRITY_ERROR_MESSAGE]})
+
+    def test_client_cannot_write_claims(self):
+        self.api.force_authenticate(self.fleet.client)
+        response = self.api.post('/api/claims/bulk/', self.claim_rows(1), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['created'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        counts = []
+        for prefix, count in (('S', 2), ('L', 20)):
+            rows = self.maintenance_rows(count, prefix)
+            for index, row in enumerate(rows):
+                row['vehicle_id'] = self.vehicles[0].pk
+                if index:
+                    row['maintenance_type_id'] = ReferenceDirectory.objects.create(
+                        ref_type='type_maintenance', name=f'ТО-{prefix}-{index}').pk
+            self.api.get('/api/references/')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.api.post('/api/maintenances/bulk/', rows, format='json')
+            self.assertEqual(len(response.data['created']), count, response.data['errors'])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class FleetImportTest(AppTestCase):
+    """Импорт техники и истории: построчные ошибки, повторный импорт и продолжение с места остановки."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def upload(self, kind, lines, **data):
+        """Отправляет CSV на /api/import/."""
+        file = SimpleUploadedFile(f'{kind}.csv', '\n'.join(lines).encode('utf-8'))
+        return self.api.post('/api/import/', {'file': file, 'kind': kind, **data}, format='multipart')
+
+    def vehicle_line(self, number, model='model_tech 1', client='client'):
+        """Строка CSV техники с номерами узлов, производными от заводского номера."""
+        return (f'{number};{model};model_engine 1;E{number};model_transmission 1;T{number};model_drive_bridge 1;'
+                f'D{number};model_control_bridge 1;C{number};Договор;01.02.2024;Получатель;Адрес;Стандарт;'
+                f'{client};service')
+
+    vehicle_header = ('Зав. № машины;vehicle_model;engine_model;engine_number;transmission_model;transmission_number;'
+                      'drive_bridge_model;drive_bridge_number;control_bridge_model;control_bridge_number;'
+                      'supply_contract;shipping_date;recipient;delivery_address;equipment;client;service')
+
+    def test_import_vehicles_and_history(self):
+        lines = [self.vehicle_header, self.vehicle_line('V1'), self.vehicle_line('V2', model='Нет такой'),
+                 self.vehicle_line('V3', client='service'), self.vehicle_line('V1')]
+
+        response = self.upload('vehicles', lines)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['processed'], response.data['created']), (4, 1))
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {2, 3, 4})
+        self.assertIn('vehicle_model', errors[2])
+        self.assertIn('client', errors[3])
+        self.assertEqual(errors[4]['factory_number'], ['Номер используется'])
+
+        response = self.upload('vehicles', lines[:2])
+        self.assertEqual((response.data['created'], response.data['skipped']), (0, 1))
+
+        response = self.upload('maintenances', [
+            'vehicle,maintenance_type,maintenance_date,operating_time,order_number,order_date,service',
+            'V1,type_maintenance 1,2024-03-01,10,Z-1,2024-03-01,',
+            'V1,ТО-2,2024-04-01,20,Z-2,2024-04-01,service',
+        ], skip=1)
+        self.assertEqual(response.data['created'], 1)
+        maintenance = Maintenance.objects.get()
+        self.assertEqual((maintenance.order_number, maintenance.service_id), ('Z-2', self.fleet.service.pk))
+
+        response = self.upload('claims', [
+            'vehicle,failure_date,operating_time,node_fail,fail_description,method_recovery,recovery_date,service',
+            'V1,2024-05-01,30,node_fail 1,Отказ,method_recovery 1,2024-05-06,service',
+        ])
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(WarrantyClaim.objects.get().downtime, 5)
+
+    def test_race_fallback_returns_field_errors(self):
+        self.upload('vehicles', [self.vehicle_header, self.vehicle_line('V1')])
+        self.upload('maintenances', [
+            'vehicle,maintenance_type,maintenance_date,operating_time,order_number,order_date,service',
+            'V1,type_maintenance 1,2024-03-01,10,Z-1,2024-03-01,service',
+        ])
+
+        # Параллельный импорт занял номера между проверкой пачки и вставкой
+        with mock.patch('app.fleet_import.VehicleImporter.get_conflicts', return_value={}):
+            response = self.upload('vehicles', [self.vehicle_header, self.vehicle_line('V2').replace(';EV2;', ';EV1;')])
+        self.assertEqual(response.data['errors'], [{'row': 1, 'errors': {'engine_number': ['Номер используется']}}])
+
+        with mock.patch('app.fleet_import.MaintenanceImporter.get_conflicts', return_value={}):
+            response = self.upload('maintenances', [
+                'vehicle,maintenance_type,maintenance_date,operating_time,order_number,order_date,service',
+                'V1,type_maintenance 1,2024-04-01,20,Z-2,2024-04-01,service',
+            ])
+        self.assertEqual(response.data['errors'], [{'row': 1, 'errors': {'maintenance_type': ['ТО уже существует']}}])
+        self.assertEqual(response.data['created'], 0)
+
+    def test_import_xlsx(self):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(['vehicle', 'maintenance_type', 'maintenance_date', 'operating_time', 'order_number',
+                      'order_date', 'service'])
+        self.fleet.create_vehicles(1)
+        # Даты и числа — значения ячеек XLSX, а не строки
+        sheet.append(['F000001', 'ТО-4', date(2024, 4, 1), 20, 'X-1', date(2024, 4, 1), 'service'])
+        content = io.BytesIO()
+        workbook.save(content)
+        ReferenceDirectory.objects.create(ref_type='type_maintenance', name='ТО-4')
+
+        file = SimpleUploadedFile('maintenances.xlsx', content.getvalue())
+        response = self.api.post('/api/import/', {'file': file, 'kind': 'maintenances'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1, response.data)
+        maintenance = Maintenance.objects.get(order_number='X-1')
+        self.assertEqual((maintenance.maintenance_date, maintenance.operating_time), (date(2024, 4, 1), 20))
+
+    def test_only_manager_can_import(self):
+        self.api.force_authenticate(self.fleet.service)
+        self.assertEqual(self.upload('vehicles', ['factory_number']).status_code, 403)
+
+
+@override_settings(API_STREAM_CHUNK_SIZE=4)
+class ExportTest(AppTestCase):
+    """Выгрузка CSV: поток, ограничение по роли и совместимость с импортом."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(3)
+        self.api = APIClient()
+
+    def export(self, url, user, **params):
+        """Выгружает CSV и возвращает строки файла."""
+        self.api.force_authenticate(user)
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+
+    def test_export_respects_role_and_filters(self):
+        other = User.objects.create_user('other', password='password', type=User.SERV_ORG)
+        self.assertEqual(len(self.export('/api/claims/export/', self.fleet.manager)), 1 + 6)
+        self.assertEqual(len(self.export('/api/claims/export/', other)), 1)
+        vehicle = Vehicle.objects.order_by('id').first()
+        lines = self.export('/api/maintenances/export/', self.fleet.client, vehicle=vehicle.pk)
+        self.assertEqual(len(lines), 1 + 3)
+        self.assertIn(vehicle.factory_number, lines[1])
+
+        self.api.force_authenticate(None)
+        self.assertEqual(self.api.get('/api/vehicles/export/').status_code, 401)
+
+    def test_usernames_only_for_manager(self):
+        header, client_row = [line.split(';') for line in self.export('/api/vehicles/export/', self.fleet.client)[:2]]
+        manager_row = self.export('/api/vehicles/export/', self.fleet.manager)[1].split(';')
+        client, service = header.index('Клиент'), header.index('Сервисная компания')
+        self.assertEqual((client_row[client], client_row[service]), ('Клиент', 'Сервис'))
+        self.assertEqual((manager_row[client], manager_row[service]), ('client', 'service'))
+
+    def test_exported_file_can_be_imported(self):
+        lines = self.export('/api/maintenances/export/', self.fleet.manager)
+        file = SimpleUploadedFile('maintenances.csv', '\n'.join(lines).encode('utf-8'))
+        response = self.api.post('/api/import/', {'file': file, 'kind': 'maintenances'}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['skipped'], response.data['errors']), (0, 9, []))
+
+
+class PublicVehicleCacheTest(AppTestCase):
+    """Публичная карточка техники: тот же JSON, без запросов при попадании в кэш, сброс при изменениях."""
+
+    def setUp(self):
+        super().setUp()
+        public_cache.invalidate()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(1)
+        self.vehicle = Vehicle.objects.get()
+        self.url = f'/api/vehicles/{self.vehicle.factory_number}/'
+        self.api = APIClient()
+
+    def test_cached_card_matches_serializer(self):
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, JSONRenderer().render(VehiclePublicSerializer(self.vehicle).data))
+        self.assertIn('public', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api.get(self.url).content, response.content)
+            self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.api.get('/api/vehicles/missing/').status_code, 404)
+
+    def test_card_is_invalidated_on_changes(self):
+        self.api.get(self.url)
+        reference = self.fleet.references['model_tech']
+        reference.name = 'Новая модель'
+        reference.save()
+        self.assertEqual(self.api.get(self.url).json()['vehicle_model'], 'Новая модель')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehicle.engine_number = 'E-new'
+            self.vehicle.save()
+        self.assertEqual(self.api.get(self.url).json()['engine_number'], 'E-new')
+
+    def test_change_invalidates_only_own_card(self):
+        self.fleet.create_vehicles(1)
+        other = Vehicle.objects.exclude(pk=self.vehicle.pk).get()
+        self.api.get(self.url)
+        self.api.get(f'/api/vehicles/{other.factory_number}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.engine_number = 'E-other'
+            other.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api.get(self.url).status_code, 200)
+
+        # Машина переименована: старый номер больше не отдается, новый виден сразу
+        old_url = f'/api/vehicles/{other.factory_number}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            other.factory_number = 'RENAMED'
+            other.save()
+        self.assertEqual(self.api.get(old_url).status_code, 404)
+        self.assertEqual(self.api.get('/api/vehicles/RENAMED/').json()['engine_number'], 'E-other')
+
+    def test_missing_numbers_are_not_cached(self):
+        self.api.get(self.url)
+        for number in range(5):
+            self.assertEqual(self.api.get(f'/api/vehicles/missing-{number}/').status_code, 404)
+        self.assertEqual(len(public_cache._cache), 1)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={
+    'anon': ('1/min', 2), 'CL': ('1/min', 2), 'SO': ('1/min', 2), 'MR': ('1/min', 5),
+})
+class ThrottleTest(AppTestCase):
+    """Ограничение частоты: отдельные корзины для ролей и маршрутов, отказ без запросов к БД."""
+
+    def setUp(self):
+        super().setUp()
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.settings = override_settings(THROTTLE_STORE=Path(self.store_dir.name) / 'throttle.sqlite3')
+        self.settings.enable()
+        self.fleet = FleetFactory()
+        self.api = APIClient()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.store_dir.cleanup()
+
+    def test_anonymous_budget_is_enforced_before_orm(self):
+        self.assertEqual([self.api.get('/api/vehicles/').status_code for _ in range(2)], [200, 200])
+        with self.assertNumQueries(0):
+            response = self.api.get('/api/vehicles/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Другой маршрут — другая корзина
+        self.assertEqual(self.api.get('/api/vehicles/missing/').status_code, 404)
+
+    def test_roles_have_separate_budgets(self):
+        token = self.api.post('/api/token/', {'username': 'manager', 'password': 'password'}).data['access']
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        statuses = [self.api.get('/api/references/').status_code for _ in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+
+    def test_token_is_validated_once_per_request(self):
+        token = self.api.post('/api/token/', {'username': 'manager', 'password': 'password'}).data['access']
+        validate = JWTAuthentication.get_validated_token
+        with mock.patch.object(JWTAuthentication, 'get_validated_token', autospec=True,
+                               side_effect=validate) as get_validated_token:
+            self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(self.api.get('/api/references/').status_code, 200)
+            self.assertEqual(get_validated_token.call_count, 1)
+
+            self.api.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+            self.assertEqual(self.api.get('/api/references/').status_code, 401)
+            self.assertEqual(get_validated_token.call_count, 2)
+
+
+class StatelessAuthenticationTest(AppTestCase):
+    """Пользователь запроса собирается из claims токена; изменение пользователя отзывает его токены."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(1)
+        self.api = APIClient()
+
+    def login(self, username):
+        """Получает токены и подставляет access-токен в запросы клиента."""
+        data = self.api.post('/api/token/', {'username': username, 'password': 'password'}).data
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {data["access"]}')
+        return data
+
+    def test_authenticated_request_does_not_load_user(self):
+        self.login('client')
+        self.api.get('/api/references/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api.get('/api/references/').status_code, 200)
+        self.assertEqual(len(self.api.get('/api/vehicles/').json()), 1)
+
+    def test_object_permissions_use_numeric_id(self):
+        claim = WarrantyClaim.objects.first()
+        for username in ('client', 'service'):
+            self.login(username)
+            with self.subTest(username=username):
+                self.assertEqual(self.api.get('/api/vehicles/F000001/').json()['client_id'], self.fleet.client.pk)
+                self.assertEqual(self.api.get(f'/api/claims/{claim.pk}/').status_code, 200)
+
+    def test_user_change_revokes_tokens(self):
+        tokens = self.login('service')
+        self.assertEqual(self.api.get('/api/claims/').status_code, 200)
+
+        self.fleet.service.fullname = 'Новое имя'
+        self.fleet.service.save()
+        self.assertEqual(self.api.get('/api/claims/').status_code, 401)
+        self.assertEqual(self.api.post('/api/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+    def test_token_issued_in_revocation_second_is_revoked(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.fleet.service).access_token
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.api.get('/api/claims/').status_code, 200)
+
+        # Роль изменена в конце той же секунды, в которую выдан токен
+        with mock.patch('app.authentication.time', return_value=token['iat'] + 0.9):
+            self.fleet.service.type = User.CLIENT
+            self.fleet.service.save()
+        self.assertEqual(self.api.get('/api/claims/').status_code, 401)
+
+    def test_login_checks_password_once(self):
+        hasher = get_hasher()
+        with mock.patch.object(hasher, 'verify', wraps=hasher.verify) as verify:
+            tokens = self.login('manager')
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(tokens['user']['type'], User.MANAGER)
+        self.assertEqual(self.api.post('/api/token/', {'username': 'manager', 'password': 'wrong'}).status_code, 400)
+
+        # Обновление access-токена не обращается к БД, новый токен принимается
+        self.api.credentials()
+        with self.assertNumQueries(0):
+            data = self.api.post('/api/token/refresh/', {'refresh': tokens['refresh']}).data
+        self.assertEqual(set(data), {'access', 'access_expires_at'})
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {data["access"]}')
+        self.assertEqual(self.api.get('/api/maintenances/').status_code, 200)
+
+
+class VehicleStatsTest(AppTestCase):
+    """Сводка машин пересчитывается при любой записи ТО и рекламаций и совпадает с полным пересчетом."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.first, self.second = Vehicle.objects.order_by('id')
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.service)
+
+    def assertStatsUpToDate(self):
+        """Сохраненная сводка совпадает с вычисленной заново по всем машинам."""
+        expected = vehicle_stats.compute(Vehicle.objects.values_list('pk', flat=True))
+        stored = {stats.pk: stats for stats in VehicleStats.objects.all()}
+        self.assertEqual(set(stored), set(expected))
+        for pk, stats in expected.items():
+            for name in vehicle_stats.FIELDS:
+                self.assertEqual(getattr(stored[pk], name), getattr(stats, name), (pk, name))
+
+    def test_stats_follow_history_writes(self):
+        stats = VehicleStats.objects.get(vehicle=self.first)
+        self.assertEqual((stats.maintenance_count, stats.claim_count, stats.total_downtime), (3, 2, 8))
+        self.assertEqual((stats.last_maintenance_date, stats.operating_time), (date(2024, 2, 3), 200))
+
+        # Перенос рекламации на другую машину пересчитывает обе
+        claim = WarrantyClaim.objects.filter(vehicle=self.first).first()
+        claim.vehicle = self.second
+        claim.recovery_date = date.today() + timedelta(days=10)
+        claim.save()
+        self.assertEqual(VehicleStats.objects.get(vehicle=self.first).claim_count, 1)
+        self.assertEqual(VehicleStats.objects.get(vehicle=self.second).get_open_claims(), 1)
+
+        Maintenance.objects.filter(vehicle=self.first).first().delete()
+        row = {
+            'vehicle_id': self.first.pk, 'node_fail_id': self.fleet.references['node_fail'].pk,
+            'method_recovery_id': self.fleet.references['method_recovery'].pk, 'operating_time': 900,
+            'fail_description': 'Отказ', 'failure_date': '2024-06-01', 'recovery_date': '2024-06-04',
+            'service_id': self.fleet.service.pk,
+        }
+        response = self.api.post('/api/claims/bulk/', [row, dict(row, vehicle_id=self.second.pk)], format='json')
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertStatsUpToDate()
+
+        self.second.delete()
+        self.assertStatsUpToDate()
+
+    def test_open_claims_close_without_writes(self):
+        claim = WarrantyClaim.objects.filter(vehicle=self.second).first()
+        claim.recovery_date = timezone.localdate() + timedelta(days=1)
+        claim.save()
+        self.api.force_authenticate(self.fleet.manager)
+        detail_url = f'/api/vehicles/{self.second.factory_number}/'
+
+        response = self.api.get('/api/vehicles/', {'ordering': '-open_claims', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['id'], self.second.pk)
+        self.assertEqual(response.data['results'][0]['stats']['open_claims'], 1)
+        self.assertEqual([item['id'] for item in self.api.get(response.data['next']).data['results']], [self.first.pk])
+        detail = self.api.get(detail_url)
+        self.assertEqual(detail.data['stats']['open_claims'], 1)
+
+        # Дата восстановления наступила: рекламация закрыта без записи в БД, ETag сменился
+        with mock.patch('django.utils.timezone.localdate', return_value=claim.recovery_date):
+            response = self.api.get('/api/vehicles/', {'ordering': '-open_claims'})
+            self.assertEqual([item['stats']['open_claims'] for item in response.data], [0, 0])
+            response = self.api.get(detail_url, HTTP_IF_NONE_MATCH=detail['ETag'])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['stats']['open_claims'], 0)
+        self.assertStatsUpToDate()
+
+    def test_list_sorted_by_stats(self):
+        Maintenance.objects.filter(vehicle=self.first).first().delete()
+        self.api.force_authenticate(self.fleet.manager)
+
+        response = self.api.get('/api/vehicles/', {'ordering': 'stats__maintenance_count', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['id'], self.first.pk)
+        self.assertEqual(response.data['results'][0]['stats']['maintenance_count'], 2)
+        response = self.api.get(response.data['next'])
+        self.assertEqual([item['id'] for item in response.data['results']], [self.second.pk])
+
+
+class ReliabilityAnalyticsTest(AppTestCase):
+    """Показатели надежности по рекламациям: значения, ограничение по роли и сброс кэша при записи."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def test_report_values_and_invalidation(self):
+        # У каждой машины две рекламации по одному узлу на наработке 150 и наработка 200 по ТО
+        report = self.api.get('/api/claims/analytics/').data
+        node = report['node_fail'][0]
+        self.assertEqual(report['claims'], 4)
+        self.assertEqual(node['name'], self.fleet.references['node_fail'].name)
+        self.assertEqual((node['failures'], node['mtbf'], node['failure_rate']), (4, 75.0, 10.0))
+        self.assertEqual(node['downtime'], {'mean': 4.0, 'p50': 4.0, 'p90': 4.0, 'p95': 4.0})
+        self.assertEqual(report['service'][0]['name'], self.fleet.service.fullname)
+
+        claim = WarrantyClaim.objects.order_by('id').first()
+        claim.recovery_date += timedelta(days=4)
+        # Поколение меняется после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            claim.save()
+        node = self.api.get('/api/claims/analytics/').data['node_fail'][0]
+        self.assertEqual(node['downtime']['mean'], 5.0)
+        self.assertEqual(node['downtime']['p95'], 7.4)
+
+        vehicle = Vehicle.objects.order_by('id').first()
+        report = self.api.get('/api/claims/analytics/', {'vehicle': vehicle.pk}).data
+        self.assertEqual((report['claims'], report['operating_time']), (2, 200))
+
+    def test_unavailable_without_numpy(self):
+        with mock.patch.object(analytics, 'np', None):
+            self.assertEqual(self.api.get('/api/claims/analytics/').status_code, 503)
+
+
+class SearchTest(AppTestCase):
+    """Полнотекстовый поиск: части номеров и слов, синхронизация индекса триггерами, ограничение по роли."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.vehicle = Vehicle.objects.order_by('id').first()
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def search(self, query, **params):
+        response = self.api.get('/api/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['id']) for item in response.data['results']]
+
+    def test_partial_number_and_text(self):
+        self.assertEqual(self.search('000001'), [('vehicle', self.vehicle.pk)])
+        self.assertEqual(len(self.search('F0000', type='vehicle')), 2)
+
+        # Индекс обновляется и при сохранении объекта, и при UPDATE без сигналов
+        claim = WarrantyClaim.objects.filter(vehicle=self.vehicle).order_by('id').first()
+        claim.fail_description = 'Течь масла из-под крышки'
+        claim.save()
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(recipient='ООО Масленников')
+        self.assertCountEqual(self.search('МАСЛ'), [('claim', claim.pk), ('vehicle', self.vehicle.pk)])
+        self.assertEqual(self.search('масл крышк'), [('claim', claim.pk)])
+
+        self.vehicle.delete()
+        self.assertEqual(self.search('масл'), [])
+
+    def test_role_scope(self):
+        other = User.objects.create_user('other', password='password', type=User.CLIENT)
+        self.api.force_authenticate(other)
+        self.assertEqual(self.search('F0000'), [])
+        self.api.force_authenticate(self.fleet.client)
+        self.assertEqual(len(self.search('F0000')), 2)
+        self.assertEqual(len(self.search('Отказ', type='claim')), 4)
+
+    def test_short_query(self):
+        self.assertEqual(self.api.get('/api/search/', {'q': 'F0'}).status_code, 400)
+        self.api.force_authenticate(None)
+        self.assertEqual(self.api.get('/api/search/', {'q': 'F000'}).status_code, 401)
+
+
+class ComponentSerialTest(AppTestCase):
+    """Индекс заводских номеров агрегатов: синхронизация триггерами, поиск машины и подсказка по началу номера."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.vehicle = Vehicle.objects.order_by('id').first()
+        self.api = APIClient()
+        self.api.force_authenticate(self.fleet.manager)
+
+    def test_index_follows_vehicle_writes(self):
+        self.assertEqual(ComponentSerial.objects.count(), 10)
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(engine_number='ENG-1')
+        self.assertEqual(
+            set(ComponentSerial.objects.filter(vehicle=self.vehicle).values_list('kind', 'serial')),
+            {('factory', 'F000001'), ('engine', 'ENG-1'), ('transmission', 'T000001'),
+             ('drive_bridge', 'D000001'), ('control_bridge', 'C000001')},
+        )
+        self.vehicle.delete()
+        self.assertEqual(ComponentSerial.objects.count(), 5)
+
+    def test_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get('/api/vehicles/lookup/', {'serial': 'D000002'})
+        self.assertEqual(response.status_code, 200)
+        [result] = response.data['results']
+        self.assertEqual((result['kind'], result['vehicle']['factory_number']), ('drive_bridge', 'F000002'))
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual(self.api.get('/api/vehicles/lookup/', {'serial': 'D00000'}).status_code, 404)
+        self.api.force_authenticate(User.objects.create_user('other', password='password', type=User.CLIENT))
+        self.assertEqual(self.api.get('/api/vehicles/lookup/', {'serial': 'D000002'}).status_code, 404)
+
+    def test_autocomplete(self):
+        response = self.api.get('/api/vehicles/autocomplete/', {'prefix': 'E00000', 'limit': 1})
+        self.assertEqual(response.data, [{'serial': 'E000001', 'kind': 'engine', 'factory_number': 'F000001'}])
+        self.assertEqual(len(self.api.get('/api/vehicles/autocomplete/', {'prefix': 'T'}).data), 2)
+        self.assertEqual(self.api.get('/api/vehicles/autocomplete/', {'prefix': 't'}).data, [])
+
+        self.api.force_authenticate(self.fleet.client)
+        self.assertEqual(len(self.api.get('/api/vehicles/autocomplete/', {'prefix': 'C0'}).data), 2)
+        self.api.force_authenticate(User.objects.create_user('other', password='password', type=User.CLIENT))
+        self.assertEqual(self.api.get('/api/vehicles/autocomplete/', {'prefix': 'C0'}).data, [])
+
+
+class AsyncEndpointsTest(AppTestCase):
+    """Асинхронные эндпоинты чтения должны отвечать так же, как синхронные, для всех ролей."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(3)
+        self.api = APIClient()
+
+    def assertSameResponse(self, url, async_url, params=None):
+        expected = self.api.get(url, params)
+        actual = self.api.get(async_url, params)
+        # Ссылки пагинации ведут на тот же маршрут
+        content = actual.content.replace(async_url.encode(), url.encode())
+        self.assertEqual((actual.status_code, content), (expected.status_code, expected.content))
+
+    def test_lists_match_sync_endpoints(self):
+        users = {'MR': self.fleet.manager, 'CL': self.fleet.client, 'SO': self.fleet.service, 'anonymous': None}
+        for role, user in users.items():
+            self.api.force_authenticate(user)
+            for name in ('references', 'vehicles', 'maintenances', 'claims'):
+                for params in (None, {'page_size': 2, 'ordering': '-id'}):
+                    with self.subTest(role=role, name=name, params=params):
+                        self.assertSameResponse(f'/api/{name}/', f'/api/async/{name}/', params)
+
+        other = User.objects.create_user('other', password='password', type=User.CLIENT)
+        self.api.force_authenticate(other)
+        self.assertEqual(self.api.get('/api/async/vehicles/').json(), [])
+
+    def test_public_vehicle(self):
+        self.assertSameResponse('/api/vehicles/F000001/', '/api/async/public/vehicles/F000001/')
+        self.assertEqual(self.api.get('/api/async/public/vehicles/NONE/').status_code, 404)
+
+    def test_generations_are_read_asynchronously(self):
+        self.api.force_authenticate(self.fleet.manager)
+        forget_generations()
+        shared = caches['shared']
+        with mock.patch('app.reference_cache.get_generation', side_effect=AssertionError), \
+                mock.patch('app.public_cache.get_generation', side_effect=AssertionError), \
+                mock.patch.object(shared, 'aget', wraps=shared.aget) as aget:
+            self.assertEqual(self.api.get('/api/async/claims/').status_code, 200)
+            self.api.force_authenticate(None)
+            self.assertEqual(self.api.get('/api/async/public/vehicles/F000001/').status_code, 200)
+        self.assertEqual(aget.call_count, 2)
+
+    async def test_asgi_request_with_token(self):
+        token = str(CustomTokenObtainPairSerializer.get_token(self.fleet.client).access_token)
+        response = await self.async_client.get('/api/async/claims/', headers={'authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 6)
+        self.assertEqual((await self.async_client.get('/api/async/claims/')).status_code, 401)
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTest(AppTestCase):
+    """Заголовок Server-Timing и строка лога с этапами запроса."""
+
+    def setUp(self):
+        super().setUp()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.token = str(CustomTokenObtainPairSerializer.get_token(self.fleet.manager).access_token)
+
+    def get_timings(self, response):
+        metrics = {}
+        for item in response['Server-Timing'].split(', '):
+            name, *params = item.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header(self):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        # Сериализаторы DRF (без проекций)
+        with override_settings(API_LIST_PROJECTIONS=False), CaptureQueriesContext(connection) as queries:
+            response = api.get('/api/vehicles/')
+        metrics = self.get_timings(response)
+        self.assertEqual(list(metrics), ['db', 'auth', 'serialize', 'render', 'total'])
+        self.assertEqual(metrics['db']['desc'], f'"{len(queries)} queries"')
+        for name in ('auth', 'serialize', 'render'):
+            self.assertGreater(float(metrics[name]['dur']), 0)
+
+        # Проекция списка и асинхронный маршрут (на малых данных время может округлиться до 0.0)
+        for url in ('/api/maintenances/', '/api/async/maintenances/'):
+            with self.subTest(url=url), \
+                    mock.patch.object(RequestTimings, 'add', autospec=True, side_effect=RequestTimings.add) as add:
+                api.get(url)
+            self.assertEqual({call.args[1] for call in add.call_args_list}, {'db', 'auth', 'serialize', 'render'})
+
+    @override_settings(SERVER_TIMING_LOG=True)
+    def test_log(self):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        with self.assertLogs('app.timing', 'INFO') as logs:
+            api.get('/api/vehicles/')
+            api.get('/api/async/claims/')
+            api.get('/api/vehicles/F000001/')
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([record['view'] for record in records],
+                         ['VehicleViewSet.list', 'WarrantyClaimViewSet.list', 'VehicleViewSet.retrieve'])
+        self.assertEqual(records[0]['status'], 200)
+        self.assertGreater(records[0]['queries'], 0)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        response = APIClient().get('/api/vehicles/F000001/')
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(METRICS_ENABLED=True, THROTTLE_ENABLED=True, THROTTLE_RATES={'anon': ('1/min', 2)})
+class MetricsTest(AppTestCase):
+    """Гистограммы и счетчики по маршрутам в общем файле, формат Prometheus, проба готовности."""
+
+    def setUp(self):
+        super().setUp()
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            METRICS_STORE=Path(self.store_dir.name) / 'metrics.sqlite3',
+            THROTTLE_STORE=Path(self.store_dir.name) / 'throttle.sqlite3',
+        )
+        self.settings.enable()
+        metrics.registry.clear()
+        self.fleet = FleetFactory()
+        self.fleet.create_vehicles(2)
+        self.api = APIClient()
+
+    def tearDown(self):
+        metrics.registry.clear()
+        self.settings.disable()
+        self.store_dir.cleanup()
+
+    def get_samples(self):
+        response = self.api.get('/api/internal/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        lines = response.content.decode().splitlines()
+        return dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+
+    def test_request_metrics(self):
+        for _ in range(3):
+            self.api.get('/api/vehicles/')
+        self.api.get('/api/vehicles/F000001/')
+        self.api.get('/api/vehicles/NONE/')
+        samples = self.get_samples()
+
+        labels = 'route="vehicles-list",method="GET"'
+        self.assertEqual(samples[f'silant_http_request_duration_seconds_count{{{labels}}}'], '3')
+        self.assertEqual(samples[f'silant_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'], '3')
+        # Отклоненный ограничением частоты запрос не обращается к БД
+        self.assertEqual(samples[f'silant_http_request_queries_bucket{{{labels},le="0"}}'], '1')
+        self.assertEqual(samples[f'silant_http_response_size_bytes_count{{{labels}}}'], '3')
+        self.assertEqual(samples[f'silant_http_responses_total{{{labels},status="2xx"}}'], '2')
+        self.assertEqual(samples[f'silant_http_responses_total{{{labels},status="4xx"}}'], '1')
+        self.assertEqual(samples['silant_throttled_requests_total{route="vehicles-list",scope="anon"}'], '1')
+        self.assertEqual(samples['silant_http_responses_total{route="vehicles-detail",method="GET",status="4xx"}'], '1')
+        self.assertIn('silant_db_roundtrip_seconds', samples)
+
+    def test_workers_share_store(self):
+        self.api.force_authenticate(self.fleet.manager)
+        self.api.get('/api/references/')
+        metrics.registry.flush()
+        # Приращения другого воркера — через тот же файл
+        other = metrics.Registry(metrics.MetricStore())
+        other.inc('silant_http_responses_total', metrics.format_labels(route='references-list', method='GET',
+                                                                       status='2xx'))
+        other.flush()
+        samples = self.get_samples()
+        self.assertEqual(samples['silant_http_responses_total{route="references-list",method="GET",status="2xx"}'],
+                         '2')
+
+    def test_requests_do_not_write_store(self):
+        with mock.patch.object(metrics, 'registry') as registry:
+            self.api.get('/api/vehicles/')
+        registry.observe.assert_called()
+        registry.flush.assert_not_called()
+
+    def test_background_flush(self):
+        store = mock.Mock()
+        registry = metrics.Registry(store)
+        registry.inc('silant_http_responses_total', metrics.format_labels(route='search', method='GET', status='2xx'))
+        with override_settings(METRICS_FLUSH_INTERVAL=0.01):
+            registry.start()
+            registry.start()
+            deadline = time.monotonic() + 5
+            while not store.add.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        store.add.assert_called_once()
+
+    def test_access_and_readiness(self):
+        self.assertEqual(self.api.get('/api/internal/metrics/', REMOTE_ADDR='10.0.0.1').status_code, 403)
+        self.assertEqual(self.api.get('/api/internal/ready/', REMOTE_ADDR='10.0.0.1').status_code, 403)
+        response = self.api.get('/api/internal/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['checks']['database']['ok'])
+        with override_settings(READINESS_DB_MAX_LATENCY=0):
+            self.assertEqual(self.api.get('/api/internal/ready/').status_code, 503)
+
+        # Запись пробы в общем кэше не обновляется при каждом опросе
+        shared = caches['shared']
+        with mock.patch.object(shared, 'set', wraps=shared.set) as set_value:
+            self.assertEqual(self.api.get('/api/internal/ready/').status_code, 200)
+        set_value.assert_not_called()
+
+        # Причина отказа не раскрывается в ответе
+        with mock.patch.object(shared, 'get', side_effect=OSError('/srv/cache: нет доступа')), \
+                self.assertLogs('app.metrics', 'ERROR'):
+            response = self.api.get('/api/internal/ready/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['cache'], {'ok': False, 'error': 'Проверка не прошла'})
+
+
+class FleetGeneratorTest(AppTestCase):
+    """Синтетический парк: связная история, сводки машин, продолжение генерации; замер эндпоинтов по ролям."""
+
+    def test_generate(self):
+        generator = FleetGenerator(seed=1, batch_size=40, today=date(2025, 1, 1))
+        generator.prepare(clients=5, services=3, password='password')
+        batches = list(generator.generate(100))
+        self.assertEqual([batch[0] for batch in batches], [40, 40, 20])
+        self.assertEqual(Vehicle.objects.count(), 100)
+        self.assertEqual(Maintenance.objects.count(), sum(batch[1] for batch in batches))
+        self.assertEqual(WarrantyClaim.objects.count(), sum(batch[2] for batch in batches))
+        self.assertEqual(VehicleStats.objects.filter(maintenance_count__gt=0).count(),
+                         Maintenance.objects.values('vehicle').distinct().count())
+        self.assertEqual(ComponentSerial.objects.count(), 500)
+        # Клиенты распределены неравномерно: у первого больше машин, чем у последнего
+        counts = dict(Vehicle.objects.values_list('client__username').annotate(count=Count('id')))
+        self.assertGreater(counts['s-client-00001'], counts.get('s-client-00005', 0))
+
+        # Повторный запуск продолжает нумерацию и не создает пользователей заново
+        generator = FleetGenerator(seed=2)
+        generator.prepare(clients=5, services=3, password='password')
+        list(generator.generate(10))
+        self.assertTrue(Vehicle.objects.filter(factory_number='S0000110').exists())
+        self.assertEqual(User.objects.count(), 8)
+
+        # Нумерация продолжается после наибольшего номера, а не после числа машин с prefix
+        for vehicle in Vehicle.objects.filter(factory_number__in=['S0000049', 'S0000050']):
+            vehicle.delete()
+        vehicle = Vehicle.objects.get(factory_number='S0000051')
+        vehicle.pk, vehicle.factory_number = None, 'S-import'
+        for field in ('engine_number', 'transmission_number', 'drive_bridge_number', 'control_bridge_number'):
+            setattr(vehicle, field, f'{getattr(vehicle, field)}-import')
+        vehicle.save()
+        self.assertEqual(FleetGenerator().next_number(), 111)
+
+    def test_benchmark_api(self):
+        FleetFactory().create_vehicles(2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'benchmark.json'
+            call_command('benchmark_api', requests=2, json_path=str(path), stdout=io.StringIO())
+            report = json.loads(path.read_text())
+            call_command('benchmark_api', requests=1, endpoints=['vehicles-list'], json_path=str(path),
+                         compare=str(path), stdout=io.StringIO())
+        self.assertEqual(report['meta']['database']['vehicles'], 2)
+        results = {(item['endpoint'], item['role']): item for item in report['results']}
+        self.assertEqual({role for _, role in results}, {'MR', 'CL', 'SO', 'anon'})
+        self.assertEqual(results['vehicles-detail', 'CL']['status'], 200)
+        self.assertEqual(results['maintenances-list', 'anon']['status'], 401)
+        self.assertGreater(results['vehicles-list', 'MR']['queries'], 0)
+        self.assertGreater(results['vehicles-list', 'MR']['bytes'], 0)
+
+
+class QueryBudgetTest(AppTestCase):
+    """Бюджеты SQL-запросов представлений (app.query_budget): объявлены и не зависят от объема данных."""
+
+    # Размеры парка, на которых проверяются бюджеты
+    sizes = (1, 5, 20)
+
+    def assertWithinQueryBudget(self, api, url, params=None):
+        """
+        Выполняет GET с холодными кэшами процесса и сравнивает число SQL-запросов с бюджетом представления.
+
+        Тело потокового ответа читается внутри замера: его запросы тоже входят в бюджет.
+
+        Returns:
+            int: Число SQL-запросов
+        """
+        action, budget = get_query_budget(resolve(url).func, 'GET')
+        self.assertIsNotNone(budget, f'{url}: не объявлен бюджет действия {action}')
+        reference_cache.invalidate()
+        public_cache.invalidate()
+        caches['default'].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = api.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertNotEqual(response.status_code, 500)
+        self.assertLessEqual(len(queries), budget, '\n'.join(query['sql'] for query in queries.captured_queries))
+        return len(queries)
+
+    def assertBudgetsAcrossSizes(self, fleet, users, requests):
+        """
+        Дополняет парк до каждого из sizes и проверяет бюджеты запросов от имени каждого пользователя.
+
+        Args:
+            fleet (FleetFactory): Парк
+            users (dict): Роль -> пользователь (None — анонимный)
+            requests (list): (путь, параметры запроса)
+        """
+        for size in self.sizes:
+            fleet.create_vehicles(size - fleet.count)
+            for role, user in users.items():
+                api = APIClient()
+                api.force_authenticate(user)
+                for url, params in requests:
+                    with self.subTest(size=size, role=role, url=url, params=params):
+                        self.assertWithinQueryBudget(api, url, params)
+
+    def test_read_actions_declare_budgets(self):
+        for _, viewset_class, _ in router.registry:
+            for route in router.get_routes(viewset_class):
+                if 'get' in route.mapping:
+                    with self.subTest(viewset=viewset_class.__name__, action=route.mapping['get']):
+                        self.assertIn(route.mapping['get'], getattr(viewset_class, 'query_budget', {}))
+        self.assertIn('get', SearchView.query_budget)
+
+    def test_budgets_hold_across_dataset_sizes(self):
+        fleet = FleetFactory()
+        fleet.create_vehicles(1)
+        users = {'MR': fleet.manager, 'CL': fleet.client, 'SO': fleet.service, 'anonymous': None}
+        requests = [
+            (f'/api/{prefix}{name}/', params)
+            for prefix in ('', 'async/') for name in ('vehicles', 'maintenances', 'claims')
+            for params in ({}, {'page_size': 100})
+        ] + [
+            ('/api/vehicles/F000001/', {}),
+            (f'/api/maintenances/{Maintenance.objects.order_by("pk").first().pk}/', {}),
+            (f'/api/claims/{WarrantyClaim.objects.order_by("pk").first().pk}/', {}),
+            ('/api/vehicles/lookup/', {'serial': 'E000001'}),
+            ('/api/vehicles/autocomplete/', {'prefix': 'F0'}),
+            ('/api/vehicles/export/', {'filetype': 'csv'}),
+            ('/api/claims/export/', {'filetype': 'csv'}),
+            ('/api/claims/analytics/', {}),
+            ('/api/search/', {'q': 'Отказ'}),
+            ('/api/references/', {}),
+            (f'/api/references/{fleet.references["node_fail"].pk}/', {}),
+            ('/api/clients/', {}),
+            (f'/api/clients/{fleet.client.pk}/', {}),
+            ('/api/services/', {}),
+            (f'/api/services/{fleet.service.pk}/', {}),
+        ]
+        self.assertBudgetsAcrossSizes(fleet, users, requests)
+
+    def test_exceeded_budget(self):
+        FleetFactory().create_vehicles(2)
+        api = APIClient()
+        with mock.patch.dict(VehicleViewSet.query_budget, {'list': 0}):
+            with self.assertLogs('app.query_budget', 'WARNING') as logs, self.assertRaises(QueryBudgetExceeded):
+                api.get('/api/vehicles/')
+            message = logs.records[0].getMessage()
+            self.assertIn('VehicleViewSet.list', message)
+            self.assertIn('SELECT', message)
+            # Стек вызовов — только код проекта
+            self.assertIn('app/conditional.py', message)
+            self.assertNotIn('time_query', message)
+            self.assertNotIn('site-packages', message)
+
+            with override_settings(QUERY_BUDGET_RAISE=False), self.assertLogs('app.query_budget', 'WARNING'):
+                self.assertEqual(api.get('/api/vehicles/').status_code, 200)
+            with override_settings(QUERY_BUDGET_ENABLED=False), self.assertNoLogs('app.query_budget'):
+                self.assertEqual(APIClient().get('/api/vehicles/').status_code, 200)
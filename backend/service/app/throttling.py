@@ -0,0 +1,197 @@
+"""
+Ограничение частоты запросов к API (token bucket).
+
+Для каждой пары «клиент + маршрут» ведется корзина токенов: запрос забирает
+токен, токены пополняются с постоянной скоростью до емкости корзины (допустимый
+всплеск). Бюджеты задаются отдельно для анонимных пользователей и для ролей
+CL, SO и MR (THROTTLE_RATES). Анонимный клиент определяется по IP (с учетом
+NUM_PROXIES из настроек DRF), аутентифицированный — по id пользователя.
+
+Проверка выполняется в middleware до вызова представления. Роль берется из
+подписанного access-токена (claim type) без обращения к БД, поэтому отклоненный
+запрос не выполняет ни одного запроса к основной базе.
+
+Счетчики общие для всех воркеров: они хранятся в отдельном файле SQLite
+(THROTTLE_STORE), каждая проверка — один атомарный UPSERT ... RETURNING.
+"""
+
+import sqlite3
+import threading
+from math import ceil
+from pathlib import Path
+from time import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import StatelessJWTAuthentication
+from .metrics import count_throttled
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+# Скрипт создания таблицы корзин
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS throttle_bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID
+'''
+
+# Забирает токен, если он есть (после пополнения за прошедшее время).
+# Если токена нет, условие WHERE не выполняется и RETURNING не вернет строку.
+CONSUME = '''
+INSERT INTO throttle_bucket (key, tokens, updated) VALUES (:key, :capacity - 1, :now)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - 1,
+    updated = :now
+WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+RETURNING tokens
+'''
+
+
+def parse_rate(rate):
+    """
+    Разбирает скорость пополнения вида '120/min'.
+
+    Returns:
+        float: Токенов в секунду
+    """
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period]
+
+
+class BucketStore:
+    """
+    Хранилище корзин токенов в файле SQLite, общее для процессов.
+
+    Соединение открывается одно на поток. Потеря счетчиков при сбое допустима,
+    поэтому запись идет без fsync (synchronous=OFF) в режиме WAL.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._last_cleanup = 0
+
+    def get_connection(self):
+        """Соединение текущего потока с файлом THROTTLE_STORE (создает таблицу при первом обращении)."""
+        path = str(settings.THROTTLE_STORE)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.path != path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(SCHEMA)
+            self._local.connection, self._local.path = connection, path
+        return connection
+
+    def consume(self, key, capacity, rate):
+        """
+        Забирает токен из корзины.
+
+        Args:
+            key (str): Ключ корзины
+            capacity (int): Емкость корзины
+            rate (float): Скорость пополнения, токенов в секунду
+
+        Returns:
+            float: 0, если токен получен, иначе число секунд до появления токена
+        """
+        connection = self.get_connection()
+        now = time()
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        if connection.execute(CONSUME, params).fetchone() is not None:
+            self.cleanup(connection, now)
+            return 0
+        row = connection.execute('SELECT tokens, updated FROM throttle_bucket WHERE key = ?', (key,)).fetchone()
+        available = min(capacity, row[0] + (now - row[1]) * rate) if row else 0
+        return max((1 - available) / rate, 0)
+
+    def cleanup(self, connection, now):
+        """Раз в THROTTLE_CLEANUP_INTERVAL секунд удаляет корзины, которые давно полны."""
+        if now - self._last_cleanup < settings.THROTTLE_CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        connection.execute('DELETE FROM throttle_bucket WHERE updated < ?', (now - settings.THROTTLE_IDLE_TIMEOUT,))
+
+    def clear(self):
+        """Удаляет все корзины (для тестов)."""
+        self.get_connection().execute('DELETE FROM throttle_bucket')
+
+
+store = BucketStore()
+
+
+class ThrottleMiddleware:
+    """
+    Middleware ограничения частоты запросов к представлениям DRF.
+
+    Отклоненный запрос получает 429 с заголовком Retry-After. Отключается
+    настройкой THROTTLE_ENABLED = False.
+    """
+
+    # Работает и под ASGI без перехода в поток на каждый запрос (app.async_views);
+    # process_view Django вызывает в потоке
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.authentication = StatelessJWTAuthentication()
+        self.ident = BaseThrottle()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def get_scope(self, request):
+        """
+        Определяет бюджет и идентификатор клиента по access-токену, без запросов к БД.
+
+        Проверенный токен остается в запросе, аутентификация DRF не проверяет его повторно.
+
+        Returns:
+            tuple: (бюджет: anon, CL, SO или MR; идентификатор клиента)
+        """
+        try:
+            token = self.authentication.get_request_token(request)
+        except InvalidToken:
+            token = None
+        if token is not None:
+            user_id = token.get(jwt_settings.USER_ID_CLAIM)
+            # Токены, выданные до появления claim type, получают бюджет клиента
+            scope = token.get('type')
+            return (scope if scope in settings.THROTTLE_RATES else 'CL'), f'user:{user_id}'
+        return 'anon', f'ip:{self.ident.get_ident(request)}'
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Проверяет корзину клиента для маршрута перед вызовом представления.
+
+        Ограничиваются представления DRF и асинхронные представления с атрибутом cls (app.async_views).
+        """
+        view_class = getattr(view_func, 'cls', None)
+        if not settings.THROTTLE_ENABLED or view_class is None or not issubclass(view_class, APIView):
+            return None
+
+        scope, ident = self.get_scope(request)
+        rate, capacity = settings.THROTTLE_RATES[scope]
+        key = f'{scope}:{ident}:{request.resolver_match.route}'
+        wait = store.consume(key, capacity, parse_rate(rate))
+        if not wait:
+            return None
+
+        count_throttled(request, scope)
+        response = JsonResponse(
+            {'detail': f'Слишком много запросов. Повторите через {ceil(wait)} с.'}, status=429,
+            json_dumps_params={'ensure_ascii': False},
+        )
+        response['Retry-After'] = str(ceil(wait))
+        return response
@@ -0,0 +1,260 @@
+"""
+Замер времени этапов запроса: заголовок Server-Timing и структурированный лог.
+
+Для каждого запроса ServerTimingMiddleware собирает:
+- db — число SQL-запросов и их суммарное время (обертка execute_wrapper на каждом
+  соединении, в том числе в потоках async ORM);
+- auth — JWT-аутентификация (app.authentication);
+- serialize — сериализаторы DRF (TimedRepresentationMixin) и проекции списков
+  (app.projections);
+- render — рендеринг ответа DRF (JSONRenderer и др.);
+- total — весь запрос, включая middleware.
+
+Этапы могут пересекаться: запросы, выполненные сериализатором, входят и в db,
+и в serialize. У потоковых ответов (stream=1) сериализация идет после отправки
+заголовков и в замер не попадает.
+
+Пример заголовка:
+    Server-Timing: db;dur=4.1;desc="3 queries", auth;dur=0.3, serialize;dur=2.2, render;dur=1.0, total;dur=9.8
+
+С SERVER_TIMING_LOG = True те же значения пишутся в логгер app.timing одной строкой
+JSON с представлением и действием (VehicleViewSet.list). Без SERVER_TIMING middleware
+не подключается, а счетчики сводятся к чтению contextvar, которое возвращает None
+(если замеры не включила MetricsMiddleware, app.metrics).
+"""
+
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger('app.timing')
+
+# Замеры текущего запроса (None — замер выключен или вне запроса)
+_current = ContextVar('request_timings', default=None)
+
+# Этапы в порядке вывода в заголовке
+STAGES = ('db', 'auth', 'serialize', 'render')
+
+
+class RequestTimings:
+    """
+    Замеры одного запроса.
+
+    Атрибуты:
+        durations (dict): Этап -> суммарное время, секунды
+        queries (int): Число SQL-запросов
+        view (str | None): Представление и действие (VehicleViewSet.list)
+        serializing (bool): Идет сериализация (вложенные сериализаторы не считаются повторно)
+        query_hook: Вызывается после каждого SQL-запроса как query_hook(timings, sql)
+            (проверка бюджета запросов, app.query_budget)
+    """
+
+    def __init__(self):
+        self.durations = dict.fromkeys(STAGES, 0.0)
+        self.queries = 0
+        self.view = None
+        self.serializing = False
+        self.query_hook = None
+
+    def add(self, stage, duration):
+        """Добавляет время к этапу."""
+        self.durations[stage] += duration
+
+    def as_header(self, total):
+        """Значение заголовка Server-Timing (миллисекунды)."""
+        metrics = [f'db;dur={self.durations["db"] * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [f'{stage};dur={self.durations[stage] * 1000:.1f}' for stage in STAGES[1:]]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def as_dict(self, total):
+        """Значения для структурированного лога (миллисекунды)."""
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            **{f'{stage}_ms': round(self.durations[stage] * 1000, 2) for stage in STAGES},
+            'total_ms': round(total * 1000, 2),
+        }
+
+
+@contextmanager
+def timed(stage):
+    """
+    Засекает время блока и добавляет его к этапу текущего запроса.
+
+    Args:
+        stage (str): Этап (STAGES)
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, perf_counter() - started)
+
+
+def current_timings():
+    """Замеры текущего запроса (None — замеры не включены)."""
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """
+    Включает замеры на время блока, если они еще не включены (ServerTimingMiddleware).
+
+    Используется MetricsMiddleware (app.metrics), когда заголовок Server-Timing выключен.
+
+    Yields:
+        RequestTimings: Замеры текущего запроса
+    """
+    timings = _current.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def time_query(execute, sql, params, many, context):
+    """Обертка выполнения SQL (connection.execute_wrapper): число и время запросов."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('db', perf_counter() - started)
+        if timings.query_hook is not None:
+            timings.query_hook(timings, sql)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Подключает time_query к новому соединению с БД (сигнал connection_created)."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedRepresentationMixin:
+    """
+    Примесь к сериализатору DRF: время to_representation() входит в этап serialize.
+
+    Считается только внешний вызов: вложенные сериализаторы и элементы списка
+    (many=True) не учитываются повторно.
+    """
+
+    def to_representation(self, instance):
+        timings = _current.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+        timings.serializing = True
+        started = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializing = False
+            timings.add('serialize', perf_counter() - started)
+
+
+def get_view_name(view_func, method):
+    """
+    Имя представления для лога: ViewSet.action или класс.метод.
+
+    Args:
+        view_func: Функция представления из URLconf
+        method (str): HTTP-метод запроса
+
+    Returns:
+        str: Например, VehicleViewSet.list
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware замера этапов запроса (SERVER_TIMING = True).
+
+    Подключается первым в MIDDLEWARE, чтобы total включал остальные middleware.
+    Работает в синхронном и асинхронном (ASGI) режимах.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, perf_counter() - started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Запоминает представление и действие."""
+        timings = _current.get()
+        if timings is not None:
+            timings.view = get_view_name(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        """Засекает рендеринг ответа DRF: вызывается непосредственно перед response.render()."""
+        timings = _current.get()
+        if timings is not None:
+            started = perf_counter()
+
+            def rendered(response):
+                timings.add('render', perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def finish(request, response, timings, total):
+        """Добавляет заголовок Server-Timing и пишет строку лога."""
+        response['Server-Timing'] = timings.as_header(total)
+        if settings.SERVER_TIMING_LOG:
+            logger.info(json.dumps({
+                'method': request.method, 'path': request.path, 'status': response.status_code,
+                **timings.as_dict(total),
+            }, ensure_ascii=False))
+        return response
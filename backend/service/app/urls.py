@@ -1,7 +1,9 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views, metrics
 from .views import ReferenceDirectoryViewSet, ClientsViewSet, ServiceOrganizationViewSet, VehicleViewSet, \
-    MaintenanceViewSet, WarrantyClaimViewSet
+    MaintenanceViewSet, WarrantyClaimViewSet, FleetImportView, SearchView
 
 router = DefaultRouter()
 router.register('references', ReferenceDirectoryViewSet, basename='references')
@@ -11,4 +13,16 @@ router.register('vehicles', VehicleViewSet, basename='vehicles')
 router.register('maintenances', MaintenanceViewSet, basename='maintenances')
 router.register('claims', WarrantyClaimViewSet, basename='claims')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls + [
+    path('import/', FleetImportView.as_view(), name='fleet-import'),
+    path('search/', SearchView.as_view(), name='search'),
+    # Асинхронные варианты эндпоинтов чтения для ASGI (app.async_views)
+    path('async/references/', async_views.reference_list, name='async-references'),
+    path('async/vehicles/', async_views.vehicle_list, name='async-vehicles'),
+    path('async/maintenances/', async_views.maintenance_list, name='async-maintenances'),
+    path('async/claims/', async_views.claim_list, name='async-claims'),
+    path('async/public/vehicles/<str:factory_number>/', async_views.public_vehicle, name='async-public-vehicle'),
+    # Метрики Prometheus и проба готовности (app.metrics)
+    path('internal/metrics/', metrics.metrics_view, name='internal-metrics'),
+    path('internal/ready/', metrics.readiness_view, name='internal-ready'),
+]
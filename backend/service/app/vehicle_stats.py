@@ -0,0 +1,133 @@
+"""
+Сводка показателей машины (VehicleStats): количество ТО, дата последнего ТО,
+количество рекламаций, дата восстановления последней из них, суммарный простой,
+последняя наработка.
+
+Дашборды и списки парка читают одну строку сводки на машину вместо всех ТО
+и рекламаций. Сводка пересчитывается для затронутых машин в той же транзакции,
+что и запись ТО или рекламации: обработчиками сигналов (app.signals) при
+сохранении и удалении объектов и явно — в пакетной записи (app.bulk) и импорте
+(app.fleet_import), где сигналы не отправляются.
+
+Пересчет не зависит от числа машин в пачке по числу запросов: по одному
+агрегирующему запросу на ТО и рекламации и один UPSERT.
+
+Незакрытой считается рекламация с датой восстановления позже текущей даты. Это
+число меняется со временем без записи в БД, поэтому в сводке не хранится: сводка
+хранит не зависящую от даты дату восстановления последней рекламации, а число
+незакрытых рекламаций считается при чтении (open_claims) подзапросом только для
+машин, у которых эта дата еще не наступила.
+"""
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import Vehicle, Maintenance, WarrantyClaim, VehicleStats
+
+# Поколение ответов со сводкой (ETag списка техники, app.conditional)
+GENERATION = 'vehicle_stats'
+
+FIELDS = ('maintenance_count', 'last_maintenance_date', 'claim_count', 'last_recovery_date', 'total_downtime',
+          'operating_time')
+
+
+def compute(vehicle_ids):
+    """
+    Вычисляет сводку для машин по их ТО и рекламациям.
+
+    Args:
+        vehicle_ids (iterable): id машин
+
+    Returns:
+        dict: id машины -> VehicleStats (не сохраненный)
+    """
+    stats = {vehicle_id: VehicleStats(vehicle_id=vehicle_id) for vehicle_id in vehicle_ids}
+    if not stats:
+        return stats
+
+    maintenances = (
+        Maintenance.objects.filter(vehicle_id__in=stats).order_by().values('vehicle_id')
+        .annotate(count=Count('id'), last_date=Max('maintenance_date'), operating_time=Max('operating_time'))
+    )
+    for row in maintenances:
+        item = stats[row['vehicle_id']]
+        item.maintenance_count = row['count']
+        item.last_maintenance_date = row['last_date']
+        item.operating_time = max(item.operating_time, row['operating_time'])
+
+    claims = (
+        WarrantyClaim.objects.filter(vehicle_id__in=stats).order_by().values('vehicle_id')
+        .annotate(count=Count('id'), last_recovery_date=Max('recovery_date'),
+                  downtime=Sum('downtime'), operating_time=Max('operating_time'))
+    )
+    for row in claims:
+        item = stats[row['vehicle_id']]
+        item.claim_count = row['count']
+        item.last_recovery_date = row['last_recovery_date']
+        item.total_downtime = row['downtime']
+        item.operating_time = max(item.operating_time, row['operating_time'])
+
+    return stats
+
+
+def open_claims(today=None):
+    """
+    Выражение числа незакрытых рекламаций машины для annotate() выборки Vehicle.
+
+    Рекламации машины считаются, только если дата восстановления последней из них
+    (VehicleStats.last_recovery_date) позже today; у остальных машин — 0 без подзапроса.
+
+    Args:
+        today (date | None): Дата, на которую рекламации считаются незакрытыми (по умолчанию — текущая)
+
+    Returns:
+        Case: Выражение с целочисленным результатом
+    """
+    today = today or timezone.localdate()
+    count = (
+        WarrantyClaim.objects.filter(vehicle_id=OuterRef('pk'), recovery_date__gt=today).order_by()
+        .values('vehicle_id').annotate(count=Count('id')).values('count')
+    )
+    return Case(
+        When(stats__last_recovery_date__gt=today, then=Coalesce(Subquery(count), Value(0))),
+        default=Value(0), output_field=IntegerField(),
+    )
+
+
+def refresh(vehicle_ids):
+    """
+    Пересчитывает и сохраняет сводку машин (INSERT ... ON CONFLICT DO UPDATE).
+
+    Вызывается внутри транзакции записи ТО или рекламаций.
+
+    Args:
+        vehicle_ids (iterable): id машин; None пропускаются
+    """
+    vehicle_ids = set(vehicle_ids) - {None}
+    if not vehicle_ids:
+        return
+    VehicleStats.objects.bulk_create(
+        compute(vehicle_ids).values(), update_conflicts=True, unique_fields=['vehicle'], update_fields=FIELDS,
+        batch_size=settings.API_BULK_BATCH_SIZE,
+    )
+    bump_generation(GENERATION)
+
+
+def rebuild(batch_size=1000):
+    """
+    Перестраивает сводку по всем машинам (заполнение после импорта, миграции или сбоя).
+
+    Args:
+        batch_size (int): Машин в одной порции пересчета
+
+    Yields:
+        int: Число машин в очередной пересчитанной порции
+    """
+    ids = list(Vehicle.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        refresh(batch)
+        yield len(batch)
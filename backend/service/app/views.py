@@ -10,23 +10,65 @@ views.py — Реализация API ViewSet'ов для работы с пол
 - Права доступа из permissions.py
 """
 
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from . import vehicle_stats
+from .analytics import get_report as get_reliability_report
+from .bulk import MaintenanceBulkWriter, WarrantyClaimBulkWriter, visible_vehicles
+from .conditional import ConditionalGetMixin, USER_GENERATION, VEHICLE_GENERATION
+from .export import ExportMixin
+from .fleet_import import IMPORTERS, ImportFileError, read_rows
+from .filters import DeclarativeFilterBackend, Filter, RangeFilter, parse_date
+from .pagination import KeysetPagination
+from .projections import ProjectedListMixin
+from .public_cache import public_vehicle_response
+from .query_plan import get_query_plan
+from .reference_cache import get_snapshot
+from .search import search
+from .streaming import StreamingListMixin
 from .permissions import ReferenceDirectoryPermission, ClientsPermission, ServiceOrganizationPermission, \
-    VehiclePermission, MaintenancePermission, WarrantyClaimPermission
-from .models import ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim
+    VehiclePermission, MaintenancePermission, WarrantyClaimPermission, FleetImportPermission, SearchPermission
+from .models import ReferenceDirectory, Vehicle, Maintenance, WarrantyClaim, ComponentSerial
 from .serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer, ReferenceDirectorySerializer, \
     ClientsSerializer, ServiceOrganizationSerializer, VehiclePublicSerializer, VehicleSerializer, MaintenanceSerializer, \
     WarrantyClaimSerializer
 from .api_schema import reference_directory_schema, clients_schema, service_organization_schema, vehicle_schema, \
-    maintenance_schema, warranty_claim_schema
+    maintenance_schema, warranty_claim_schema, fleet_import_schema, search_schema
 
 # Получаем модель пользователя
 User = get_user_model()
 
 
+def user_conditional_state(queryset):
+    """
+    Состояние выборки пользователей для ETag.
+
+    Args:
+        queryset: Выборка пользователей
+
+    Returns:
+        tuple: (хэш id и полных имен, None — Last-Modified не вычисляется)
+    """
+    rows = list(queryset.values_list('id', 'fullname'))
+    if not rows:
+        return None, None
+    return hashlib.sha1(repr(rows).encode()).hexdigest(), None
+
+
 # ---------------------------
 # Аутентификация и авторизация
 # ---------------------------
@@ -50,15 +92,54 @@ class CustomTokenRefresh(TokenRefreshView):
 # ---------------------------
 
 @reference_directory_schema
-class ReferenceDirectoryViewSet(ModelViewSet):
+class ReferenceDirectoryViewSet(ConditionalGetMixin, ModelViewSet):
     """
     CRUD для модели ReferenceDirectory (справочники).
     Доступен полный набор методов: GET, POST, PUT, DELETE.
+    Чтение обслуживается из кэша справочников (app.reference_cache).
     """
     http_method_names = ['get', 'post', 'put', 'delete', 'head', 'options']
     queryset = ReferenceDirectory.objects.all()
     permission_classes = [ReferenceDirectoryPermission]
     serializer_class = ReferenceDirectorySerializer
+    # Бюджет SQL-запросов действий чтения (app.query_budget), не зависит от числа строк и page_size
+    # Справочники читаются из кэша: запрос нужен только после его сброса
+    query_budget = {'list': 1, 'retrieve': 1}
+
+    def get_cached_object(self):
+        """Возвращает запись справочника из кэша по id из URL или None."""
+        try:
+            return get_snapshot().by_id.get(int(self.kwargs[self.lookup_url_kwarg or self.lookup_field]))
+        except ValueError:
+            return None
+
+    def get_conditional_state(self):
+        """Валидаторы по снимку справочников, без запроса к БД."""
+        rows = get_snapshot().rows if self.action == 'list' else [self.get_cached_object()]
+        if None in rows:
+            return None, None
+        last_modified = max((row.updated_at for row in rows), default=None)
+        return f'{len(rows)}:{last_modified}', last_modified
+
+    def list(self, request, *args, **kwargs):
+        """Список справочников из кэша процесса (сериализуется один раз на поколение)."""
+        return self.conditional(self.list_cached, request, *args, **kwargs)
+
+    def list_cached(self, request, *args, **kwargs):
+        """Ответ со списком справочников из снимка."""
+        return Response(get_snapshot().serialized(self.get_serializer_class()))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Запись справочника из кэша процесса."""
+        return self.conditional(self.retrieve_cached, request, *args, **kwargs)
+
+    def retrieve_cached(self, request, *args, **kwargs):
+        """Ответ с записью справочника из снимка."""
+        instance = self.get_cached_object()
+        if instance is None:
+            raise Http404
+        self.check_object_permissions(request, instance)
+        return Response(self.get_serializer(instance).data)
 
     def perform_create(self, serializer):
         """Сохранение нового справочника."""
@@ -83,7 +164,7 @@ class ReferenceDirectoryViewSet(ModelViewSet):
 # ---------------------------
 
 @clients_schema
-class ClientsViewSet(ModelViewSet):
+class ClientsViewSet(ConditionalGetMixin, ModelViewSet):
     """
     Только чтение списка клиентов (тип пользователя CL).
     """
@@ -91,6 +172,11 @@ class ClientsViewSet(ModelViewSet):
     queryset = User.objects.filter(type='CL')
     permission_classes = [ClientsPermission]
     serializer_class = ClientsSerializer
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    def get_conditional_state(self):
+        """Валидаторы по отображаемым полям: у пользователей нет даты изменения."""
+        return user_conditional_state(self.get_conditional_queryset())
 
 
 # ---------------------------
@@ -98,7 +184,7 @@ class ClientsViewSet(ModelViewSet):
 # ---------------------------
 
 @service_organization_schema
-class ServiceOrganizationViewSet(ModelViewSet):
+class ServiceOrganizationViewSet(ConditionalGetMixin, ModelViewSet):
     """
     Только чтение списка сервисных организаций (тип пользователя SO).
     """
@@ -106,6 +192,11 @@ class ServiceOrganizationViewSet(ModelViewSet):
     queryset = User.objects.filter(type='SO')
     permission_classes = [ServiceOrganizationPermission]
     serializer_class = ServiceOrganizationSerializer
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    def get_conditional_state(self):
+        """Валидаторы по отображаемым полям: у пользователей нет даты изменения."""
+        return user_conditional_state(self.get_conditional_queryset())
 
 
 # ---------------------------
@@ -113,16 +204,46 @@ class ServiceOrganizationViewSet(ModelViewSet):
 # ---------------------------
 
 @vehicle_schema
-class VehicleViewSet(ModelViewSet):
+class VehicleViewSet(ConditionalGetMixin, ExportMixin, StreamingListMixin, ProjectedListMixin, ModelViewSet):
     """
     CRUD для транспортных средств.
     Доступ к данным фильтруется по типу пользователя.
     lookup_field — factory_number (уникальный заводской номер).
+    Список поддерживает keyset-пагинацию (cursor, page_size), фильтры из filter_fields,
+    поиск по заводским номерам (search), сортировку (ordering), потоковую выдачу (stream=1)
+    и выгрузку в CSV/XLSX (export/).
+    Каждая машина выдается со сводкой по ТО и рекламациям (stats, app.vehicle_stats),
+    по ее показателям можно сортировать список (ordering=-open_claims). Число незакрытых
+    рекламаций зависит от текущей даты: оно считается при чтении и входит в ETag вместе с датой.
+    Машина находится по номеру любого агрегата (lookup/), номера подсказываются по началу (autocomplete/).
     """
     http_method_names = ['get', 'post', 'put', 'delete', 'head', 'options']
     queryset = Vehicle.objects.all()
     lookup_field = 'factory_number'
     permission_classes = [VehiclePermission]
+    pagination_class = KeysetPagination
+    export_kind = 'vehicles'
+    query_budget = {'list': 3, 'retrieve': 2, 'lookup': 1, 'autocomplete': 1, 'export': 1}
+    etag_generations = ('references', vehicle_stats.GENERATION, USER_GENERATION)
+    filter_backends = [DeclarativeFilterBackend, SearchFilter, OrderingFilter]
+    filter_fields = {
+        'vehicle_model': Filter('vehicle_model_id', many=True, description='Модель техники'),
+        'engine_model': Filter('engine_model_id', many=True, description='Модель двигателя'),
+        'transmission_model': Filter('transmission_model_id', many=True, description='Модель трансмиссии'),
+        'drive_bridge_model': Filter('drive_bridge_model_id', many=True, description='Модель ведущего моста'),
+        'control_bridge_model': Filter('control_bridge_model_id', many=True,
+                                       description='Модель управляемого моста'),
+        'client': Filter('client_id', many=True, description='Клиент'),
+        'service': Filter('service_id', many=True, description='Сервисная компания'),
+        'shipping_date': RangeFilter('shipping_date', parse=parse_date, description='Дата отгрузки'),
+    }
+    search_fields = ['^factory_number', '^engine_number', '^transmission_number', '^drive_bridge_number',
+                     '^control_bridge_number']
+    # Дата последнего ТО не сортируется: keyset-пагинация не поддерживает NULL в полях сортировки
+    ordering_fields = ['id', 'factory_number', 'shipping_date', 'supply_contract', 'recipient',
+                       'stats__maintenance_count', 'stats__claim_count', 'open_claims',
+                       'stats__total_downtime', 'stats__operating_time']
+    ordering = ('id',)
 
     def get_serializer_class(self):
         """Возвращает публичный сериализатор для неаутентифицированных пользователей."""
@@ -137,15 +258,9 @@ class VehicleViewSet(ModelViewSet):
         - CL: только ТС, принадлежащие клиенту
         - SO: только ТС, закрепленные за сервисной организацией
         """
-        queryset = Vehicle.objects.select_related(
-            'vehicle_model',
-            'engine_model',
-            'transmission_model',
-            'drive_bridge_model',
-            'control_bridge_model',
-            'client',
-            'service'
-        )
+        queryset = get_query_plan(self.get_serializer_class()).apply(
+            Vehicle.objects.all(), restrict_columns=self.action == 'list'
+        ).annotate(open_claims=vehicle_stats.open_claims())
         user = self.request.user
 
         if not user.is_authenticated:
@@ -154,12 +269,25 @@ class VehicleViewSet(ModelViewSet):
         if user.type == 'MR':
             return queryset
         elif user.type == 'CL':
-            return queryset.filter(client=user)
+            return queryset.filter(client_id=user.pk)
         elif user.type == 'SO':
-            return queryset.filter(service=user)
+            return queryset.filter(service_id=user.pk)
 
         return Vehicle.objects.none()
 
+    def get_scope(self):
+        """Область видимости ответа и текущая дата: с ней меняется число незакрытых рекламаций."""
+        return f'{super().get_scope()}:{timezone.localdate()}'
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Карточка ТС. Анонимным пользователям (JSON) отдается готовая публичная карточка
+        из кэша процесса (app.public_cache) с публичным Cache-Control.
+        """
+        if request.user.is_authenticated or request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        return public_vehicle_response(request, kwargs[self.lookup_url_kwarg or self.lookup_field])
+
     def perform_create(self, serializer):
         """Сохранение нового ТС."""
         serializer.save()
@@ -177,21 +305,90 @@ class VehicleViewSet(ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='lookup')
+    def lookup(self, request):
+        """
+        Машина по заводскому номеру любого агрегата (serial): один запрос по индексу ComponentSerial.
+        Ответ — найденные машины с типом номера; 404, если номер не найден среди доступной техники.
+        """
+        serial = request.query_params.get('serial', '').strip()
+        if not serial:
+            raise ValidationError({'serial': ['Обязательный параметр.']})
+        vehicles = list(
+            self.get_queryset().filter(serials__serial=serial).annotate(serial_kind=F('serials__kind')).order_by('id')
+        )
+        if not vehicles:
+            raise Http404
+        return Response({
+            'serial': serial,
+            'results': [
+                {'kind': vehicle.serial_kind, 'vehicle': self.get_serializer(vehicle).data} for vehicle in vehicles
+            ],
+        })
+
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        """
+        Подсказка заводских номеров машин и агрегатов по началу номера (prefix) с учетом регистра.
+        Номера читаются диапазоном по индексу ComponentSerial в порядке возрастания.
+        """
+        prefix = request.query_params.get('prefix', '').strip()
+        if not prefix:
+            raise ValidationError({'prefix': ['Обязательный параметр.']})
+        try:
+            limit = int(request.query_params.get('limit') or settings.SERIAL_AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': ['Ожидалось целое число']})
+        limit = min(max(limit, 1), settings.SERIAL_AUTOCOMPLETE_MAX_LIMIT)
+
+        # Все строки с началом prefix лежат в диапазоне [prefix, prefix + максимальный символ)
+        queryset = ComponentSerial.objects.filter(serial__gte=prefix, serial__lt=prefix + '\U0010ffff')
+        user = request.user
+        if user.is_authenticated and user.type != 'MR':
+            queryset = queryset.filter(vehicle__in=visible_vehicles(user))
+        rows = queryset.order_by('serial', 'kind').values('serial', 'kind', 'vehicle__factory_number')[:limit]
+        return Response([
+            {'serial': row['serial'], 'kind': row['kind'], 'factory_number': row['vehicle__factory_number']}
+            for row in rows
+        ])
+
 
 # ---------------------------
 # ViewSet для технического обслуживания
 # ---------------------------
 
 @maintenance_schema
-class MaintenanceViewSet(ModelViewSet):
+class MaintenanceViewSet(ConditionalGetMixin, ExportMixin, StreamingListMixin, ProjectedListMixin, ModelViewSet):
     """
     CRUD для записей о техническом обслуживании.
     Доступ фильтруется по типу пользователя.
+    Список поддерживает keyset-пагинацию (cursor, page_size), фильтры из filter_fields,
+    поиск по номеру заказ-наряда и машины (search), сортировку (ordering),
+    потоковую выдачу (stream=1) и выгрузку в CSV/XLSX (export/).
     """
     http_method_names = ['get', 'post', 'put', 'delete', 'head', 'options']
     queryset = Maintenance.objects.all()
     permission_classes = [MaintenancePermission]
     serializer_class = MaintenanceSerializer
+    pagination_class = KeysetPagination
+    export_kind = 'maintenances'
+    query_budget = {'list': 3, 'retrieve': 2, 'export': 1}
+    etag_generations = ('references', VEHICLE_GENERATION, USER_GENERATION)
+    filter_backends = [DeclarativeFilterBackend, SearchFilter, OrderingFilter]
+    filter_fields = {
+        'vehicle': Filter('vehicle_id', many=True, description='Машина'),
+        'vehicle_model': Filter('vehicle__vehicle_model_id', many=True, description='Модель техники'),
+        'maintenance_type': Filter('maintenance_type_id', many=True, description='Вид ТО'),
+        'client': Filter('vehicle__client_id', many=True, description='Клиент'),
+        'service': Filter('service_id', many=True, description='Организация, проводившая ТО'),
+        'maintenance_date': RangeFilter('maintenance_date', parse=parse_date, description='Дата проведения ТО'),
+        'order_date': RangeFilter('order_date', parse=parse_date, description='Дата заказ-наряда'),
+        'operating_time': RangeFilter('operating_time', description='Наработка, м/час'),
+    }
+    search_fields = ['^order_number', '^vehicle__factory_number']
+    ordering_fields = ['id', 'maintenance_date', 'order_date', 'order_number', 'operating_time',
+                       'vehicle__factory_number', 'maintenance_type__name']
+    ordering = ('-maintenance_date', '-id')
 
     def get_queryset(self):
         """
@@ -200,18 +397,17 @@ class MaintenanceViewSet(ModelViewSet):
         - CL: ТО, связанные с ТС клиента
         - SO: ТО, связанные с ТС обслуживаемыми организацией
         """
-        queryset = Maintenance.objects.select_related(
-            'maintenance_type',
-            'vehicle'
+        queryset = get_query_plan(self.get_serializer_class()).apply(
+            Maintenance.objects.all(), restrict_columns=self.action == 'list'
         )
         user = self.request.user
 
         if user.type == 'MR':
             return queryset
         elif user.type == 'CL':
-            return queryset.filter(vehicle__client=user)
+            return queryset.filter(vehicle__client_id=user.pk)
         elif user.type == 'SO':
-            return queryset.filter(vehicle__service=user)
+            return queryset.filter(vehicle__service_id=user.pk)
 
         return Maintenance.objects.none()
 
@@ -232,21 +428,57 @@ class MaintenanceViewSet(ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Пакетное создание и изменение записей ТО (строки с id изменяют существующие записи).
+
+        Ошибки возвращаются по индексам строк; корректные строки записываются.
+        Ответ 201, если записана хотя бы одна строка, иначе 400.
+        """
+        result = MaintenanceBulkWriter(self).save(request.data)
+        written = result['created'] or result['updated']
+        return Response(result, status=status.HTTP_201_CREATED if written else status.HTTP_400_BAD_REQUEST)
+
 
 # ---------------------------
 # ViewSet для гарантийных случаев
 # ---------------------------
 
 @warranty_claim_schema
-class WarrantyClaimViewSet(ModelViewSet):
+class WarrantyClaimViewSet(ConditionalGetMixin, ExportMixin, StreamingListMixin, ProjectedListMixin, ModelViewSet):
     """
     CRUD для гарантийных обращений.
     Доступ фильтруется по типу пользователя.
+    Список поддерживает keyset-пагинацию (cursor, page_size), фильтры из filter_fields,
+    поиск по номеру машины (search), сортировку (ordering), потоковую выдачу (stream=1),
+    выгрузку в CSV/XLSX (export/) и показатели надежности (analytics/).
     """
     http_method_names = ['get', 'post', 'put', 'delete', 'head', 'options']
     queryset = WarrantyClaim.objects.all()
     permission_classes = [WarrantyClaimPermission]
     serializer_class = WarrantyClaimSerializer
+    pagination_class = KeysetPagination
+    export_kind = 'claims'
+    query_budget = {'list': 3, 'retrieve': 2, 'export': 1, 'analytics': 4}
+    etag_generations = ('references', VEHICLE_GENERATION, USER_GENERATION)
+    filter_backends = [DeclarativeFilterBackend, SearchFilter, OrderingFilter]
+    filter_fields = {
+        'vehicle': Filter('vehicle_id', many=True, description='Машина'),
+        'vehicle_model': Filter('vehicle__vehicle_model_id', many=True, description='Модель техники'),
+        'node_fail': Filter('node_fail_id', many=True, description='Узел отказа'),
+        'method_recovery': Filter('method_recovery_id', many=True, description='Способ восстановления'),
+        'client': Filter('vehicle__client_id', many=True, description='Клиент'),
+        'service': Filter('service_id', many=True, description='Сервисная компания'),
+        'failure_date': RangeFilter('failure_date', parse=parse_date, description='Дата отказа'),
+        'recovery_date': RangeFilter('recovery_date', parse=parse_date, description='Дата восстановления'),
+        'operating_time': RangeFilter('operating_time', description='Наработка, м/час'),
+        'downtime': RangeFilter('downtime', description='Время простоя'),
+    }
+    search_fields = ['^vehicle__factory_number']
+    ordering_fields = ['id', 'failure_date', 'recovery_date', 'operating_time', 'downtime',
+                       'vehicle__factory_number', 'node_fail__name', 'method_recovery__name']
+    ordering = ('-failure_date', '-id')
 
     def get_queryset(self):
         """
@@ -255,19 +487,17 @@ class WarrantyClaimViewSet(ModelViewSet):
         - CL: обращения по ТС клиента
         - SO: обращения по ТС, закрепленным за сервисной организацией
         """
-        queryset = WarrantyClaim.objects.select_related(
-            'node_fail',
-            'method_recovery',
-            'vehicle'
+        queryset = get_query_plan(self.get_serializer_class()).apply(
+            WarrantyClaim.objects.all(), restrict_columns=self.action == 'list'
         )
         user = self.request.user
 
         if user.type == 'MR':
             return queryset
         elif user.type == 'CL':
-            return queryset.filter(vehicle__client=user)
+            return queryset.filter(vehicle__client_id=user.pk)
         elif user.type == 'SO':
-            return queryset.filter(vehicle__service=user)
+            return queryset.filter(vehicle__service_id=user.pk)
 
         return WarrantyClaim.objects.none()
 
@@ -287,3 +517,83 @@ class WarrantyClaimViewSet(ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Пакетное создание и изменение рекламаций (строки с id изменяют существующие записи).
+
+        Ошибки возвращаются по индексам строк; корректные строки записываются.
+        Ответ 201, если записана хотя бы одна строка, иначе 400.
+        """
+        result = WarrantyClaimBulkWriter(self).save(request.data)
+        written = result['created'] or result['updated']
+        return Response(result, status=status.HTTP_201_CREATED if written else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'], url_path='analytics')
+    def analytics(self, request):
+        """
+        Показатели надежности (MTBF, интенсивность отказов, простой) по узлам отказа, моделям техники
+        и сервисным компаниям — по рекламациям в пределах выборки списка (роль и фильтры).
+        """
+        return Response(get_reliability_report(self))
+
+
+# ---------------------------
+# Импорт парка техники
+# ---------------------------
+
+@fleet_import_schema
+class FleetImportView(APIView):
+    """
+    Импорт техники, ТО или рекламаций из файла CSV/XLSX (app.fleet_import).
+    Доступен только менеджерам. Ответ — отчет об импорте с ошибками по строкам;
+    прерванный импорт продолжается повторной отправкой файла с skip=processed.
+    """
+    permission_classes = [FleetImportPermission]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """Импортирует загруженный файл (поля формы: file, kind, skip)."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['Обязательное поле.']})
+        kind = request.data.get('kind')
+        if kind not in IMPORTERS:
+            raise ValidationError({'kind': [f'Ожидается одно из значений: {", ".join(IMPORTERS)}']})
+        try:
+            skip = int(request.data.get('skip') or 0)
+        except ValueError:
+            raise ValidationError({'skip': ['Ожидалось целое число']})
+
+        file_format = upload.name.rsplit('.', 1)[-1].lower() if '.' in upload.name else ''
+        try:
+            report = IMPORTERS[kind]().run(read_rows(upload, file_format), skip=max(skip, 0))
+        except ImportFileError as exc:
+            raise ValidationError({'file': [str(exc)]})
+        return Response(report.as_dict())
+
+
+# ---------------------------
+# Поиск
+# ---------------------------
+
+@search_schema
+class SearchView(APIView):
+    """
+    Полнотекстовый поиск по технике и рекламациям (app.search).
+    Результаты ограничены ролью пользователя и упорядочены по релевантности.
+    """
+    permission_classes = [SearchPermission]
+    query_budget = {'get': 4}
+
+    def get(self, request):
+        """Ищет по строке q; type — тип записей (vehicle, claim, можно несколько), limit — число результатов."""
+        try:
+            limit = int(request.query_params.get('limit') or settings.SEARCH_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': ['Ожидалось целое число']})
+        limit = min(max(limit, 1), settings.SEARCH_MAX_LIMIT)
+        types = request.query_params.getlist('type') or None
+        results = search(request.query_params.get('q'), request.user, types=types, limit=limit)
+        return Response({'count': len(results), 'results': results})
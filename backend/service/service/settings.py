@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -36,6 +37,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.timing.ServerTimingMiddleware',
+    'app.metrics.MetricsMiddleware',
+    'app.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
 
@@ -46,6 +50,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+
+    'app.throttling.ThrottleMiddleware',
 ]
 
 ROOT_URLCONF = 'service.urls'
@@ -71,14 +77,63 @@ WSGI_APPLICATION = 'service.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Параметры SQLite задаются переменными окружения (значения по умолчанию — для работы
+# нескольких воркеров, проверяются командой benchmark_sqlite):
+# - DB_PATH — файл базы данных;
+# - DB_JOURNAL_MODE — журнал: WAL не блокирует чтение записью. Режим WAL сохраняется в самом файле
+#   и держит рядом с ним файлы -wal и -shm, поэтому по умолчанию он включается только для базы из DB_PATH;
+#   db.sqlite3 с демо-данными из репозитория остается в режиме DELETE;
+# - DB_SYNCHRONOUS — NORMAL: в режиме WAL без fsync на каждую транзакцию, без риска повреждения БД
+#   (в режиме DELETE по умолчанию FULL);
+# - DB_TIMEOUT — сколько секунд ждать блокировку записи (busy_timeout) вместо ошибки «database is locked»;
+# - DB_TRANSACTION_MODE — IMMEDIATE: транзакция сразу берет блокировку записи и ждет ее по DB_TIMEOUT
+#   (отложенная транзакция, прочитав данные, при записи сразу получает ошибку блокировки);
+# - DB_CACHE_SIZE_KB, DB_MMAP_SIZE_MB — кэш страниц соединения и отображение файла в память;
+# - DB_CONN_MAX_AGE — время жизни соединения, секунды (0 — новое соединение на каждый запрос);
+# - DB_CONN_HEALTH_CHECKS — проверять постоянное соединение перед запросом (1/0).
+DB_PATH = os.environ.get('DB_PATH')
+DB_JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL' if DB_PATH else 'DELETE')
+SQLITE_PRAGMAS = {
+    'journal_mode': DB_JOURNAL_MODE,
+    'synchronous': os.environ.get('DB_SYNCHRONOUS', 'NORMAL' if DB_JOURNAL_MODE.upper() == 'WAL' else 'FULL'),
+    'cache_size': -int(os.environ.get('DB_CACHE_SIZE_KB', 20000)),
+    'mmap_size': int(os.environ.get('DB_MMAP_SIZE_MB', 256)) * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': DB_PATH or BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': float(os.environ.get('DB_TIMEOUT', 20)),
+            'transaction_mode': os.environ.get('DB_TRANSACTION_MODE', 'IMMEDIATE') or None,
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# default — кэш процесса; shared — общий для всех воркеров (счетчики поколений кэшей приложения).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+}
+# Сколько секунд процесс помнит прочитанный из shared номер поколения (app.cache):
+# задержка, с которой воркер видит изменения справочников и техники из других воркеров
+GENERATION_CHECK_INTERVAL = float(os.environ.get('GENERATION_CHECK_INTERVAL', 1))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,10 +184,98 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Пользователь запроса собирается из claims токена, без запроса к БД
+        'app.authentication.StatelessJWTAuthentication',
     ),
 }
 
+# Keyset-пагинация списков техники, ТО и рекламаций (app.pagination.KeysetPagination).
+# По умолчанию включается параметрами cursor/page_size, чтобы не ломать клиентов,
+# ожидающих полный список.
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_PAGINATE_BY_DEFAULT = False
+
+# Списки техники, ТО и рекламаций через values_list() вместо сериализаторов (app.projections)
+API_LIST_PROJECTIONS = True
+
+# Размер порции чтения из БД при потоковой выдаче списков (параметр stream=1, app.streaming)
+API_STREAM_CHUNK_SIZE = 2000
+
+# Пакетная запись ТО и рекламаций (action bulk, app.bulk): максимум строк в запросе
+# и размер пачки INSERT/UPDATE
+API_BULK_MAX_ROWS = 1000
+API_BULK_BATCH_SIZE = 500
+
+# Кэш публичных карточек техники (app.public_cache): число карточек в памяти процесса,
+# время жизни записи и max-age для браузеров и прокси (секунды)
+PUBLIC_VEHICLE_CACHE_SIZE = 10000
+PUBLIC_VEHICLE_CACHE_TTL = 300
+PUBLIC_VEHICLE_MAX_AGE = 60
+
+# Ограничение частоты запросов к API (app.throttling): для каждого клиента и маршрута —
+# корзина токенов (скорость пополнения, емкость). Счетчики общие для воркеров (файл SQLite).
+THROTTLE_ENABLED = True
+THROTTLE_RATES = {
+    'anon': ('60/min', 30),
+    'CL': ('300/min', 100),
+    'SO': ('300/min', 100),
+    'MR': ('1200/min', 300),
+}
+THROTTLE_STORE = BASE_DIR / 'cache' / 'throttle.sqlite3'
+# Как часто удалять и через сколько секунд простоя считать корзину полной
+THROTTLE_CLEANUP_INTERVAL = 60
+THROTTLE_IDLE_TIMEOUT = 3600
+
+# Показатели надежности по рекламациям (app.analytics, /api/claims/analytics/):
+# время жизни отчета в кэше процесса, секунды (сбрасывается и при записи ТО и рекламаций)
+ANALYTICS_CACHE_TTL = 600
+
+# Полнотекстовый поиск (app.search, /api/search/): результатов по умолчанию и максимум
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Подсказка заводских номеров (/api/vehicles/autocomplete/): номеров по умолчанию и максимум
+SERIAL_AUTOCOMPLETE_LIMIT = 10
+SERIAL_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Замер этапов запроса (app.timing): заголовок Server-Timing (число и время SQL-запросов,
+# аутентификация, сериализация, рендеринг) и строка лога JSON в логгер app.timing.
+# Переменные окружения SERVER_TIMING и SERVER_TIMING_LOG (1/0); по умолчанию заголовок — при DEBUG.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1' if DEBUG else '0') == '1'
+SERVER_TIMING_LOG = os.environ.get('SERVER_TIMING_LOG', '0') == '1'
+
+# Метрики Prometheus (app.metrics, /api/internal/metrics/): включение (METRICS_ENABLED, 1/0),
+# общий файл значений для всех воркеров, как часто воркер сбрасывает в него приращения (секунды)
+# и адреса, с которых доступен эндпоинт метрик (METRICS_ALLOWED_IPS через запятую)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_STORE = BASE_DIR / 'cache' / 'metrics.sqlite3'
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+# Проба готовности (/api/internal/ready/): максимальное время ответа БД, секунды
+READINESS_DB_MAX_LATENCY = float(os.environ.get('READINESS_DB_MAX_LATENCY', 0.5))
+
+# Бюджеты SQL-запросов представлений (app.query_budget, атрибут query_budget у ViewSet):
+# проверка (переменная окружения QUERY_BUDGET, 1/0; по умолчанию — при DEBUG) и реакция на превышение:
+# True — исключение QueryBudgetExceeded, False — только предупреждение в логгер app.query_budget
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET', '1' if DEBUG else '0') == '1'
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'app.query_budget': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Импорт парка техники (команда import_fleet, /api/import/): строк в одной транзакции
+IMPORT_BATCH_SIZE = 2000
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -165,7 +308,7 @@ SIMPLE_JWT = {
 
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
-    "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_USER_CLASS": "app.authentication.ClaimsUser",
 
     "JTI_CLAIM": "jti",
 
@@ -174,13 +317,16 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
     "TOKEN_OBTAIN_SERIALIZER": "app.serializers.CustomTokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "app.serializers.CustomTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Отзыв токенов при изменении пользователя (app.authentication)
+JWT_REVOCATION = True
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Silant Project API',
     'DESCRIPTION': 'API для работы с данными машин, ТО и рекламациями',